@@ -0,0 +1,85 @@
+# coding=utf-8
+"""
+Contains functions to build and probe Bloom filters. A Bloom filter is used to reduce the tuples
+shipped for a join to those that may have a match on the other node. Filters are represented as
+dictionaries (so these can be sent as is through the socket):
+
+{'bits': bytearray-of-the-filter, 'k': number-of-hashes-per-value}
+
+Usage: Bloom.create(number_of_values, max_bytes)
+       Bloom.add(bloom_filter, values)
+       Bloom.contains(bloom_filter, value)
+"""
+
+from hashlib import blake2b
+from math import ceil, log
+
+
+class Bloom:
+    """
+    All Bloom filter operations. Filters are sized for a false positive rate of roughly 1%, but
+    never exceed a given number of bytes (at the cost of a higher false positive rate).
+    """
+
+    @staticmethod
+    def _positions(v, m, k):
+        """ Helper method to determine the bits of a value. Every node must agree on the bits of
+        equal values, so Python's (salted) hash is not used. Two hashes are derived from a single
+        digest, and combined to produce 'k' bit positions.
+
+        :param v: Value to determine the bits of. Integral reals are treated as integers.
+        :param m: Number of bits in the filter.
+        :param k: Number of bits to determine.
+        :return: List of 'k' bit positions in the range [0, m).
+        """
+        if isinstance(v, float) and v.is_integer():
+            v = int(v)
+        b = v if isinstance(v, bytes) else str(v).encode('utf-8')
+
+        # Split a 128-bit digest into two 64-bit hashes. The second must be odd.
+        h = int.from_bytes(blake2b(b, digest_size=16).digest(), 'little')
+        h_1, h_2 = h & 0xFFFFFFFFFFFFFFFF, (h >> 64) | 1
+
+        return [(h_1 + i * h_2) % m for i in range(k)]
+
+    @staticmethod
+    def create(n, b):
+        """ Create an empty Bloom filter for the given number of values.
+
+        :param n: Expected number of values to add to the filter.
+        :param b: Maximum number of bytes the filter may use.
+        :return: An empty Bloom filter.
+        """
+        m = min(max(8 * ceil(n * 9.6 / 8), 8), 8 * b)
+        k = max(1, min(8, round(m / max(n, 1) * log(2))))
+
+        return {'bits': bytearray(m // 8), 'k': k}
+
+    @staticmethod
+    def add(f, vs):
+        """ Add a batch of values to the given Bloom filter. NULLs never match, so these are not
+        added.
+
+        :param f: Bloom filter to add the values to.
+        :param vs: Iterable of values to add.
+        :return: None.
+        """
+        bits, m, k = f['bits'], len(f['bits']) * 8, f['k']
+
+        for p in (p for v in vs if v is not None for p in Bloom._positions(v, m, k)):
+            bits[p >> 3] |= 1 << (p & 7)
+
+    @staticmethod
+    def contains(f, v):
+        """ Determine if a value may have been added to the given Bloom filter.
+
+        :param f: Bloom filter to probe.
+        :param v: Value to probe for.
+        :return: False if the value was never added. True if it may have been.
+        """
+        if v is None:
+            return False
+
+        bits = f['bits']
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in Bloom._positions(v, len(bits) * 8,
+                                                                          f['k']))
@@ -7,11 +7,14 @@ Usage: LocalCatalog.create_dtable(catalog_database_filename)
        LocalCatalog.record_ddl(socket, command_list)
        LocalCatalog.record_partition(socket, command_list)
        LocalCatalog.return_node_uris(socket, command_list)
+       LocalCatalog.return_partitions(socket, command_list)
 
        RemoteCatalog.ping(node_URI)
        RemoteCatalog.record_ddl(catalog_node_URI, node_list, executed_DDL)
        RemoteCatalog.return_node_uris(catalog_node_URI, table_name)
-       RemoteCatalog.update_partition(catalog_node_URI, partition_dictionary, number_of_nodes)
+       RemoteCatalog.return_partitions(catalog_node_URI, table_name)
+       RemoteCatalog.update_partition(catalog_node_URI, partition_dictionary, number_of_nodes,
+                                      node_URIs)
 """
 
 import sqlite3 as sql
@@ -19,7 +22,7 @@ import sqlite3 as sql
 from lib.database import Database
 from lib.dissect import SQLFile, ClusterCFG
 from lib.error import ErrorHandle
-from lib.network import Network
+from lib.network import Network, Pool
 
 
 class LocalCatalog:
@@ -77,6 +80,17 @@ class LocalCatalog:
             raise sql.Error(ErrorHandle.wrap_error_tag('Table exists in cluster.'))
 
         # Perform the INSERTION DDL.
+        LocalCatalog._record_nodes(cur, table, node_uris)
+
+    @staticmethod
+    def _record_nodes(cur, table, node_uris):
+        """ Helper method to insert an entry (without any partitioning) for every node of a table.
+
+        :param cur: Cursor to the catalog database.
+        :param table: Name of the table held by the nodes.
+        :param node_uris: URIs of all nodes holding the table, in order of node ID.
+        :return: None.
+        """
         tuples = [(table, node_uris[i], i + 1) for i in range(len(node_uris))]
         Database.executemany(cur, 'INSERT INTO dtables '
                                   'VALUES (?, NULL, ?, NULL, NULL, NULL, ?, NULL, NULL, NULL)',
@@ -151,21 +165,30 @@ class LocalCatalog:
         """ Record the partition to catalog database, assuming the working node is the catalog
         node. Using the catalog database filename, the partition dictionary, and the specified
         number of nodes from the received command list. Return an acknowledgement through the
-        given socket.
+        given socket. If the command list also holds a list of node URIs, the nodes of the table
+        are replaced with these first, within the same transaction (see runPART).
 
         :param k: Socket to send acknowledgement through.
         :param r: Command list passed through the same socket.
         :return: None.
         """
         f, r_d, numnodes = r[1], r[2], r[3]
+        node_uris = r[4] if len(r) > 4 else None
 
         # Connect to SQLite database using the filename.
         conn, cur = Database.connect(f, ErrorHandle.raise_handler)
         sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn)
 
+        def _record():
+            """ Replace the nodes of the table (if given), and record the partition. """
+            if node_uris is not None:
+                Database.execute(cur, 'DELETE FROM dtables '
+                                      'WHERE tname = ?', ErrorHandle.raise_handler, (r_d['tname'],))
+                LocalCatalog._record_nodes(cur, r_d['tname'], node_uris)
+            LocalCatalog._record_specific_partition(r_d, numnodes, cur)
+
         # Record the partition.
-        e = lambda: LocalCatalog._record_specific_partition(r_d, numnodes, cur)
-        ErrorHandle.attempt_operation(e, sql.Error, sql_handler)
+        ErrorHandle.attempt_operation(_record, sql.Error, sql_handler)
 
         # No errors have occurred. Send the success message.
         conn.commit(), conn.close()
@@ -198,6 +221,35 @@ class LocalCatalog:
         else:
             Network.write(k, ['EU', p])
 
+    @staticmethod
+    def return_partitions(k, r):
+        """ Return the node URIs stored in the 'dtables' table for a given table, along with the
+        partitioning information of each node. These are ordered by node ID.
+
+        :param k: Socket to send the partitioning information to.
+        :param r: Command list passed through the same socket.
+        :return: None.
+        """
+        f, tname = r[1], r[2]
+
+        # Connect to the catalog.
+        conn, cur = Database.connect(f, ErrorHandle.raise_handler)
+        sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn)
+
+        # Grab the partitioning of each node belonging to the given table. Return the results.
+        p = Database.execute(cur, 'SELECT nodeurl, partmtd, nodeid, partcol, partparam1, '
+                                  'partparam2 '
+                                  'FROM dtables '
+                                  'WHERE tname = ? '
+                                  'ORDER BY nodeid', sql_handler, (tname,), True)
+        conn.close()
+
+        # If there exist no tables here, throw an error.
+        if len(p) == 0:
+            raise sql.Error(ErrorHandle.wrap_error_tag('Table ' + tname + ' not found.'))
+        else:
+            Network.write(k, ['EQ', p])
+
 
 class RemoteCatalog:
     """
@@ -243,20 +295,11 @@ class RemoteCatalog:
         if len(nodes) == 0:
             return ErrorHandle.wrap_error_tag('No nodes were successful.')
 
-        # Create our socket.
-        sock = Network.open_client(host, port)
-        if ErrorHandle.is_error(sock):
-            sock.close()
-            return ErrorHandle.wrap_error_tag('Socket could not be established.')
-
-        # Otherwise, record the DDl.
-        Network.write(sock, ['C', f, nodes, ddl])
+        # Otherwise, record the DDl through a pooled connection.
+        response = Pool.request(host, port, ['C', f, nodes, ddl])
 
-        # Wait for a response to be sent back, and return the appropriate message.
-        net_handler = lambda e: Network.close_wrapper(e, ErrorHandle.default_handler, sock)
-        if not ErrorHandle.is_error(Network.read(sock, net_handler)):
-            sock.close()
-            return 'Success.'
+        # Return the appropriate message.
+        return response if ErrorHandle.is_error(response) else 'Success.'
 
     @staticmethod
     def return_node_uris(c, tname):
@@ -269,17 +312,9 @@ class RemoteCatalog:
         """
         host, port, f = ClusterCFG.parse_uri(c)
 
-        # Create our socket.
-        sock = Network.open_client(host, port)
-        if ErrorHandle.is_error(sock):
-            return ErrorHandle.wrap_error_tag('Socket could not be established.')
-
-        # Pickle our command list ('U', filename, and tname), and send our message.
-        Network.write(sock, ['U', f, tname])
-
-        # Wait for a response to be sent back, and record this response.
-        net_handler = lambda e: Network.close_wrapper(e, ErrorHandle.default_handler, sock)
-        response = Network.read(sock, net_handler)
+        # Send our command list ('U', filename, and tname) through a pooled connection, and
+        # record the response.
+        response = Pool.request(host, port, ['U', f, tname])
 
         # If an error exists, return the error.
         if ErrorHandle.is_error(response):
@@ -289,29 +324,49 @@ class RemoteCatalog:
         return [x[0] for x in response[1]]
 
     @staticmethod
-    def update_partition(c, r_d, numnodes):
+    def return_partitions(c, tname):
+        """ Given the catalog URI and the name of table, grab the node URIs and the partitioning
+        of each node from the catalog node.
+
+        :param c: Node URI of the catalog node to read from.
+        :param tname: Name of the table in the cluster to search for.
+        :return: The resulting error if the appropriate response is not returned successfully.
+            Otherwise, a list of partition dictionaries (keys 'uri', 'partmtd', 'nodeid',
+            'partcol', 'param1' and 'param2'), ordered by node ID.
+        """
+        host, port, f = ClusterCFG.parse_uri(c)
+
+        # Send our command list ('Q', filename, and tname) through a pooled connection, and
+        # record the response.
+        response = Pool.request(host, port, ['Q', f, tname])
+
+        # If an error exists, return the error.
+        if ErrorHandle.is_error(response):
+            return response
+
+        # Otherwise, return the partition of each node.
+        keys = ['uri', 'partmtd', 'nodeid', 'partcol', 'param1', 'param2']
+        return [dict(zip(keys, x)) for x in response[1]]
+
+    @staticmethod
+    def update_partition(c, r_d, numnodes, node_uris=None):
         """ Update the partition information in the catalog node, after performing the runLCSV
-        operation.
+        (or runPART) operation.
 
         :param c: Node URI of the catalog node to read from.
         :param r_d: Partition dictionary used to execute runLCSV.
         :param numnodes: Number of nodes an operation was partitioned across.
+        :param node_uris: Optional list of node URIs to replace the nodes of the table with, in
+            order of node ID.
         :return: The resulting error if the appropriate response is not returned successfully.
             Otherwise, a success message.
         """
         host, port, f = ClusterCFG.parse_uri(c)
 
-        # Create our socket.
-        sock = Network.open_client(host, port)
-        if ErrorHandle.is_error(sock):
-            return ErrorHandle.wrap_error_tag('Socket could not be established.')
-
-        # Pickle our command list ('K', f, r_d, numnodes), and send our message.
-        Network.write(sock, ['K', f, r_d, numnodes])
-
-        # Wait for a response to be sent back, and record this response.
-        net_handler = lambda e: Network.close_wrapper(e, ErrorHandle.default_handler, sock)
-        response = Network.read(sock, net_handler)
+        # Send our command list ('K', f, r_d, numnodes[, node_uris]) through a pooled connection,
+        # and record the response.
+        response = Pool.request(host, port, ['K', f, r_d, numnodes] +
+                                ([] if node_uris is None else [node_uris]))
 
         # If an error exists, return the error.
         if ErrorHandle.is_error(response):
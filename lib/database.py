@@ -2,12 +2,19 @@
 """
 Contains functions to interact with a SQLite database.
 
-Usage: Database.rollback_wrapper(exception, handler, database_connection)
+Usage: Database.rollback_wrapper(exception, handler, database_connection, load_state)
        Database.random_name(is_join)
        Database.description(database_cursor, SQL_string, handler)
        Database.execute(database_cursor, SQL_string, handler, tuples, is_fetch)
+       Database.execute_cursor(database_cursor, SQL_string, handler, tuples)
+       Database.fetch_batches(database_cursor, batch_size, batch_bytes, handler)
        Database.executemany(database_cursor, SQL_string, handler, tuples)
-       Database.connect(database_file, handler)
+       Database.connect(database_file, handler, is_shared)
+       Database.begin_load(database_connection, load_state, options, table_name, handler)
+       Database.rebuild_indexes(database_connection, load_state, handler)
+       Database.end_load(database_connection, load_state, is_commit, handler)
+       Database.read_checkpoint(database_connection, checkpoint_key, handler)
+       Database.checkpoint(database_connection, checkpoint_key, offset, handler)
 """
 
 import random
@@ -23,18 +30,31 @@ class Database:
     and rollback.
     """
 
+    # PRAGMAs applied for the duration of a load with the 'bulk' profile. WAL with 'NORMAL'
+    # synchronization cannot be corrupted by a crash, only lose the last transactions.
+    BULK_PROFILE = [('journal_mode', 'WAL'), ('synchronous', 'NORMAL'), ('cache_size', -65536),
+                    ('temp_store', 'MEMORY')]
+
+    # Number of seconds a connection waits on another connection's lock before failing. Nodes
+    # store the tuples of several operations at once (ships, exchanges and unions), and each
+    # holds its lock for as long as it takes to store a batch.
+    TIMEOUT = 30.0
+
     @staticmethod
-    def rollback_wrapper(e, handler, conn):
+    def rollback_wrapper(e, handler, conn, state=None):
         """ Handler wrapper to rollback the current state of the database. This is meant to be
         wrapped in another lambda to fit the normal handler signature.
 
         :param e: Exception to pass to the handler.
         :param handler: Handler to use with the given exception.
         :param conn: Connection to database to rollback.
+        :param state: Optional state of a load (see 'begin_load'), whose PRAGMAs are restored.
         :return: None.
         """
         # Rollback and close the connection.
-        conn.rollback(), conn.close()
+        conn.rollback()
+        Database._restore(conn, state) if state is not None else None
+        conn.close()
         handler(e)
 
     @staticmethod
@@ -79,6 +99,55 @@ class Database:
         e = lambda: cur.execute(s).fetchall() if tup is None else cur.execute(s, tup).fetchall()
         return ErrorHandle.attempt_operation(e, sql.Error, handler, fetch)
 
+    @staticmethod
+    def execute_cursor(cur, s, handler=ErrorHandle.default_handler, tup=None):
+        """ Execute some statement with the given database cursor, without fetching the
+        resultant. Tuples are then read off of the cursor itself (i.e. with 'fetchmany'), instead
+        of being held in memory all at once.
+
+        :param cur: Cursor to an open database connection.
+        :param s: SQL string to execute.
+        :param handler: Handler to use when the SQL execution fails.
+        :param tup: Tuple to use with the execution of 'S', given that 'S' is a prepared statement.
+        :return: An error associated with the SQL if the execution was not successful. Otherwise,
+            the cursor positioned before the first tuple of the resultant.
+        """
+        e = lambda: cur.execute(s) if tup is None else cur.execute(s, tup)
+        return ErrorHandle.attempt_operation(e, sql.Error, handler, True)
+
+    @staticmethod
+    def fetch_batches(cur, n, b, handler=ErrorHandle.default_handler):
+        """ Generator over the resultant of the last statement executed with the given cursor.
+        Tuples are fetched 'n' at a time, and grouped into batches of at most 'n' tuples or
+        roughly 'b' bytes, whichever is reached first. Only one batch is held in memory.
+
+        :param cur: Cursor to an open database connection, after 'execute_cursor'.
+        :param n: Maximum number of tuples in a batch.
+        :param b: Approximate maximum number of bytes in a batch.
+        :param handler: Handler to use when fetching from the cursor fails.
+        :return: Iterator of non-empty lists of tuples.
+        """
+        size = lambda r_t: sum(len(x) if isinstance(x, (str, bytes)) else 8 for x in r_t)
+        batch, batch_b = [], 0
+
+        while True:
+            result = ErrorHandle.attempt_operation(lambda: cur.fetchmany(n), sql.Error, handler,
+                                                   True)
+            if ErrorHandle.is_error(result) or len(result) == 0:
+                break
+
+            # Yield a batch whenever it reaches the tuple or byte limit.
+            for r_t in result:
+                batch.append(r_t)
+                batch_b += size(r_t)
+                if len(batch) == n or batch_b >= b:
+                    yield batch
+                    batch, batch_b = [], 0
+
+        # Yield the remaining tuples.
+        if len(batch) != 0:
+            yield batch
+
     @staticmethod
     def executemany(cur, s, tups, handler=ErrorHandle.default_handler):
         """ Execute some prepared statement with the given database cursor. 'tups' represents an
@@ -95,18 +164,148 @@ class Database:
         return ErrorHandle.attempt_operation(e, sql.Error, handler, False)
 
     @staticmethod
-    def connect(f, handler=ErrorHandle.default_handler):
+    def connect(f, handler=ErrorHandle.default_handler, is_shared=False):
         """ Connect to the given database file, and return the resulting connection and cursor.
 
         :param f: Filename of the database to connect to.
         :param handler: Handler to use when a database connection cannot be established.
+        :param is_shared: Flag that allows the connection to be used by threads other than the
+            one that created it. The caller is then responsible for never using it concurrently.
         :return: An error associated with the connection failure if a connection could not be
             established. Otherwise, the database connection and cursor in that order.
         """
-        conn = ErrorHandle.attempt_operation(lambda: sql.connect(f), sql.Error, handler, True)
+        conn = ErrorHandle.attempt_operation(lambda: sql.connect(f, timeout=Database.TIMEOUT,
+                                                                 check_same_thread=not
+                                                                 is_shared),
+                                             sql.Error, handler, True)
 
         # Return the database and cursor if a connection could be made.
         if ErrorHandle.is_error(conn):
             return ErrorHandle.wrap_error_tag('Could not connect to the database.'), ''
         else:
             return conn, conn.cursor()
+
+    @staticmethod
+    def _restore(conn, state):
+        """ Helper method to restore the PRAGMAs changed by 'begin_load', in reverse. The journal
+        is then only switched back once synchronization is.
+
+        :param conn: Connection to the database being loaded.
+        :param state: State of the load.
+        :return: None.
+        """
+        for pragma, v in reversed(state.get('pragmas', [])):
+            ErrorHandle.attempt_operation(lambda: conn.execute('PRAGMA {} = {}'.format(pragma, v)),
+                                          sql.Error, ErrorHandle.default_handler)
+        state['pragmas'] = []
+
+    @staticmethod
+    def begin_load(conn, state, o, tname=None, handler=ErrorHandle.default_handler):
+        """ Prepare a fresh connection for a load, as asked for by the given options. With the
+        'bulk' profile, the PRAGMAs of BULK_PROFILE are applied (where possible) and their
+        previous values are kept. If 'indexes' is 'rebuild', the secondary indexes of the table
+        are dropped within the transaction of the load, to be rebuilt once all tuples are stored.
+        The state of the load is kept in the given dictionary, which may be handed to
+        'rollback_wrapper' before this is called.
+
+        :param conn: Connection to the database being loaded.
+        :param state: Empty dictionary to keep the state of the load in.
+        :param o: Dictionary of tuning options of the request.
+        :param tname: Name of the table being loaded, if its indexes may be rebuilt.
+        :param handler: Handler to use when dropping an index fails.
+        :return: None.
+        """
+        state.update({'pragmas': [], 'indexes': []})
+        cur = conn.cursor()
+
+        if o.get('profile', 'none') == 'bulk':
+            for pragma, v in Database.BULK_PROFILE:
+                previous = cur.execute('PRAGMA ' + pragma).fetchone()[0]
+                r = ErrorHandle.attempt_operation(
+                    lambda: cur.execute('PRAGMA {} = {}'.format(pragma, v)), sql.Error,
+                    ErrorHandle.default_handler)
+                state['pragmas'] += [] if ErrorHandle.is_error(r) else [(pragma, previous)]
+
+        if o.get('indexes', 'keep') == 'rebuild' and tname is not None:
+            # Indexes without SQL back a constraint, and cannot be dropped.
+            indexes = cur.execute('SELECT name, sql '
+                                  'FROM sqlite_master '
+                                  'WHERE type = "index" AND sql IS NOT NULL AND '
+                                  'tbl_name = ? COLLATE NOCASE', (tname,)).fetchall()
+            cur.execute('BEGIN')
+            for name, s in indexes:
+                Database.execute(cur, 'DROP INDEX "{}";'.format(name), handler)
+                state['indexes'].append(s)
+
+    @staticmethod
+    def rebuild_indexes(conn, state, handler=ErrorHandle.default_handler):
+        """ Rebuild the indexes dropped by 'begin_load', within the transaction of the load. This
+        is where a load that violates a unique index fails, so a load that spans several nodes
+        should do this on every node before any commits.
+
+        :param conn: Connection to the database being loaded.
+        :param state: State of the load.
+        :param handler: Handler to use when rebuilding an index fails.
+        :return: None.
+        """
+        cur = conn.cursor()
+        for s in state['indexes']:
+            Database.execute(cur, s, handler)
+        state['indexes'] = []
+
+    @staticmethod
+    def end_load(conn, state, is_commit, handler=ErrorHandle.default_handler):
+        """ Finish a load started with 'begin_load'. Any indexes not yet rebuilt are rebuilt
+        before the load is committed, and the PRAGMAs are restored afterward.
+
+        :param conn: Connection to the database being loaded.
+        :param state: State of the load.
+        :param is_commit: Flag to commit the load. Otherwise, the load is rolled back.
+        :param handler: Handler to use when rebuilding an index fails.
+        :return: None.
+        """
+        if is_commit:
+            Database.rebuild_indexes(conn, state, handler)
+            conn.commit()
+        else:
+            conn.rollback()
+
+        Database._restore(conn, state)
+
+    @staticmethod
+    def read_checkpoint(conn, key, handler=ErrorHandle.default_handler):
+        """ Collect the byte offset of the CSV that a load was last checkpointed at. Checkpoints
+        are kept in the 'dcheckpoints' table of the database being loaded, which is created here
+        if it does not exist.
+
+        :param conn: Connection to the database being loaded.
+        :param key: Key of the load, as a [table name, CSV key] list.
+        :param handler: Handler to use when the checkpoint cannot be read.
+        :return: The offset of the last checkpoint, or 0 if there is none.
+        """
+        cur = conn.cursor()
+        Database.execute(cur, 'CREATE TABLE IF NOT EXISTS dcheckpoints ('
+                              'tname TEXT, '
+                              'csv TEXT, '
+                              'csvoffset INTEGER, '
+                              'PRIMARY KEY (tname, csv));', handler)
+        r = Database.execute(cur, 'SELECT csvoffset '
+                                  'FROM dcheckpoints '
+                                  'WHERE tname = ? AND csv = ?;', handler, tuple(key), True)
+
+        return r[0][0] if len(r) != 0 else 0
+
+    @staticmethod
+    def checkpoint(conn, key, offset, handler=ErrorHandle.default_handler):
+        """ Record the byte offset of the CSV that a load has reached, and commit it along with
+        every tuple stored so far.
+
+        :param conn: Connection to the database being loaded.
+        :param key: Key of the load, as a [table name, CSV key] list.
+        :param offset: Byte offset of the CSV, up to which every tuple has been stored.
+        :param handler: Handler to use when the checkpoint cannot be recorded.
+        :return: None.
+        """
+        Database.execute(conn.cursor(), 'INSERT OR REPLACE INTO dcheckpoints '
+                                        'VALUES (?, ?, ?);', handler, (key[0], key[1], offset))
+        conn.commit()
@@ -8,14 +8,28 @@ Usage: SQLFile.as_string(SQL_file)
        SQLFile.is_drop_ddl(SQL_string)
        SQLFile.is_select(SQL_string)
        SQLFile.table(SQL_string)
+       SQLFile.join_columns(SQL_string)
+       SQLFile.is_outer_join(SQL_string)
+       SQLFile.pushdown(SQL_string, table_name)
 
        ClusterCFG.is_runLCSV(cluster_configuration_file)
        ClusterCFG.parse_uri(node_URI)
        ClusterCFG.catalog_uri(cluster_configuration_file)
        ClusterCFG.node_uris(cluster_configuration_file)
        ClusterCFG.load(cluster_configuration_file)
+       ClusterCFG.default_options()
+       ClusterCFG.options(cluster_configuration_file)
+
+       CSVFile.chunks(csv_rows, chunk_size)
+       CSVFile.read(CSV_file, chunk_size)
+       CSVFile.split(CSV_file, number_of_ranges)
+       CSVFile.read_range(CSV_file, byte_range)
+       CSVFile.read_offsets(CSV_file, start_offset, chunk_size)
 """
 
+import csv
+import mmap
+import os
 # noinspection PyCompatibility
 from configparser import ConfigParser, ParsingError
 
@@ -172,6 +186,63 @@ class SQLFile:
         else:
             return table_names
 
+    @staticmethod
+    def join_columns(s):
+        """ Given a SQLite string, extract the equality conditions between the columns of two
+        tables (i.e. 'A.x = B.y') that must hold for every resulting tuple. Only columns qualified
+        with their table name are considered.
+
+        :param s: SQL string to extract the join conditions from.
+        :return: List of conditions, each as a [table_1, column_1, table_2, column_2] list.
+        """
+        # Create the parse tree for the given SQL string.
+        tree = SQLFile._generate_parse_tree(s)
+
+        # Walk the parse tree and find the join conditions.
+        t = listen.JoinColumnStore()
+        ParseTreeWalker().walk(t, tree)
+
+        return t.join_columns
+
+    @staticmethod
+    def is_outer_join(s):
+        """ Given a SQLite string, determine if the statement involves an outer (LEFT) join.
+
+        :param s: SQL string to search for an outer join with.
+        :return: True if the given statement contains an outer join. False otherwise.
+        """
+        # Create the parse tree for the given SQL string.
+        tree = SQLFile._generate_parse_tree(s)
+
+        # Walk the parse tree and determine the type of join in 's'.
+        t = listen.JoinColumnStore()
+        ParseTreeWalker().walk(t, tree)
+
+        return t.is_outer
+
+    @staticmethod
+    def pushdown(s, table_name):
+        """ Given a SQLite string, determine what the statement needs of a single table. These are
+        the top-level conjuncts that can be evaluated with this table alone (i.e. 'T.x < 5'), and
+        the columns of this table that are referenced. Only columns qualified with their table
+        name are considered, and every column is needed if '*' or an unqualified column is used,
+        or if no column is qualified with the table name (i.e. the table is given an alias).
+
+        :param s: SQL string to extract the filter and the columns from.
+        :param table_name: Name of the table to extract the filter and the columns for.
+        :return: Dictionary of the filter, as {'where': conjunction-or-None, 'columns':
+            list-of-column-names-or-None}.
+        """
+        # Create the parse tree for the given SQL string.
+        tree = SQLFile._generate_parse_tree(s)
+
+        # Walk the parse tree and find the conjuncts and columns of 'table_name'.
+        t = listen.PushdownStore(table_name)
+        ParseTreeWalker().walk(t, tree)
+
+        return {'where': ' AND '.join('(' + p + ')' for p in t.predicates) or None,
+                'columns': None if t.is_every_column or len(t.columns) == 0 else sorted(t.columns)}
+
 
 class ClusterCFG:
     """
@@ -308,9 +379,22 @@ class ClusterCFG:
             r_d.update({'partmtd': 1,
                         'partcol': config['D']['partition.column'],
                         'param1': [], 'param2': []})
+            n = int(config['D']['numnodes'])
+
+            # The bounds of each range are either given, or sampled from the CSV by runLCSV.
+            bounds = config['D'].get('partition.bounds', 'manual').lower()
+            if bounds not in ['manual', 'sample']:
+                return ErrorHandle.wrap_error_tag('\'partition.bounds\' not in space [manual, '
+                                                  'sample].')
+            elif bounds == 'sample':
+                r_d.update({'sample': int(config['D'].get('partition.sample', '10000'))})
+                if r_d['sample'] < 1:
+                    return ErrorHandle.wrap_error_tag('\'partition.sample\' is not a valid '
+                                                      'integer.')
+                return r_d
 
             # For range partitioning, look for the 'partition.node[i]' entries.
-            for i in range(int(config['D']['numnodes'])):
+            for i in range(n):
                 p1 = inf_a(config['D']['partition.node' + str(i + 1) + '.param1'])
                 p2 = inf_a(config['D']['partition.node' + str(i + 1) + '.param2'])
                 r_d['param1'].append(p1), r_d['param2'].append(p2)
@@ -368,3 +452,238 @@ class ClusterCFG:
             numnodes = r_d['param1']
 
         return c_u, r_d, numnodes
+
+    @staticmethod
+    def default_options():
+        """ Return the tuning options used when a 'clustercfg' file (or a request) does not
+        specify them.
+
+        :return: Dictionary of tuning options. 'rows' and 'bytes' bound the size of a batch of
+            tuples sent in one message. 'join' is the strategy used by runJSQL for joins whose
+            tables are not co-located, and 'broadcast' is the most tuples a table may have to be
+            broadcast by the 'auto' strategy. 'bloom' bounds the size of a Bloom filter. 'union'
+            is how runJSQL combines the results of nested joins. 'codec' is how batches are
+            encoded on the wire, and is 'pickle' unless asked for, as every peer reads this.
+            'compress' is the method that messages of at least 'compress_bytes' bytes are
+            compressed with, if any. 'window' is the most batches runLCSV sends to a node
+            before waiting on an acknowledgement, and 'workers' is the number of processes it
+            parses the CSV with. 'source' is who reads the CSV: the 'client', or each 'node'
+            (keeping only its own tuples, or every tuple of its own 'shard'). 'profile' is the
+            set of PRAGMAs a node loads tuples with, and 'indexes' is whether the indexes of the
+            table being loaded are kept, or dropped and rebuilt around the load. 'checkpoint' is
+            the number of rows runLCSV loads between checkpoints, or 0 to load in one transaction.
+            'idle' is the number of seconds a daemon keeps an idle pooled connection open.
+        """
+        return {'rows': 1000, 'bytes': 1048576, 'join': 'auto', 'broadcast': 10000,
+                'bloom': 1048576, 'union': 'stream', 'codec': 'pickle', 'compress': 'none',
+                'compress_bytes': 65536, 'window': 8, 'workers': 1, 'source': 'client',
+                'profile': 'none', 'indexes': 'keep', 'checkpoint': 0, 'idle': 30.0}
+
+    @staticmethod
+    def options(f):
+        """ Given the cluster configuration file, collect the optional tuning options. Options
+        that are not specified take on their default values.
+
+        :param f: Cluster configuration filename.
+        :return: String containing the error if the file is not formatted properly. Otherwise,
+            the dictionary of tuning options.
+        """
+        config, o = ClusterCFG._construct_config_reader(f), ClusterCFG.default_options()
+        if ErrorHandle.is_error(config):
+            return config
+
+        # Collect the batch, broadcast, filter, compression, window, worker and checkpoint limits,
+        # which must be positive integers.
+        for key, option in [('batch.rows', 'rows'), ('batch.bytes', 'bytes'),
+                            ('broadcast.rows', 'broadcast'), ('bloom.bytes', 'bloom'),
+                            ('compress.bytes', 'compress_bytes'), ('load.window', 'window'),
+                            ('load.workers', 'workers'), ('load.checkpoint', 'checkpoint')]:
+            if key in config['D']:
+                v = ErrorHandle.attempt_operation(lambda: int(config['D'][key]), ValueError,
+                                                  ErrorHandle.default_handler, True)
+                if ErrorHandle.is_error(v) or v < 1:
+                    return ErrorHandle.wrap_error_tag('\'{}\' is not a valid integer.'.format(key))
+                o[option] = v
+
+        # Collect how long an idle pooled connection is kept open, which must be a positive number.
+        if 'pool.idle' in config['D']:
+            v = ErrorHandle.attempt_operation(lambda: float(config['D']['pool.idle']), ValueError,
+                                              ErrorHandle.default_handler, True)
+            if ErrorHandle.is_error(v) or not 0 < v < float('inf'):
+                return ErrorHandle.wrap_error_tag('\'pool.idle\' is not a valid number.')
+            o['idle'] = v
+
+        # Collect the join strategy.
+        if 'join.method' in config['D']:
+            if config['D']['join.method'].lower() not in ['auto', 'nested', 'shuffle',
+                                                          'broadcast']:
+                return ErrorHandle.wrap_error_tag('\'join.method\' not in space [auto, nested, '
+                                                  'shuffle, broadcast].')
+            o['join'] = config['D']['join.method'].lower()
+
+        # Collect the union strategy.
+        if 'union.method' in config['D']:
+            if config['D']['union.method'].lower() not in ['stream', 'tree']:
+                return ErrorHandle.wrap_error_tag('\'union.method\' not in space [stream, tree].')
+            o['union'] = config['D']['union.method'].lower()
+
+        # Collect the codec batches are sent with.
+        if 'batch.codec' in config['D']:
+            if config['D']['batch.codec'].lower() not in ['columnar', 'pickle']:
+                return ErrorHandle.wrap_error_tag('\'batch.codec\' not in space [columnar, '
+                                                  'pickle].')
+            o['codec'] = config['D']['batch.codec'].lower()
+
+        # Collect the compression method.
+        if 'compress.method' in config['D']:
+            if config['D']['compress.method'].lower() not in ['none', 'zlib', 'lzma', 'bz2']:
+                return ErrorHandle.wrap_error_tag('\'compress.method\' not in space [none, zlib, '
+                                                  'lzma, bz2].')
+            o['compress'] = config['D']['compress.method'].lower()
+
+        # Collect who reads the CSV of a load.
+        if 'load.source' in config['D']:
+            if config['D']['load.source'].lower() not in ['client', 'node', 'shard']:
+                return ErrorHandle.wrap_error_tag('\'load.source\' not in space [client, node, '
+                                                  'shard].')
+            o['source'] = config['D']['load.source'].lower()
+
+        # Collect how nodes store the tuples of a load.
+        if 'load.profile' in config['D']:
+            if config['D']['load.profile'].lower() not in ['none', 'bulk']:
+                return ErrorHandle.wrap_error_tag('\'load.profile\' not in space [none, bulk].')
+            o['profile'] = config['D']['load.profile'].lower()
+        if 'load.indexes' in config['D']:
+            if config['D']['load.indexes'].lower() not in ['keep', 'rebuild']:
+                return ErrorHandle.wrap_error_tag('\'load.indexes\' not in space [keep, '
+                                                  'rebuild].')
+            o['indexes'] = config['D']['load.indexes'].lower()
+
+        return o
+
+
+class CSVFile:
+    """
+    All reading operations that involve some CSV file. Rows are parsed as these are consumed, and
+    handed out in chunks, so a CSV is never held in memory.
+    """
+
+    @staticmethod
+    def chunks(rows, n):
+        """ Group the rows of a CSV reader into chunks, skipping empty rows.
+
+        :param rows: Iterator of rows, as parsed by a CSV reader.
+        :param n: Maximum number of rows in a chunk.
+        :return: Iterator of non-empty lists of rows.
+        """
+        chunk = []
+        for ell in filter(lambda x: len(x) != 0, rows):
+            chunk.append(ell)
+            if len(chunk) == n:
+                yield chunk
+                chunk = []
+
+        if len(chunk) != 0:
+            yield chunk
+
+    @staticmethod
+    def read(f, n):
+        """ Open a CSV for reading, and return any errors that arise as a result. If there are no
+        errors, return a generator over the chunks of the CSV. The file is closed once every
+        chunk has been read.
+
+        :param f: CSV file to read.
+        :param n: Maximum number of rows in a chunk.
+        :return: A string containing the error if the file was not successfully opened.
+            Otherwise, an iterator of non-empty lists of rows.
+        """
+        csv_f = ErrorHandle.attempt_operation(lambda: open(f, newline=''), OSError,
+                                              ErrorHandle.default_handler, True)
+        if ErrorHandle.is_error(csv_f):
+            return csv_f
+
+        def _read():
+            """ Generator over the chunks of rows of our open CSV. """
+            with csv_f:
+                yield from CSVFile.chunks(csv.reader(csv_f), n)
+
+        return _read()
+
+    @staticmethod
+    def split(f, k):
+        """ Split a CSV into (at most) 'k' byte ranges of about the same size, each of which
+        starts at the beginning of a line. Quoted fields must not hold line breaks, as a range
+        could then begin in the middle of a row.
+
+        :param f: CSV file to split.
+        :param k: Number of ranges to split the file into.
+        :return: A string containing the error if the file could not be read. Otherwise, the
+            list of non-empty ranges, as (start, end) byte offsets.
+        """
+        def _split():
+            """ Search for the first line break past each 'k'th of the file. """
+            with open(f, 'rb') as csv_f:
+                size = os.fstat(csv_f.fileno()).st_size
+                if size == 0:
+                    return []
+
+                with mmap.mmap(csv_f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    bounds = [0]
+                    for i in range(1, k):
+                        j = mm.find(b'\n', max(size * i // k, bounds[-1]))
+                        bounds.append(size if j == -1 else j + 1)
+
+            bounds.append(size)
+            return [(x, y) for x, y in zip(bounds, bounds[1:]) if x < y]
+
+        return ErrorHandle.attempt_operation(_split, (OSError, ValueError),
+                                             ErrorHandle.default_handler, True)
+
+    @staticmethod
+    def read_range(f, r):
+        """ Generator over the lines of a byte range of a file. The file is mapped into memory,
+        so only the lines of the range are ever read.
+
+        :param f: File to read.
+        :param r: Range to read, as (start, end) byte offsets, where 'start' begins a line.
+        :return: Iterator of the lines of the range, as strings.
+        """
+        with open(f, 'rb') as csv_f, mmap.mmap(csv_f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            mm.seek(r[0])
+            while mm.tell() < r[1]:
+                yield mm.readline().decode('utf-8')
+
+    @staticmethod
+    def read_offsets(f, start, n):
+        """ Open a CSV for reading from the given byte offset, and return any errors that arise
+        as a result. If there are no errors, return a generator over the chunks of the CSV, each
+        paired with the byte offset that each of its rows ends at. Quoted fields must not hold
+        line breaks, as each line is parsed as a row of its own.
+
+        :param f: CSV file to read.
+        :param start: Byte offset to start reading from, which must begin a line.
+        :param n: Maximum number of rows in a chunk.
+        :return: A string containing the error if the file was not successfully opened.
+            Otherwise, an iterator of (non-empty list of rows, list of end offsets) pairs.
+        """
+        csv_f = ErrorHandle.attempt_operation(lambda: open(f, 'rb'), OSError,
+                                              ErrorHandle.default_handler, True)
+        if ErrorHandle.is_error(csv_f):
+            return csv_f
+
+        def _lines():
+            """ Generator over the (row, end offset) pairs of our open CSV. """
+            offset = csv_f.seek(start)
+            for line in csv_f:
+                offset += len(line)
+                row = next(csv.reader([line.decode('utf-8')]), [])
+                if len(row) != 0:
+                    yield row, offset
+
+        def _read():
+            """ Generator over the chunks of rows of our open CSV, along with their offsets. """
+            with csv_f:
+                for chunk in CSVFile.chunks(_lines(), n):
+                    yield [x[0] for x in chunk], [x[1] for x in chunk]
+
+        return _read()
@@ -8,6 +8,12 @@ Usage: t = listen.TableNameStore()
 
        t = listen.StatementType()
        ParseTreeWalker().walk(t, tree)
+
+       t = listen.JoinColumnStore()
+       ParseTreeWalker().walk(t, tree)
+
+       t = listen.PushdownStore(table_name)
+       ParseTreeWalker().walk(t, tree)
 """
 
 from lib.parse.SQLiteListener import SQLiteListener
@@ -20,8 +26,14 @@ class TableNameStore(SQLiteListener):
     and the 'parse' library.
     """
 
-    # Current name(s) associated with the table.
-    table_names = []
+    def __init__(self):
+        """ Constructor. The table names are held per instance, as long-lived daemon workers
+        walk many parse trees in the same process.
+        """
+        super().__init__()
+
+        # Current name(s) associated with the table.
+        self.table_names = []
 
     def enterTable_name(self, ctx: SQLiteParser.Table_nameContext):
         """ Called when table_name is found. Records the table_name token to the 'table_name' field.
@@ -70,3 +82,193 @@ class StatementType(SQLiteListener):
         :return: None.
         """
         self.is_ddl, self.is_drop = True, True
+
+
+class JoinColumnStore(SQLiteListener):
+    """
+    Listener class to record the equi-join conditions between two tables, and if an outer join is
+    used. This is to be used in ANTLR parse tree walking, and the 'parse' library.
+    """
+
+    def __init__(self):
+        """ Constructor. Start with no join conditions recorded.
+        """
+        super().__init__()
+
+        # Equality conditions as [table_1, column_1, table_2, column_2] lists.
+        self.join_columns = []
+
+        # Flag to indicate if a LEFT (OUTER) JOIN has been found.
+        self.is_outer = False
+
+    @staticmethod
+    def _column(ctx):
+        """ Helper method to extract a qualified column reference from an expression.
+
+        :param ctx: Expression context to inspect.
+        :return: None if the expression is not a column qualified with a table name. Otherwise,
+            the table name and the column name.
+        """
+        if ctx.column_name() is None or ctx.table_name() is None or ctx.getChildCount() < 3:
+            return None
+
+        return ctx.table_name().getText(), ctx.column_name().getText()
+
+    @staticmethod
+    def _is_conjunct(ctx):
+        """ Helper method to determine if an expression must hold for the entire statement, i.e.
+        it is only nested in AND expressions and parentheses up to the WHERE or ON clause.
+
+        :param ctx: Expression context to inspect.
+        :return: True if the expression is a top-level conjunct. False otherwise.
+        """
+        parent = ctx.parentCtx
+        while isinstance(parent, SQLiteParser.ExprContext):
+            is_and = parent.getChildCount() == 3 and parent.getChild(1).getText().upper() == 'AND'
+            is_paren = parent.getChildCount() == 3 and parent.getChild(0).getText() == '('
+            if not (is_and or is_paren):
+                return False
+            parent = parent.parentCtx
+
+        return True
+
+    def enterExpr(self, ctx: SQLiteParser.ExprContext):
+        """ Called when an expression is found. Records the two columns of an equality between
+        columns of different tables, if this equality is a top-level conjunct.
+
+        :param ctx: Context to parse.
+        :return: None.
+        """
+        if ctx.getChildCount() != 3 or ctx.getChild(1).getText() not in ['=', '==']:
+            return
+
+        a, b = JoinColumnStore._column(ctx.expr(0)), JoinColumnStore._column(ctx.expr(1))
+        if a is not None and b is not None and a[0] != b[0] and JoinColumnStore._is_conjunct(ctx):
+            self.join_columns.append([a[0], a[1], b[0], b[1]])
+
+    def enterJoin_operator(self, ctx: SQLiteParser.Join_operatorContext):
+        """ Called when a join operator is found. Sets the outer join flag if this is a LEFT
+        (OUTER) JOIN.
+
+        :param ctx: Context to parse.
+        :return: None.
+        """
+        self.is_outer = self.is_outer or ctx.K_LEFT() is not None
+
+    def enterTable_alias(self, ctx: SQLiteParser.Table_aliasContext):
+        """ Called when a table alias is found. The grammar reads 'A LEFT JOIN B' as table 'A'
+        aliased to 'LEFT', so this sets the outer join flag as well.
+
+        :param ctx: Context to parse.
+        :return: None.
+        """
+        self.is_outer = self.is_outer or ctx.getText().upper() == 'LEFT'
+
+
+class PushdownStore(SQLiteListener):
+    """
+    Listener class to record what a statement needs of a single table: the top-level conjuncts
+    that only reference this table, and the columns of this table that are referenced. This is to
+    be used in ANTLR parse tree walking, and the 'parse' library.
+    """
+
+    def __init__(self, table_name):
+        """ Constructor. Start with no conjuncts and no columns recorded.
+
+        :param table_name: Name of the table to record the conjuncts and columns of.
+        """
+        super().__init__()
+
+        # Table of interest, in upper case (SQLite names are case insensitive).
+        self.table_name = table_name.upper()
+
+        # Text of each conjunct that only references this table.
+        self.predicates = []
+
+        # Names of the referenced columns of this table, in upper case.
+        self.columns = set()
+
+        # Flag to indicate if every column may be referenced (i.e. '*' or an unqualified column).
+        self.is_every_column = False
+
+    @staticmethod
+    def _is_predicate(ctx):
+        """ Helper method to determine if an expression is a top-level conjunct of the WHERE or ON
+        clause of the outermost statement (i.e. not of a subquery).
+
+        :param ctx: Expression context to inspect.
+        :return: True if the expression is a top-level conjunct of a filter. False otherwise.
+        """
+        if not JoinColumnStore._is_conjunct(ctx):
+            return False
+
+        # Find the clause holding the expression, and the token before it.
+        top = ctx
+        while isinstance(top.parentCtx, SQLiteParser.ExprContext):
+            top = top.parentCtx
+        clause = top.parentCtx
+        if isinstance(clause, SQLiteParser.Select_coreContext):
+            i = clause.children.index(top)
+            if i == 0 or clause.getChild(i - 1).getText().upper() != 'WHERE':
+                return False
+        elif not isinstance(clause, SQLiteParser.Join_constraintContext):
+            return False
+
+        # Filters of a subquery are evaluated against the tables of the subquery.
+        parent = clause.parentCtx
+        while parent is not None:
+            if isinstance(parent, SQLiteParser.ExprContext):
+                return False
+            parent = parent.parentCtx
+
+        return True
+
+    def _is_own(self, ctx):
+        """ Helper method to determine if an expression only references columns of this table,
+        each qualified with the table name, and contains no subquery.
+
+        :param ctx: Expression context to inspect.
+        :return: True if the expression can be evaluated with this table alone. False otherwise.
+        """
+        is_referencing, stack = False, [ctx]
+        while len(stack) != 0:
+            c = stack.pop()
+            if isinstance(c, SQLiteParser.Select_stmtContext):
+                return False
+            elif isinstance(c, SQLiteParser.ExprContext) and c.column_name() is not None:
+                a = JoinColumnStore._column(c)
+                if a is None or a[0].upper() != self.table_name:
+                    return False
+                is_referencing = True
+            stack.extend(c.getChildren() if hasattr(c, 'getChildren') else [])
+
+        return is_referencing
+
+    def enterResult_column(self, ctx: SQLiteParser.Result_columnContext):
+        """ Called when a result column is found. Sets the every column flag for '*' and 'T.*'.
+
+        :param ctx: Context to parse.
+        :return: None.
+        """
+        self.is_every_column = self.is_every_column or ctx.getText().endswith('*')
+
+    def enterExpr(self, ctx: SQLiteParser.ExprContext):
+        """ Called when an expression is found. Records column references to this table, and
+        conjuncts that are evaluated with this table alone (in their original text).
+
+        :param ctx: Context to parse.
+        :return: None.
+        """
+        if ctx.column_name() is not None:
+            a = JoinColumnStore._column(ctx)
+            if a is None:
+                self.is_every_column = True
+            elif a[0].upper() == self.table_name:
+                self.columns.add(a[1].upper())
+
+        # AND expressions and parentheses are recorded through their operands.
+        is_and = ctx.getChildCount() == 3 and ctx.getChild(1).getText().upper() == 'AND'
+        is_paren = ctx.getChildCount() == 3 and ctx.getChild(0).getText() == '('
+        if not (is_and or is_paren) and PushdownStore._is_predicate(ctx) and self._is_own(ctx):
+            self.predicates.append(ctx.start.getInputStream().getText(ctx.start.start,
+                                                                      ctx.stop.stop))
@@ -6,27 +6,314 @@ unwrapping, messages are formatted as such:
 | message_length ------- | [operation_code, data] --------- |  Operation Packet
 | message_length ------- | error_string ------------------- |  Error Packet
 
+Pooled connections carry many requests, each sent as ['M', request_id, command_list,
+idle_seconds], where the daemon closes the connection once it has been idle for idle_seconds. Each
+response is the header ['EM', request_id, number_of_packets], followed by that many packets of
+the response itself. Responses may arrive in any order.
+
+Batches of tuples ('FS' and 'FZ') are pickled lists of tuples, unless the request asks for the
+columnar codec (see Columnar). Readers accept either, so a peer that does not know the codec
+simply answers with pickled batches. Encoded batches are framed without pickle:
+
+| message_length ------- | FRAME | operation_length | operation_code | encoded_batch |
+
+Messages of at least 'compress_bytes' bytes are compressed if the request asks for it (through
+its 'compress' option). The message of a compressed packet begins with the ID of its compression
+method instead of the pickle PROTO opcode (or FRAME), so readers decompress whatever arrives.
+
+Packets are sent without joining the length and the message (scatter-gather), and received
+into a buffer allocated once for the whole message, so large batches are neither copied nor
+truncated.
+
 Usage: Network.close_wrapper(exception, handler, socket_connection)
        Network.open_client(host, port, handler)
        Network.open_server(host, port, handler)
-       Network.write(socket, message)
+       Network.pack(message, options)
+       Network.unpack(packet, handler)
+       Network.write(socket, message, options)
+       Network.write_packets(socket, packets)
        Network.read(socket, handler)
+       Network.read_batches(socket, handler)
+       Network.read_tuples(socket, handler)
+       Network.write_async(stream_writer, message, options)
+       Network.read_async(stream_reader, handler)
+
+       Columnar.wrap(list_of_tuples, codec)
+       Columnar.unwrap(batch)
 
+       k = Outbox()
+       Network.write(k, message)
+
+       Pool.request(host, port, message, handler)
+       Pool.requests(host, port, list_of_messages, handler)
 """
 
+import bz2
+import lzma
 import pickle
 import socket
 import struct
+import sys
+import time
+import zlib
+from array import array
+from itertools import accumulate, repeat
+from threading import Lock
 
 from lib.error import ErrorHandle
 
 
+class Outbox:
+    """
+    Stand-in for a socket that only records the packets sent through it. This lets a blocking
+    operation run in a worker thread, while its responses are flushed through an asyncio stream
+    afterward.
+    """
+
+    def __init__(self):
+        """ Constructor. Start with no packets recorded.
+        """
+        self.packets = []
+
+    def send_packets(self, packets):
+        """ Record the given packets instead of sending them.
+
+        :param packets: List of packets to record, each as a list of buffers (see Network.pack).
+        :return: None.
+        """
+        self.packets.extend(packets)
+
+
+class Columnar:
+    """
+    Column-major encoding of a batch of tuples, sent in place of a pickled list of tuples. Each
+    column is encoded by the type of its values: INTEGER and REAL columns as typed arrays, and TEXT
+    and BLOB columns as an array of lengths followed by the values end to end. Columns of mixed
+    types hold the type of each value, followed by the values of each type as columns of their
+    own. Integers and lengths are stored in the narrowest array that holds them, and every array
+    is little-endian. Each column is preceded by its type, the typecode of its array, and a bitmap
+    of its NULLs (if it has any). Nothing is pickled.
+
+    | rows | columns | (type | typecode | has_nulls | null_bitmap? | values) per column |
+    """
+
+    # Type codes of a column, and of a NULL within a column of mixed types.
+    INTEGER, REAL, TEXT, BLOB, MIXED, NULL = b'i', b'd', b't', b'b', b'm', b'n'
+
+    # Type code of a column (and the value standing in for its NULLs), by the types of its values.
+    _TYPES = {frozenset(): (INTEGER, 0), frozenset({int}): (INTEGER, 0),
+              frozenset({float}): (REAL, 0.0), frozenset({str}): (TEXT, ''),
+              frozenset({bytes}): (BLOB, b'')}
+
+    # Type code of each value of a column of mixed types, by its type.
+    _TAGS = {int: INTEGER, float: REAL, str: TEXT, bytes: BLOB}
+
+    @staticmethod
+    def _array(vs):
+        """ Helper method to construct the narrowest little-endian array of the given integers.
+
+        :param vs: Sequence of integers.
+        :return: None if an integer does not fit in 64 bits. Otherwise, the array of integers.
+        """
+        lo, hi = (min(vs), max(vs)) if len(vs) != 0 else (0, 0)
+        for typecode in 'bhiq':
+            bound = 1 << (8 * array(typecode).itemsize - 1)
+            if -bound <= lo and hi < bound:
+                a = array(typecode, vs)
+                a.byteswap() if sys.byteorder == 'big' else None
+                return a
+
+        return None
+
+    @staticmethod
+    def _encode_column(vs, t):
+        """ Helper method to encode the values of a single column, given its type. A column of
+        mixed types is encoded as the tag of each value, followed by the values of each type.
+
+        :param vs: Sequence of values in the column, with NULLs replaced by a value of its type
+            (unless its values are of mixed types).
+        :param t: Type code of the column.
+        :return: None if the column cannot be encoded (integers beyond 64 bits, or text that is
+            not valid UTF-8). Otherwise, the list of encoded buffers, the first being the typecode
+            of its array.
+        """
+        blob = None
+        if t == Columnar.INTEGER:
+            a = Columnar._array(vs)
+            return [a.typecode.encode(), a] if a is not None else None
+
+        elif t == Columnar.REAL:
+            a = array('d', vs)
+            a.byteswap() if sys.byteorder == 'big' else None
+            return [b'd', a]
+
+        elif t == Columnar.TEXT:
+            # Lengths are in characters, so the values can be sliced from one decoded string.
+            blob = ErrorHandle.attempt_operation(lambda: ''.join(vs).encode('utf-8'),
+                                                 UnicodeEncodeError, lambda e: None, True)
+            if ErrorHandle.is_error(blob):
+                return None
+
+        elif t == Columnar.BLOB:
+            blob = b''.join(vs)
+
+        else:
+            tags = b''.join(Columnar._TAGS.get(type(v), Columnar.NULL) for v in vs)
+            buffers = [b'-', tags]
+            for t_v in [Columnar.INTEGER, Columnar.REAL, Columnar.TEXT, Columnar.BLOB]:
+                if t_v in tags:
+                    column = Columnar._encode_column([v for v, tag in zip(vs, tags)
+                                                      if tag == t_v[0]], t_v)
+                    if column is None:
+                        return None
+                    buffers += column
+
+            return buffers
+
+        a = Columnar._array(list(map(len, vs)))
+        return [a.typecode.encode(), a, struct.pack('<I', len(blob)), blob]
+
+    @staticmethod
+    def encode(batch):
+        """ Encode a batch of tuples column-major. Every tuple must have the same length.
+
+        :param batch: List of tuples to encode.
+        :return: None if a value cannot be encoded (i.e. it is not an integer of at most 64 bits,
+            a real, valid text, bytes or NULL). Otherwise, the bytes of the encoded batch.
+        """
+        n, m = len(batch), len(batch[0]) if len(batch) != 0 else 0
+        buffers = [struct.pack('<II', n, m)]
+
+        for vs in zip(*batch):
+            # Determine the type of the column. NULLs of mixed columns are tagged as such.
+            types = set(map(type, vs))
+            has_nulls = type(None) in types
+            types.discard(type(None))
+            if frozenset(types) in Columnar._TYPES:
+                t, empty = Columnar._TYPES[frozenset(types)]
+            elif types <= Columnar._TAGS.keys():
+                t, empty = Columnar.MIXED, None
+            else:
+                return None
+
+            # Replace any NULLs, and record their positions in a bitmap.
+            bitmap = b''
+            if has_nulls and t != Columnar.MIXED:
+                bitmap = bytearray((n + 7) // 8)
+                for i in (i for i, v in enumerate(vs) if v is None):
+                    bitmap[i >> 3] |= 1 << (i & 7)
+                vs = [empty if v is None else v for v in vs]
+
+            column = Columnar._encode_column(vs, t)
+            if column is None:
+                return None
+            buffers += [t, column[0], b'\x01' if len(bitmap) != 0 else b'\x00', bitmap]
+            buffers += column[1:]
+
+        return b''.join(buffers)
+
+    @staticmethod
+    def decode(buffer):
+        """ Decode a batch of tuples encoded with 'encode'.
+
+        :param buffer: Bytes-like object holding the encoded batch.
+        :return: List of tuples.
+        """
+        view, p = memoryview(buffer), 8
+        n, m = struct.unpack_from('<II', view)
+        columns = []
+
+        def _take(ell):
+            """ Consume the next 'ell' bytes of the buffer. """
+            nonlocal p
+            p += ell
+            return view[p - ell:p]
+
+        def _array(typecode, count):
+            """ Consume an array of 'count' values of the given typecode. """
+            a = array(typecode)
+            a.frombytes(_take(count * a.itemsize))
+            a.byteswap() if sys.byteorder == 'big' else None
+            return a
+
+        def _values(t, typecode, count):
+            """ Consume the 'count' values of a column of the given type. """
+            if t == Columnar.INTEGER or t == Columnar.REAL:
+                return _array(typecode, count).tolist()
+
+            elif t == Columnar.TEXT or t == Columnar.BLOB:
+                # Slice every value out of the (decoded) values end to end.
+                lengths = _array(typecode, count)
+                blob = _take(struct.unpack('<I', _take(4))[0]).tobytes()
+                blob = blob.decode('utf-8') if t == Columnar.TEXT else blob
+                ends = list(accumulate(lengths))
+                return list(map(blob.__getitem__, map(slice, [0] + ends[:-1], ends)))
+
+            elif t == Columnar.MIXED:
+                # Take the values of each type in turn, in the order of their tags.
+                tags, values = _take(count).tobytes(), {Columnar.NULL[0]: repeat(None)}
+                for t_v in [Columnar.INTEGER, Columnar.REAL, Columnar.TEXT, Columnar.BLOB]:
+                    if t_v in tags:
+                        values[t_v[0]] = iter(_values(t_v, chr(_take(1)[0]), tags.count(t_v)))
+                return [next(values[tag]) for tag in tags]
+
+            raise ValueError('Unknown column type ' + repr(t) + '.')
+
+        for _ in range(m):
+            t, typecode, has_nulls = bytes(_take(1)), chr(_take(1)[0]), _take(1)[0] == 1
+            bitmap = _take((n + 7) // 8) if has_nulls else None
+            vs = _values(t, typecode, n)
+
+            # Restore the NULLs.
+            if bitmap is not None:
+                for i in (i for i in range(n) if bitmap[i >> 3] & (1 << (i & 7))):
+                    vs[i] = None
+            columns.append(vs)
+
+        return list(zip(*columns)) if m != 0 else [() for _ in range(n)]
+
+    @staticmethod
+    def wrap(batch, codec):
+        """ Prepare a batch to be sent with the given codec. Peers that do not name a codec in
+        their request only read pickled batches, so 'pickle' leaves the batch as it is. Batches
+        with tuples of different lengths cannot be encoded column-major, so these are left as
+        they are as well (and fail wherever they are inserted, as they should). So are batches
+        holding values that SQLite does not return (see 'encode').
+
+        :param batch: List of tuples to send.
+        :param codec: Codec requested by the peer, 'columnar' or 'pickle'.
+        :return: The bytes of the encoded batch for 'columnar'. The batch itself otherwise.
+        """
+        is_encodable = len(batch) != 0 and len(set(map(len, batch))) == 1
+        encoded = Columnar.encode(batch) if codec == 'columnar' and is_encodable else None
+        return encoded if encoded is not None else batch
+
+    @staticmethod
+    def unwrap(resultant):
+        """ Recover a batch sent with either codec. Encoded batches arrive as bytes, and pickled
+        batches as lists, so a peer may answer with whichever codec it supports.
+
+        :param resultant: Batch as it arrived, through 'wrap'.
+        :return: List of tuples.
+        """
+        return Columnar.decode(resultant) if isinstance(resultant, bytes) else resultant
+
+
 class Network:
     """
     All socket operations. This includes socket creation, writing, and reading. The serialization
     and message length prefixing are handled here as well.
     """
 
+    # ID, compressor and decompressor of each compression method.
+    COMPRESSION = {'zlib': (1, zlib.compress, zlib.decompress),
+                   'lzma': (2, lzma.compress, lzma.decompress),
+                   'bz2': (3, bz2.compress, bz2.decompress)}
+    COMPRESSION_IDS = {v[0]: k for k, v in COMPRESSION.items()}
+
+    # First byte of a message framed without pickle (an operation code, and bytes of data).
+    FRAME = 0
+
     @staticmethod
     def close_wrapper(e, handler, sock):
         """ Handler wrapper to close the current sock. This is meant to be wrapped in another
@@ -88,19 +375,128 @@ class Network:
             return sock
 
     @staticmethod
-    def write(k, message):
+    def pack(message, o=None):
+        """ Format a packet for the given message. The packet consists of a prefixed message
+        length, and the message itself. These are kept apart, so the message is never copied.
+        A message whose data is bytes (i.e. an encoded batch) is framed as it is, behind a FRAME
+        byte and its operation code, so it never passes through pickle. Every other message is
+        pickled. Messages of at least 'compress_bytes' bytes are compressed with the 'compress'
+        method of the given options, unless this does not make them any smaller.
+
+        :param message: Message to format.
+        :param o: Optional dictionary of tuning options, to compress the message with.
+        :return: The packet, as a list of buffers (the length, then the message).
+        """
+        if isinstance(message, list) and len(message) == 2 and isinstance(message[1], bytes):
+            operation = message[0].encode('utf-8')
+            buffers = [struct.pack('!BB', Network.FRAME, len(operation)) + operation, message[1]]
+        else:
+            buffers = [pickle.dumps(message)]
+        ell = sum(map(len, buffers))
+
+        method = (o or {}).get('compress', 'none')
+        if method != 'none' and ell >= o['compress_bytes']:
+            # Messages always begin with the pickle PROTO opcode or the FRAME byte, so a leading
+            # codec ID is enough to mark a compressed message.
+            i, compress, _ = Network.COMPRESSION[method]
+            compressed = compress(b''.join(buffers))
+            if len(compressed) + 1 < ell:
+                return [struct.pack('!IB', len(compressed) + 1, i), compressed]
+
+        return [struct.pack('!I', ell)] + buffers
+
+    @staticmethod
+    def unpack(packet, handler=ErrorHandle.default_handler):
+        """ Unwrap the message of a packet, decompressing it first if need be.
+
+        :param packet: Bytes-like object holding the message, without its length.
+        :param handler: Handler to use if the message cannot be unwrapped.
+        :return: A string containing the error if the message cannot be unwrapped. Otherwise,
+            the message itself.
+        """
+        def _unpack():
+            """ Decompress the message, and unframe (or unpickle) it. """
+            view = memoryview(packet)
+            if len(view) != 0 and view[0] in Network.COMPRESSION_IDS:
+                _, _, decompress = Network.COMPRESSION[Network.COMPRESSION_IDS[view[0]]]
+                view = memoryview(decompress(view[1:]))
+
+            if len(view) != 0 and view[0] == Network.FRAME:
+                ell = view[1] + 2
+                return [view[2:ell].tobytes().decode('utf-8'), view[ell:].tobytes()]
+
+            return pickle.loads(view)
+
+        return ErrorHandle.attempt_operation(_unpack, Exception, handler, True)
+
+    @staticmethod
+    def _send_buffers(k, buffers):
+        """ Helper method to send every byte of the given buffers through a socket, in order.
+        'send' may only send part of what it is given, so the remainder is sent until none is left.
+
+        :param k: Socket to send the buffers through.
+        :param buffers: List of buffers to send.
+        :return: None.
+        """
+        if not hasattr(k, 'sendmsg'):
+            k.sendall(b''.join(buffers))
+            return
+
+        views = [memoryview(b) for b in buffers if len(b) != 0]
+        while len(views) != 0:
+            # The number of buffers in a single call is bounded (IOV_MAX).
+            n = k.sendmsg(views[:512])
+
+            # Drop what was sent, and keep the unsent part of a partially sent buffer.
+            while n > 0 and n >= len(views[0]):
+                n -= len(views[0])
+                views.pop(0)
+            if n > 0:
+                views[0] = views[0][n:]
+
+    @staticmethod
+    def write_packets(k, packets):
+        """ Send formatted packets through the socket (or record these, for an outbox), in a
+        single scatter-gather operation where possible.
+
+        :param k: Socket to send the packets through.
+        :param packets: List of packets to send, each as a list of buffers (see Network.pack).
+        :return: None.
+        """
+        if hasattr(k, 'send_packets'):
+            k.send_packets(packets)
+        else:
+            Network._send_buffers(k, [b for packet in packets for b in packet])
+
+    @staticmethod
+    def write(k, message, o=None):
         """ Send a formatted packet through the socket. The packet consists of a prefixed message
         length, and the message itself.
 
         :param k: Socket to send the message through.
         :param message: Message to send to socket.
+        :param o: Optional dictionary of tuning options, to compress the message with.
         :return: None.
         """
-        packet = pickle.dumps(message)
-        packet = struct.pack('!I', len(packet)) + packet
+        Network.write_packets(k, [Network.pack(message, o)])
+
+    @staticmethod
+    def _receive_into(k, view):
+        """ Helper method to fill the given buffer from a socket. 'recv_into' may return fewer
+        bytes than requested, so this reads until the buffer is full.
+
+        :param k: Socket to receive the bytes through.
+        :param view: Memoryview of the buffer to fill.
+        :return: False if the other end closed the connection before the buffer was filled.
+            True otherwise.
+        """
+        while len(view) != 0:
+            n = k.recv_into(view)
+            if n == 0:
+                return False
+            view = view[n:]
 
-        # Send our message through the socket.
-        k.send(packet)
+        return True
 
     @staticmethod
     def read(k, handler=ErrorHandle.default_handler):
@@ -112,12 +508,215 @@ class Network:
         :return: A string containing the error if the message cannot be read. Otherwise,
             the message sent by the other end of the socket.
         """
-        # Read our socket for the length.
-        buf = b''
-        while len(buf) < 4:
-            buf += k.recv(4 - len(buf))
-        ell = struct.unpack('!I', buf)[0]
+        # Read our socket for the length, then the packet into a buffer of exactly that length.
+        # Stop if the other end has closed the connection.
+        header, buf = bytearray(4), None
+        is_read = Network._receive_into(k, memoryview(header))
+        if is_read:
+            buf = bytearray(struct.unpack('!I', header)[0])
+            is_read = Network._receive_into(k, memoryview(buf))
+        if not is_read:
+            handler(ConnectionResetError('Connection closed by peer.'))
+            return ErrorHandle.wrap_error_tag('Connection closed by peer.')
+
+        # Unwrap our packet and return the result (error or not).
+        return Network.unpack(buf, handler)
+
+    @staticmethod
+    def read_batches(k, handler=ErrorHandle.default_handler):
+        """ Generator over the batches of a batched ('F') response. Operation code 'FS' marks a
+        batch with more to follow, and 'FZ' marks the last batch.
+
+        :param k: Socket to receive the batches through.
+        :param handler: Handler to use if a message cannot be read, or is an error.
+        :return: Iterator of lists of tuples. Stops early if an error is passed to the handler.
+        """
+        operation = 'FS'
+        while operation != 'FZ':
+            a = ErrorHandle.act_upon_error(Network.read(k, handler), handler, True)
+            if a is None:
+                return
+
+            operation, resultant = a
+            yield Columnar.unwrap(resultant)
+
+    @staticmethod
+    def read_tuples(k, handler=ErrorHandle.default_handler):
+        """ Generator over the individual tuples of a batched ('F') response.
+
+        :param k: Socket to receive the tuples through.
+        :param handler: Handler to use if a message cannot be read, or is an error.
+        :return: Iterator of tuples. Stops early if an error is passed to the handler.
+        """
+        for batch in Network.read_batches(k, handler):
+            yield from batch
+
+    @staticmethod
+    async def write_async(writer, message, o=None):
+        """ Asynchronous counterpart of 'write', using an asyncio stream. The packet is formatted
+        in the same manner.
+
+        :param writer: Stream writer to send the message through.
+        :param message: Message to send to the stream.
+        :param o: Optional dictionary of tuning options, to compress the message with.
+        :return: None.
+        """
+        writer.writelines(Network.pack(message, o))
+
+        # Wait for the stream buffer to drain.
+        await writer.drain()
+
+    @staticmethod
+    async def read_async(reader, handler=ErrorHandle.default_handler):
+        """ Asynchronous counterpart of 'read', using an asyncio stream. The event loop is free to
+        serve other connections while the packet arrives.
+
+        :param reader: Stream reader to receive the message through.
+        :param handler: Handler to use if the message cannot be read.
+        :return: A string containing the error if the message cannot be read. Otherwise,
+            the message sent by the other end of the stream.
+        """
+        # Read our stream for the length, then the packet itself.
+        ell = struct.unpack('!I', await reader.readexactly(4))[0]
+        packet = await reader.readexactly(ell)
+
+        # Return the unwrapped packet (error or not).
+        return Network.unpack(packet, handler)
+
+
+class Pool:
+    """
+    Persistent client connections, keyed by host and port. Requests are sent through these as
+    multiplexed ('M') requests, so a single connection carries many requests (several at once, if
+    these are pipelined). Every request tells the daemon to close the connection once it has been
+    idle for IDLE seconds, so an idle connection is only reused within most of this.
+    """
+
+    # Number of seconds a daemon keeps an idle pooled connection open. Clients set this from the
+    # 'pool.idle' option.
+    IDLE = 30.0
+
+    # Fraction of IDLE within which an idle connection is reused. The rest is a margin for the
+    # daemon closing the connection before the client sends the next request.
+    REUSE = 0.9
+
+    # Idle connections, as lists of [socket, time-released] lists by (host, port).
+    _idle = {}
+    _lock = Lock()
+
+    @staticmethod
+    def _acquire(host, port):
+        """ Helper method to take an idle connection to the given host out of the pool.
+
+        :param host: Host of the connection.
+        :param port: Port of the connection.
+        :return: A connected socket, or None if no idle connection can be reused.
+        """
+        with Pool._lock:
+            idle = Pool._idle.get((host, port), [])
+            while len(idle) != 0:
+                sock, released = idle.pop()
+                if time.monotonic() - released < Pool.IDLE * Pool.REUSE:
+                    return sock
+                sock.close()
+
+        return None
+
+    @staticmethod
+    def _release(host, port, sock):
+        """ Helper method to return a connection to the pool, for the next request to reuse.
+
+        :param host: Host of the connection.
+        :param port: Port of the connection.
+        :param sock: Socket of the connection.
+        :return: None.
+        """
+        with Pool._lock:
+            Pool._idle.setdefault((host, port), []).append([sock, time.monotonic()])
+
+    @staticmethod
+    def _exchange(sock, rs):
+        """ Helper method to send every request through a connection at once, and collect the
+        response of each.
+
+        :param sock: Socket of the connection.
+        :param rs: List of command lists to send.
+        :return: The list of responses, and a flag that is True if any response has arrived. Each
+            response is the list of messages sent for that request. If the connection fails, an
+            error string is returned in place of the responses.
+        """
+        responses, is_answered = [None for _ in rs], False
+        try:
+            Network.write_packets(sock, [Network.pack(['M', i, r, Pool.IDLE])
+                                         for i, r in enumerate(rs)])
+
+            for _ in rs:
+                # Each response is a header, followed by the messages of the response.
+                a = Network.read(sock)
+                if ErrorHandle.is_error(a):
+                    return a, is_answered
+
+                operation, i, n = a
+                responses[i], is_answered = [Network.read(sock) for _ in range(n)], True
+
+        except (OSError, ValueError) as e:
+            return ErrorHandle.wrap_error_tag(e), is_answered
+
+        return responses, is_answered
+
+    @staticmethod
+    def requests(host, port, rs, handler=ErrorHandle.default_handler):
+        """ Send many requests to a daemon through a pooled connection, without waiting for each
+        response before sending the next. Operations that read additional messages from the
+        connection (YS, W) cannot be sent this way.
+
+        :param host: Host to send the requests to.
+        :param port: Port of the host, given as a string.
+        :param rs: List of command lists to send.
+        :param handler: Handler to use if a connection cannot be established or fails.
+        :return: String containing the error if a connection cannot be used. Otherwise, the list
+            of responses in the order of the requests. Each response is the list of messages sent
+            for that request.
+        """
+        sock = Pool._acquire(host, port)
+        if sock is not None:
+            responses, is_answered = Pool._exchange(sock, rs)
+            if not ErrorHandle.is_error(responses):
+                Pool._release(host, port, sock)
+                return responses
+
+            # The daemon may have closed this connection while idle. Retry on a new one, unless
+            # the daemon has already started answering.
+            sock.close()
+            if is_answered:
+                handler(responses)
+                return responses
+
+        sock = Network.open_client(host, port, handler)
+        if ErrorHandle.is_error(sock):
+            return sock
+
+        responses, is_answered = Pool._exchange(sock, rs)
+        if ErrorHandle.is_error(responses):
+            sock.close()
+            handler(responses)
+        else:
+            Pool._release(host, port, sock)
+
+        return responses
+
+    @staticmethod
+    def request(host, port, r, handler=ErrorHandle.default_handler):
+        """ Send a single request to a daemon through a pooled connection. This is meant for
+        operations that respond once.
+
+        :param host: Host to send the request to.
+        :param port: Port of the host, given as a string.
+        :param r: Command list to send.
+        :param handler: Handler to use if a connection cannot be established or fails.
+        :return: String containing the error if a connection cannot be used. Otherwise, the
+            (first) message sent in response.
+        """
+        responses = Pool.requests(host, port, [r], handler)
 
-        # Read our packet and return the result (error or not).
-        return ErrorHandle.attempt_operation(lambda: pickle.loads(k.recv(ell)),
-                                             Exception, handler, True)
+        return responses if ErrorHandle.is_error(responses) else responses[0][0]
@@ -3,14 +3,20 @@
 Contains functions to run tasks in parallel, be it through threads or processes.
 
 Usage: Parallel.execute_n(iterable, operation, argument_constructor)
-       Parallel.execute_nm(outer_iterable, inner_iterable, operation, argument_constructor)
+       Parallel.execute_nm(outer_iterable, inner_iterable, operation, argument_constructor,
+                           predicate)
+
+       Parallel.prefetch(iterable, depth)
 
        Parallel.spawn_process(operation, argument_list)
+       Parallel.maintain_pool(pool_size, operation, argument_list)
        Parallel.check_children()
 """
 
 from multiprocessing import Process, active_children
-from threading import Thread
+from multiprocessing.connection import wait
+from queue import Queue, Full
+from threading import Event, Thread
 
 
 class Parallel:
@@ -20,6 +26,9 @@ class Parallel:
     tasks.
     """
 
+    # Number of seconds a prefetching thread waits on a full queue before checking for a stop.
+    POLL = 0.5
+
     @staticmethod
     def execute_n(n, operation, argument_constructor):
         """ Execute some operation on every element in some list. The specifics on how the
@@ -41,7 +50,7 @@ class Parallel:
         [d.join() for d in threads]
 
     @staticmethod
-    def execute_nm(n, m, operation, argument_constructor):
+    def execute_nm(n, m, operation, argument_constructor, predicate=lambda i, j, b_1, b_2: True):
         """ Execute some operation on every element in two lists. List M specifies items that can
         be run in parallel for some element in list N. The specifics on how the arguments are
         presented to the operation are detailed in 'argument_constructor'.
@@ -50,6 +59,8 @@ class Parallel:
         :param m: Inner iterable to pass elements to the given operation. This is **parallel**.
         :param operation: Operation to execute in parallel.
         :param argument_constructor: Creates the argument tuple given elements from n and m.
+        :param predicate: Given the same arguments as 'argument_constructor', determines if the
+            operation should be executed for this pair of elements. Defaults to every pair.
         :return: None.
         """
         threads = []
@@ -57,12 +68,72 @@ class Parallel:
         # Iterate through N, for every M, and construct the appropriate thread.
         for i, b_1 in enumerate(n):
             for j, b_2 in enumerate(m):
+                if not predicate(i, j, b_1, b_2):
+                    continue
+
                 threads.append(Thread(target=operation, args=argument_constructor(i, j, b_1, b_2)))
                 threads[-1].start()
 
             # Wait for every b_1 thread set to finish.
             [d.join() for d in threads]
 
+    @staticmethod
+    def prefetch(iterable, depth):
+        """ Iterate through some iterable in another thread, while the caller consumes the
+        elements already produced. At most 'depth' elements are held at once, so a fast producer
+        waits for a slow consumer. Exceptions raised by the producer are raised to the consumer.
+        If the consumer stops early (e.g. it raises), the producer stops at its next element.
+
+        :param iterable: Iterable to produce elements from (e.g. reading from a socket).
+        :param depth: Maximum number of produced elements that have not been consumed.
+        :return: Iterator of the elements of the iterable, in order.
+        """
+        q, end, stop = Queue(depth), object(), Event()
+
+        def _put(item):
+            """ Put an element into our queue, waiting while it is full. Gives up once the
+            consumer has stopped, instead of waiting forever.
+
+            :param item: Pair of the element (or end marker) and the exception raised, if any.
+            :return: True if the element was put. False if the consumer has stopped.
+            """
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=Parallel.POLL)
+                    return True
+                except Full:
+                    pass
+
+            return False
+
+        def _produce():
+            """ Put every element of the iterable into our queue, followed by the end marker (or
+            the exception that was raised).
+
+            :return: None.
+            """
+            try:
+                for b in iterable:
+                    if not _put((b, None)):
+                        return
+                _put((end, None))
+            except Exception as e:
+                _put((end, e))
+
+        Thread(target=_produce, daemon=True).start()
+        try:
+            while True:
+                b, e = q.get()
+                if e is not None:
+                    raise e
+                elif b is end:
+                    return
+
+                yield b
+        finally:
+            # Release the producer, whether every element was consumed or not.
+            stop.set()
+
     @staticmethod
     def spawn_process(operation, arguments):
         """ Execute some operation given an argument tuple as another process (not a thread).
@@ -70,11 +141,36 @@ class Parallel:
 
         :param operation: Operation to execute in parallel.
         :param arguments: Arguments tuple to pass to the current operation.
-        :return: None.
+        :return: The process that was started.
         """
         p = Process(target=operation, args=arguments)
         p.start()
 
+        return p
+
+    @staticmethod
+    def maintain_pool(n, operation, arguments):
+        """ Keep a fixed-size pool of processes alive, all executing the same operation with the
+        same argument tuple. If a process in the pool dies, another is spawned in its place. This
+        never returns, and is meant to be used by the parDBd daemon.
+
+        :param n: Number of processes to keep alive.
+        :param operation: Operation each process executes. This is meant to loop forever.
+        :param arguments: Arguments tuple to pass to the operation.
+        :return: None.
+        """
+        pool = [Parallel.spawn_process(operation, arguments) for _ in range(n)]
+
+        while True:
+            # Block until at least one process in our pool has died.
+            dead = wait([p.sentinel for p in pool])
+
+            # Replace each dead process with a new one.
+            for i, p in enumerate(pool):
+                if p.sentinel in dead:
+                    p.join()
+                    pool[i] = Parallel.spawn_process(operation, arguments)
+
     @staticmethod
     def check_children():
         """ List of active processes spawned from the current process. This implicitly calls the
@@ -0,0 +1,348 @@
+# coding=utf-8
+"""
+Contains functions to reason about how tables are partitioned across the cluster, using the
+partition dictionaries returned by the catalog node. Given a partitioning method PARTMTD, a node
+holds the following values of the partitioned column:
+
+PARTMTD : 0 -> Every value (the table is not partitioned, and exists in full on every node).
+        : 1 -> Values in the range: partparam1 < value <= partparam2.
+        : 2 -> Values where: ( value mod partparam1 ) + 1 = nodeid.
+
+Usage: Partition.is_full(partition_dictionaries)
+       Partition.is_partitioned_on(partition_dictionaries, column)
+       Partition.is_overlap(partition_dictionary_1, partition_dictionary_2)
+       Partition.join_pairs(partition_dictionaries_1, partition_dictionaries_2, columns)
+       Partition.colocated_uris(partition_dictionaries_1, partition_dictionaries_2, pairs)
+       Partition.bucket(value, number_of_buckets)
+
+       Partition.reservoir(values, sample_size)
+       Partition.equi_depth(sample, number_of_nodes)
+       Partition.sort_ranges(range_bounds)
+       Partition.route_indices(chunk, routing_dictionary)
+       Partition.route(chunk, routing_dictionary)
+       Partition.owners(chunk, routing_dictionary)
+       Partition.moves(chunk, repartitioning_dictionary)
+"""
+
+import random
+import zlib
+from bisect import bisect_left
+from math import floor, gcd
+from operator import itemgetter
+
+
+class Partition:
+    """
+    All operations on the partitioning of a table. A table is described by the list of partition
+    dictionaries of its nodes, as returned by RemoteCatalog.return_partitions.
+    """
+
+    @staticmethod
+    def _bounds(p):
+        """ Helper method to parse the range of a range partition.
+
+        :param p: Partition dictionary of a range partitioned node.
+        :return: The lower (exclusive) and upper (inclusive) bounds of the node as floats.
+        """
+        return float(p['param1']), float(p['param2'])
+
+    @staticmethod
+    def _modulus(p):
+        """ Helper method to parse the modulus of a hash partition.
+
+        :param p: Partition dictionary of a hash partitioned node.
+        :return: The modulus used by the hash function, as an integer.
+        """
+        return int(float(p['param1']))
+
+    @staticmethod
+    def is_full(ps):
+        """ Determine if a table is not partitioned, i.e. it exists in full on every node.
+
+        :param ps: List of partition dictionaries of the table.
+        :return: True if every node holds the entire table. False otherwise.
+        """
+        return len(ps) != 0 and all(p['partmtd'] == 0 for p in ps)
+
+    @staticmethod
+    def is_partitioned_on(ps, column):
+        """ Determine if a table is range or hash partitioned on the given column.
+
+        :param ps: List of partition dictionaries of the table.
+        :param column: Name of the column to check (case insensitive).
+        :return: True if every node is range or hash partitioned on the column. False otherwise.
+        """
+        return len(ps) != 0 and all(p['partmtd'] in [1, 2] and p['partcol'] is not None and
+                                    p['partcol'].upper() == column.upper() for p in ps) and \
+            len(set(p['partmtd'] for p in ps)) == 1
+
+    @staticmethod
+    def is_overlap(p_1, p_2):
+        """ Given two nodes partitioned on columns that are compared for equality, determine if
+        there can exist a value held by both nodes.
+
+        :param p_1: Partition dictionary of the first node.
+        :param p_2: Partition dictionary of the second node.
+        :return: True if the two nodes may hold a common value. False otherwise.
+        """
+        if p_1['partmtd'] == 1 and p_2['partmtd'] == 1:
+            # Two ranges overlap if the greater floor is below the lesser ceiling.
+            (a_1, b_1), (a_2, b_2) = Partition._bounds(p_1), Partition._bounds(p_2)
+            return max(a_1, a_2) < min(b_1, b_2)
+
+        elif p_1['partmtd'] == 2 and p_2['partmtd'] == 2:
+            # Two residues can share a value iff they agree modulo the GCD of both moduli.
+            m_1, m_2 = Partition._modulus(p_1), Partition._modulus(p_2)
+            return (p_1['nodeid'] - p_2['nodeid']) % gcd(m_1, m_2) == 0
+
+        # Otherwise, one node is range partitioned and the other is hash partitioned.
+        p_r, p_h = (p_1, p_2) if p_1['partmtd'] == 1 else (p_2, p_1)
+        (a, b), m = Partition._bounds(p_r), Partition._modulus(p_h)
+        if a == -float('inf') or b == float('inf'):
+            return True
+
+        # Check every integer in the range, unless the range covers every residue.
+        lower, upper = floor(a) + 1, floor(b)
+        if upper - lower + 1 >= m:
+            return True
+        return any(v % m + 1 == p_h['nodeid'] for v in range(lower, upper + 1))
+
+    @staticmethod
+    def join_pairs(ps_1, ps_2, columns):
+        """ Determine which pairs of nodes must be joined for an equi-join between two tables. If
+        a table is not partitioned, only one of its nodes (preferably one shared with the other
+        table) is used. If both tables are partitioned on a pair of joined columns, pairs of nodes
+        that cannot hold a common value are skipped. Otherwise, every pair is joined.
+
+        :param ps_1: List of partition dictionaries of the first table.
+        :param ps_2: List of partition dictionaries of the second table.
+        :param columns: List of joined columns, as [column_of_table_1, column_of_table_2] lists.
+        :return: Set of (i, j) pairs, each indexing into ps_1 and ps_2 respectively.
+        """
+        all_pairs = set((i, j) for i in range(len(ps_1)) for j in range(len(ps_2)))
+        is_full = Partition.is_full
+        nearest = lambda p, ps: next((j for j, q in enumerate(ps) if q['uri'] == p['uri']), 0)
+
+        # If a table exists in full on every node, any single copy of it is enough.
+        if is_full(ps_1) and is_full(ps_2):
+            return {(0, nearest(ps_1[0], ps_2))}
+        elif is_full(ps_2):
+            return set((i, nearest(p, ps_2)) for i, p in enumerate(ps_1))
+        elif is_full(ps_1):
+            return set((nearest(p, ps_1), j) for j, p in enumerate(ps_2))
+
+        # Otherwise, prune using the first pair of joined columns both tables are partitioned on.
+        for c_1, c_2 in columns:
+            if Partition.is_partitioned_on(ps_1, c_1) and Partition.is_partitioned_on(ps_2, c_2):
+                return set((i, j) for i, j in all_pairs if Partition.is_overlap(ps_1[i], ps_2[j]))
+
+        return all_pairs
+
+    @staticmethod
+    def colocated_uris(ps_1, ps_2, pairs):
+        """ Determine if every pair of nodes that must be joined refers to the same node (i.e. the
+        same database file on the same daemon). This holds when both tables share a partitioning
+        scheme on their joined columns, or when one table exists in full on every node of the
+        other. The join can then be executed on each node without shipping any tables.
+
+        :param ps_1: List of partition dictionaries of the first table.
+        :param ps_2: List of partition dictionaries of the second table.
+        :param pairs: Set of (i, j) pairs to join, as returned by 'join_pairs'.
+        :return: An empty list if some pair spans two nodes. Otherwise, the node URIs to execute
+            the join on.
+        """
+        if any(ps_1[i]['uri'] != ps_2[j]['uri'] for i, j in pairs):
+            return []
+
+        return sorted(set(ps_1[i]['uri'] for i, j in pairs))
+
+    @staticmethod
+    def bucket(v, n):
+        """ Determine the bucket of a value for a shuffle (hash repartitioning). Every node must
+        agree on the bucket of equal values, so Python's (salted) hash is not used. Integers (and
+        integral reals) use the same mod-based hashing as hash partitioning, and all other values
+        use their CRC32. NULLs never match, and are sent to the first bucket.
+
+        :param v: Value of the column being shuffled on.
+        :param n: Number of buckets.
+        :return: The bucket index of the value, in the range [0, n).
+        """
+        if isinstance(v, float) and v.is_integer():
+            v = int(v)
+
+        if isinstance(v, int):
+            return v % n
+        elif v is None:
+            return 0
+        elif isinstance(v, bytes):
+            return zlib.crc32(v) % n
+        else:
+            return zlib.crc32(str(v).encode('utf-8')) % n
+
+    @staticmethod
+    def reservoir(values, k):
+        """ Draw a uniform sample of (at most) 'k' values from an iterator of unknown length, in a
+        single pass that holds only the sample. The 'i'th value replaces a random value of the
+        sample with probability k / i.
+
+        :param values: Iterator of values to sample.
+        :param k: Number of values to sample.
+        :return: List of the sampled values, in no particular order.
+        """
+        sample = []
+        for i, v in enumerate(values):
+            if i < k:
+                sample.append(v)
+            else:
+                j = random.randrange(i + 1)
+                if j < k:
+                    sample[j] = v
+
+        return sample
+
+    @staticmethod
+    def equi_depth(sample, n):
+        """ Determine the bounds of 'n' ranges that each hold about the same number of values of
+        the given sample. The first range has no lower bound, and the last has no upper bound, so
+        every value falls in exactly one range. A value that makes up more than one range's share
+        of the sample cannot be split, so some ranges may be empty.
+
+        :param sample: List of values (of the partitioned column) to split.
+        :param n: Number of ranges (nodes).
+        :return: List of ranges, as (lower, upper) bounds, from lower to higher.
+        """
+        s, m = sorted(sample), len(sample)
+        cuts = [float(s[m * i // n - 1]) if m * i // n > 0 else -float('inf')
+                for i in range(1, n)]
+
+        return list(zip([-float('inf')] + cuts, cuts + [float('inf')]))
+
+    @staticmethod
+    def sort_ranges(r_bounds):
+        """ Sort the ranges of a range partitioning by their upper bound, so the range a value
+        falls in may be found through a binary search. This is only possible if no two ranges
+        overlap.
+
+        :param r_bounds: List of ranges, as (lower, upper) bounds, in the same order as the nodes.
+        :return: None if any two ranges overlap. Otherwise, the lower bounds, the upper bounds,
+            and the node index of each range, all in the order of the upper bounds.
+        """
+        order = sorted(range(len(r_bounds)), key=lambda j: r_bounds[j][1])
+        lowers, uppers = [r_bounds[j][0] for j in order], [r_bounds[j][1] for j in order]
+        if any(lowers[j + 1] < uppers[j] for j in range(len(order) - 1)):
+            return None
+
+        return lowers, uppers, order
+
+    @staticmethod
+    def route_indices(chunk, p):
+        """ Determine the node(s) each row of a chunk (of CSV rows) belongs to, given a hash or
+        range partitioning. The partitioned column of the entire chunk is extracted and converted
+        at once. Ranges that do not overlap are searched through by bisection, so routing does
+        not grow with the number of nodes. NULLs (which only rows of a table may hold) belong to
+        the first node, as these are sent to the first bucket of a shuffle (see 'bucket').
+
+        :param chunk: List of rows to route.
+        :param p: Routing dictionary (see 'route').
+        :return: List of the indices (into the chunk) of the rows of each node.
+        """
+        values = list(map(itemgetter(p['y']), chunk))
+        indices = [[] for _ in range(p['n'])]
+
+        # Set aside the rows without a value, and convert the rest.
+        rows, nulls = range(len(chunk)), []
+        if None in values:
+            nulls = [i for i, v in enumerate(values) if v is None]
+            rows = [i for i, v in enumerate(values) if v is not None]
+            values = [values[i] for i in rows]
+        keys = list(map(int, values))
+
+        # The hash function X = ( partcol mod partparam1 ) + 1 gives us the node (less one).
+        if p['partmtd'] == 2:
+            m = p['param1']
+            for i, j in zip(rows, [k % m for k in keys]):
+                indices[j].append(i)
+
+        # Search for the single range each value could fall in.
+        elif p['sorted'] is not None:
+            (lowers, uppers, order), r = p['sorted'], len(p['bounds'])
+            for i, k in zip(rows, keys):
+                j = bisect_left(uppers, k)
+                if j < r and lowers[j] < k:
+                    indices[order[j]].append(i)
+
+        # Ranges overlap. Each value may fall in any number of these.
+        else:
+            for i, k in zip(rows, keys):
+                for j, bounds in enumerate(p['bounds']):
+                    if bounds[0] < k <= bounds[1]:
+                        indices[j].append(i)
+
+        # Give the rows without a value to the first node.
+        if len(nulls) != 0:
+            indices[0] = sorted(indices[0] + nulls)
+
+        return indices
+
+    @staticmethod
+    def route(chunk, p):
+        """ Split a chunk of rows (of a CSV being loaded) into the rows of each node. The
+        partitioning is described by a plain routing dictionary, so it may be handed to a worker
+        process or sent to a node.
+
+        :param chunk: List of rows to route.
+        :param p: Routing dictionary. 'partmtd' is the partitioning method, 'n' is the number of
+            nodes, 'y' is the index of the partitioned column, 'param1' is the hash modulus,
+            'bounds' is the list of ranges, and 'sorted' is the result of 'sort_ranges' on these.
+        :return: List of the rows of each node, in the same order as the nodes.
+        """
+        # There exists no partitioning. Send each tuple to every node.
+        if p['partmtd'] == 0:
+            return [chunk for _ in range(p['n'])]
+
+        # Otherwise, send each tuple to the node(s) it belongs to.
+        return [list(map(chunk.__getitem__, x)) for x in Partition.route_indices(chunk, p)]
+
+    @staticmethod
+    def owners(chunk, p):
+        """ Determine the node(s) each row of a chunk belongs to. This is the inverse of
+        'route_indices', and also holds for tables that are not partitioned.
+
+        :param chunk: List of rows to route.
+        :param p: Routing dictionary (see 'route').
+        :return: List of the (ascending) node indices of each row, in the same order as the rows.
+        """
+        if p['partmtd'] == 0:
+            return [list(range(p['n'])) for _ in chunk]
+
+        owners = [[] for _ in chunk]
+        for j, indices in enumerate(Partition.route_indices(chunk, p)):
+            for i in indices:
+                owners[i].append(j)
+
+        return owners
+
+    @staticmethod
+    def moves(chunk, m):
+        """ Determine the new node(s) each row of a chunk must be sent to by the node holding it,
+        when its table is repartitioned. A row is only sent to the new nodes that do not hold it
+        already, and only by the first of its current nodes, so no node receives a row twice. A
+        row that the current partitioning does not place on the sending node is taken to be held
+        by that node alone.
+
+        :param chunk: List of rows (of the sending node) to route.
+        :param m: Repartitioning dictionary. 'old' and 'new' are the routing dictionaries of the
+            current and the new partitioning, 'map' is the new index of each current node (None
+            if it is being removed), and 'i' is the current index of the sending node.
+        :return: List of the new node indices each row must be sent to, in the same order as the
+            rows.
+        """
+        moves, olds = [], Partition.owners(chunk, m['old'])
+        for held, owned in zip(olds, Partition.owners(chunk, m['new'])):
+            held = held if m['i'] in held else [m['i']]
+            if held[0] != m['i']:
+                moves.append([])
+            else:
+                moves.append([j for j in owned if j not in [m['map'][k] for k in held]])
+
+        return moves
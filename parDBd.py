@@ -7,24 +7,76 @@ OP : 'YS' -> Execute an insertion SQL statement, and wait for additional stateme
    : 'YZ' -> Execute a SQL statement, and don't wait for additional statements.
    : 'YY' -> Don't execute a SQL statement, and don't wait for additional statements.
    : 'YX' -> Rollback to the last stable state.
+   : 'L' -> Insert batches of tuples into a table within a single transaction (or one per
+            checkpoint), acknowledging each batch as it is stored.
+   : 'I' -> Parse a CSV readable from this node, and insert the tuples this node owns into a
+            table within a single transaction.
    : 'E' -> Execute a SQL statement and return tuples if applicable.
+   : 'F' -> Execute a SQL statement and return tuples in batches, if applicable.
+   : 'H' -> Return the tuples of a table that pass a Bloom filter (and an optional pushed down
+            filter), in batches.
    : 'C' -> Record a DDL to the catalog database.
    : 'K' -> Record partitioning information to the catalog database.
    : 'U' -> Lookup the node URIs on the catalog database and return these.
+   : 'Q' -> Lookup the node URIs and their partitioning on the catalog database and return these.
    : 'P' -> Lookup the fields for a given table and return this.
+   : 'R' -> Count the tuples of a given table and return this.
    : 'B' -> Ship a given table to the current node.
-
-Usage: python parDBd.py [hostname] [port]
+   : 'X' -> Hash partition (or broadcast) a given table, and send each bucket to the node that
+            owns it.
+   : 'W' -> Store a bucket of an exchange, sent from a remote node.
+   : 'A' -> Switch a table to a new partitioning within a single transaction, once the tuples
+            whose nodes change have been exchanged.
+   : 'M' -> Execute a request sent through a pooled connection, and keep the connection open
+            for the requests that follow. Each response is prefixed with the request ID.
+
+The daemon runs in one of the following modes, given as the optional third argument:
+
+MODE : 'fork' -> Spawn a new process for every accepted connection (default).
+     : 'prefork' -> Spawn a fixed pool of worker processes once. Each worker accepts connections
+                    off the shared listening socket and handles them itself.
+     : 'async' -> Serve every connection from a single asyncio event loop. Blocking SQLite work
+                  is handed off to a bounded pool of worker threads.
+
+The optional fourth argument is the number of workers to use with 'prefork' or 'async' (defaults
+to the number of CPUs), and the optional fifth is the listen backlog of the socket (defaults to
+the system maximum).
+
+Usage: python parDBd.py [hostname] [port] [mode] [workers] [backlog]
 """
 
+import asyncio
+import csv
+import re
+import select
+import socket
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import cpu_count
 
+from lib.bloom import Bloom
 from lib.catalog import LocalCatalog
 from lib.database import Database
-from lib.dissect import SQLFile, ClusterCFG
+from lib.dissect import SQLFile, ClusterCFG, CSVFile
 from lib.error import ErrorHandle
-from lib.network import Network
+from lib.network import Columnar, Network, Outbox, Pool
 from lib.parallel import Parallel
+from lib.partition import Partition
+
+
+def begin_load(conn, state, s, o, handler):
+    """ Helper method to prepare a connection for a load into the table of the given insertion
+    SQL, as asked for by the options of the request (see Database.begin_load).
+
+    :param conn: Connection to the database being loaded.
+    :param state: Empty dictionary to keep the state of the load in.
+    :param s: Insertion SQL of the load.
+    :param o: Dictionary of tuning options of the request.
+    :param handler: Handler to use if the indexes of the table cannot be dropped.
+    :return: None.
+    """
+    tname = SQLFile.table(s) if o['indexes'] == 'rebuild' else None
+    Database.begin_load(conn, state, o, None if ErrorHandle.is_error(tname) else tname, handler)
 
 
 def execute_prepared(k_n, r):
@@ -51,7 +103,8 @@ def execute_prepared(k_n, r):
 
 def execute_multiple_prepared(k_n, r):
     """ Perform the given insertion SQL operation on the passed database. Wait for the
-    terminating 'YZ' and 'YY' operation codes.
+    terminating 'YZ' and 'YY' operation codes. The load is prepared as given in the optional
+    options dictionary of the command list (see Database.begin_load).
 
     :param k_n: Socket connection to send response through.
     :param r: Command list passed through the same socket.
@@ -59,10 +112,15 @@ def execute_multiple_prepared(k_n, r):
     """
     f, s, tup, r_i, is_commit = r[1], r[2], r[3], r, True
     net_handler = lambda e_n: Network.close_wrapper(e_n, ErrorHandle.raise_handler, k_n)
+    o = ClusterCFG.default_options()
+    o.update(r[4] if len(r) > 4 else {})
 
     # Create our connection.
     conn, cur = Database.connect(f, ErrorHandle.raise_handler)
-    sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn)
+    state = {}
+    sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn,
+                                                        state)
+    begin_load(conn, state, s, o, sql_handler)
 
     while True:
         # Execute the command. Return the error if any exist.
@@ -76,6 +134,7 @@ def execute_multiple_prepared(k_n, r):
         if result[0] == 'YY':
             break
         elif result[0] == 'YZ':
+            f, s, tup = result[1], result[2], result[3]
             ErrorHandle.act_upon_error(Database.execute(cur, s, sql_handler, tup), net_handler)
             break
         elif result[0] == 'YX':
@@ -85,19 +144,151 @@ def execute_multiple_prepared(k_n, r):
             f, s, tup = result[1], result[2], result[3]
 
     # Commit our changes (if desired) and close our connection.
-    conn.commit() if is_commit else None, conn.close()
+    Database.end_load(conn, state, is_commit, sql_handler), conn.close()
     Network.write(k_n, ['EY', 'Success'])
 
 
+def store_batch(conn, s, key, result, handler):
+    """ Helper method for the bulk load procedure. Store a batch of tuples ('LS'), or record a
+    checkpoint ('LC') and commit every batch stored before it.
+
+    :param conn: Connection to the database being loaded.
+    :param s: Prepared insertion SQL to execute for every tuple.
+    :param key: Key of the load, if it is checkpointed (see Database.read_checkpoint).
+    :param result: 'LS' or 'LC' message to act upon.
+    :param handler: Handler to use if the batch or the checkpoint cannot be stored.
+    :return: None.
+    """
+    if result[0] == 'LS':
+        Database.executemany(conn.cursor(), s, Columnar.unwrap(result[1]), handler)
+    else:
+        Database.checkpoint(conn, key, result[1], handler)
+
+
+def execute_bulk_load(k_n, r):
+    """ Insert every batch of a bulk load into the passed database, within a single transaction.
+    Each batch ('LS') is acknowledged once stored, with the number of batches stored so far, so
+    the client may send several batches before waiting on any. The load ends with 'LZ' to commit,
+    or 'LX' to roll back, optionally preceded by 'LP' to rebuild any dropped indexes first. The
+    load is prepared as given in the optional options dictionary of the command list (see
+    Database.begin_load).
+
+    If the command list holds the key of a checkpointed load, the offset of its last checkpoint
+    is sent first. Each checkpoint ('LC') commits every batch before it, and is acknowledged as a
+    batch is. Indexes are then kept, as these could not be rebuilt before each commit.
+
+    :param k_n: Socket connection to send response through.
+    :param r: Command list passed through the same socket.
+    :return: None.
+    """
+    f, s, stored, o = r[1], r[2], 0, ClusterCFG.default_options()
+    net_handler = lambda e_n: Network.close_wrapper(e_n, ErrorHandle.raise_handler, k_n)
+    o.update(r[3] if len(r) > 3 else {})
+    key = r[4] if len(r) > 4 else None
+
+    # Create our connection.
+    conn, cur = Database.connect(f, ErrorHandle.raise_handler)
+    state = {}
+    sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn,
+                                                        state)
+    if key is not None:
+        Network.write(k_n, ['EL', Database.read_checkpoint(conn, key, sql_handler)])
+        o['indexes'] = 'keep'
+    begin_load(conn, state, s, o, sql_handler)
+
+    # Store every batch as it arrives, until the load is committed or rolled back.
+    result = ErrorHandle.act_upon_error(Network.read(k_n, net_handler), net_handler, True)
+    while result[0] in ['LS', 'LC']:
+        store_batch(conn, s, key, result, sql_handler)
+        stored += 1
+        Network.write(k_n, ['EL', stored])
+        result = ErrorHandle.act_upon_error(Network.read(k_n, net_handler), net_handler, True)
+
+    # Rebuild our indexes if asked to prepare, so the load can no longer fail on commit.
+    if result[0] == 'LP':
+        Database.rebuild_indexes(conn, state, sql_handler)
+        Network.write(k_n, ['EL', 'Success'])
+        result = ErrorHandle.act_upon_error(Network.read(k_n, net_handler), net_handler, True)
+
+    Database.end_load(conn, state, result[0] == 'LZ', sql_handler)
+    conn.close()
+    Network.write(k_n, ['EL', 'Success'])
+
+
+def store_csv(cur, s, r, o, handler):
+    """ Parse the CSV of an ingest ('I'), and insert the tuples this node owns in chunks of
+    'rows' rows. The CSV is never held in memory.
+
+    :param cur: Cursor to the database to insert into.
+    :param s: Prepared insertion SQL to execute for every tuple.
+    :param r: Command list of the ingest.
+    :param o: Dictionary of tuning options of the ingest.
+    :param handler: Handler to use if the CSV cannot be read, routed or stored.
+    :return: The number of tuples stored.
+    """
+    f_c, p, i = r[3], r[4], r[5]
+
+    def _store():
+        """ Route each chunk, and insert the tuples of the 'i'th node. """
+        stored = 0
+        with open(f_c, newline='') as csv_f:
+            for chunk in CSVFile.chunks(csv.reader(csv_f), o['rows']):
+                ts = Partition.route(chunk, p)[i]
+                Database.executemany(cur, s, ts, handler)
+                stored += len(ts)
+
+        return stored
+
+    return ErrorHandle.attempt_operation(_store, (OSError, ValueError, IndexError, csv.Error),
+                                         handler, True)
+
+
+def execute_ingest(k_n, r):
+    """ Insert the tuples of a CSV that is readable from this node into the passed database,
+    within a single transaction. Only the path of the CSV and how its tuples are routed (see
+    Partition.route) are sent, so the tuples never pass through the client. The number of tuples
+    stored is acknowledged, and the transaction is held open until the client commits ('IZ') or
+    rolls back ('IX'), so a load may span every node of the cluster. The load is prepared as given
+    in the optional options dictionary of the command list (see Database.begin_load).
+
+    :param k_n: Socket connection to send response through.
+    :param r: Command list passed through the same socket.
+    :return: None.
+    """
+    f, s, o = r[1], r[2], ClusterCFG.default_options()
+    net_handler = lambda e_n: Network.close_wrapper(e_n, ErrorHandle.raise_handler, k_n)
+    o.update(r[6] if len(r) > 6 else {})
+
+    # Create our connection.
+    conn, cur = Database.connect(f, ErrorHandle.raise_handler)
+    state = {}
+    sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn,
+                                                        state)
+    begin_load(conn, state, s, o, sql_handler)
+
+    # Store our tuples (rebuilding any indexes), and wait until the load is committed or rolled
+    # back.
+    stored = store_csv(cur, s, r, o, sql_handler)
+    Database.rebuild_indexes(conn, state, sql_handler)
+    Network.write(k_n, ['EI', stored])
+    result = ErrorHandle.act_upon_error(Network.read(k_n, net_handler), net_handler, True)
+
+    Database.end_load(conn, state, result[0] == 'IZ', sql_handler)
+    conn.close()
+    Network.write(k_n, ['EI', 'Success'])
+
+
 def execute_on_db(k_n, r):
     """ Perform the given SQL operation on the passed database. Return any tuples if the
-    statement is a SELECT statement.
+    statement is a SELECT statement. Tuples are compressed as given in the optional options
+    dictionary of the command list.
 
     :param k_n: Socket connection to send response through.
     :param r: Command list passed through the same socket.
     :return: None.
     """
-    f, s = r[1], r[2]
+    f, s, o = r[1], r[2], ClusterCFG.default_options()
+    o.update(r[3] if len(r) > 3 else {})
 
     # Create our connection.
     conn, cur = Database.connect(f, ErrorHandle.raise_handler)
@@ -111,7 +302,7 @@ def execute_on_db(k_n, r):
     if SQLFile.is_select(s):
         for i, r_t in enumerate(result):
             # If this is the last tuple, append the ending operation code.
-            Network.write(k_n, ['EZ' if i + 1 == len(result) else 'ES', r_t])
+            Network.write(k_n, ['EZ' if i + 1 == len(result) else 'ES', r_t], o)
         if len(result) == 0:
             Network.write(k_n, ['EZ', 'No tuples found.'])
 
@@ -120,6 +311,88 @@ def execute_on_db(k_n, r):
         Network.write(k_n, ['EZ', 'Success'])
 
 
+def execute_batched(k_n, r, functions=None):
+    """ Perform the given SQL operation on the passed database. Stream any resulting tuples in
+    batches, fetching only one batch from the database at a time. The batch limits are given in
+    the optional options dictionary of the command list.
+
+    :param k_n: Socket connection to send response through.
+    :param r: Command list passed through the same socket.
+    :param functions: Optional dictionary of single argument functions, by name, that the SQL
+        operation may call.
+    :return: None.
+    """
+    f, s, o = r[1], r[2], ClusterCFG.default_options()
+    o.update(r[3] if len(r) > 3 else {})
+
+    # Create our connection.
+    conn, cur = Database.connect(f, ErrorHandle.raise_handler)
+    sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn)
+    [conn.create_function(name, 1, g) for name, g in (functions or {}).items()]
+
+    # Execute the command. Return the error if any exist.
+    Database.execute_cursor(cur, s, sql_handler)
+
+    # Send the previous batch every time a new one arrives, so the last can be marked 'FZ'.
+    previous = []
+    for i, batch in enumerate(Database.fetch_batches(cur, o['rows'], o['bytes'], sql_handler)):
+        Network.write(k_n, ['FS', Columnar.wrap(previous, o['codec'])], o) if i != 0 else None
+        previous = batch
+
+    # Commit before sending the last batch, so the client sees a finished operation.
+    conn.commit(), conn.close()
+    Network.write(k_n, ['FZ', Columnar.wrap(previous, o['codec'])], o)
+
+
+def pushed_selection(tname, pushdown, conditions=None):
+    """ Construct the selection of a table that only returns what a join needs of it: the
+    referenced columns of the tuples that pass every pushed down conjunct.
+
+    :param tname: Name of the table to select from.
+    :param pushdown: Dictionary of the filter (see SQLFile.pushdown), or None for every tuple.
+    :param conditions: Optional list of additional conditions the tuples must pass.
+    :return: The selection SQL string.
+    """
+    columns = pushdown['columns'] if pushdown is not None else None
+    where = [pushdown['where']] if pushdown is not None and pushdown['where'] else []
+    where += conditions or []
+
+    return 'SELECT {} FROM {}'.format(', '.join(columns) if columns else '*', tname) + \
+        (' WHERE ' + ' AND '.join(where) if len(where) != 0 else '')
+
+
+def narrowed_sql(new_table, table_info, columns, is_if_not_exists=False):
+    """ Construct the creation schema of a table that only holds the given columns of another.
+
+    :param new_table: Name of the table to create.
+    :param table_info: List of (name, type) tuples, for every column of the other table.
+    :param columns: Names of the columns to keep, in order.
+    :param is_if_not_exists: Flag to only create the table if it does not exist yet.
+    :return: The creation SQL string.
+    """
+    types = {name.upper(): t for name, t in table_info}
+
+    return 'CREATE TABLE {}{} ({});'.format('IF NOT EXISTS ' if is_if_not_exists else '',
+                                            new_table, ', '.join('{} {}'.format(
+                                                c, types.get(c.upper(), '')) for c in columns))
+
+
+def prepare_filtered(r):
+    """ Given a filtered selection command list, construct the batched selection that only
+    keeps the tuples whose column may be in the given Bloom filter (and that pass the pushed
+    down filter, if one is given).
+
+    :param r: Command list of the filtered selection ('H').
+    :return: The batched selection command list ('F'), and the functions it calls.
+    """
+    f, tname, column, bloom, o = r[1], r[2], r[3], r[4], r[5] if len(r) > 5 else {}
+    pushdown = r[6] if len(r) > 6 else None
+
+    s = pushed_selection(tname, pushdown, ['BLOOM_CONTAINS({})'.format(column)])
+
+    return ['F', f, s, o], {'BLOOM_CONTAINS': lambda v: Bloom.contains(bloom, v)}
+
+
 def return_columns(k_n, r):
     """ Return the columns associated with a table through the given socket.
 
@@ -142,52 +415,53 @@ def return_columns(k_n, r):
     Network.write(k_n, ['EP', [col[i][0] for i in range(len(col))]])
 
 
-def store_from_ship(sock_n, conn, temp_name):
+def store_from_ship(sock_n, conn, temp_name, is_commit=False):
     """ Helper method for the ship procedure. The initial request for tuples is sent outside of
-    here, but this handles all subsequent requests. Tuples are then stored in the table that was
-    just created (pass in temp_name).
+    here, but this handles all batches that are returned. Batches are read from the socket in
+    another thread while the previous ones are inserted, and every batch is stored in the table
+    that was just created (pass in temp_name) within a single transaction.
 
-    :param k_n: Socket connection to send response through.
+    :param sock_n: Socket connection to read the batches from.
     :param conn: Cursor to an open database connection.
     :param temp_name: Name of the table created to store the results.
+    :param is_commit: Flag to commit after every batch instead of once at the end. This is used
+        when several nodes write to the same table at once, so none holds the lock for long.
     :return: None.
     """
     sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn)
-    net_handler = lambda e_n: Network.write(sock_n, ['YX']) and \
-                              Network.close_wrapper(e_n, ErrorHandle.raise_handler, sock_n)
-
-    # Read from our socket.
-    operation, resultant = Network.read(sock_n, net_handler)
-
-    # Handle the case where no tuples exist. (Given string = 'No tuples found.').
-    if resultant == 'No tuples found.':
-        return
+    net_handler = lambda e_n: Network.close_wrapper(e_n, ErrorHandle.raise_handler, sock_n)
+    cur, s = conn.cursor(), None
 
-    # Execute the insertion.
-    Database.execute(conn.cursor(), 'INSERT INTO ' + temp_name +
-                     ' VALUES (' + ''.join(['?, ' for _ in range(len(resultant) - 1)]) + '?);',
-                     sql_handler, resultant)
+    batches = Parallel.prefetch(Network.read_batches(sock_n, net_handler), 4)
+    try:
+        for batch in batches:
+            if len(batch) == 0:
+                continue
 
-    # Repeat. Operation code 'ES' marks the start of a message, and 'EZ' marks the end.
-    while operation != 'EZ':
-        operation, resultant = Network.read(sock_n, net_handler)
+            # Build the insertion once. The same string lets SQLite reuse the prepared statement.
+            if s is None:
+                s = 'INSERT INTO ' + temp_name + \
+                    ' VALUES (' + ''.join(['?, ' for _ in range(len(batch[0]) - 1)]) + '?);'
 
-        # Perform the insertion again.
-        Database.execute(conn.cursor(), 'INSERT INTO ' + temp_name +
-                         ' VALUES (' + ''.join(['?, ' for _ in range(len(resultant) - 1)]) + '?);',
-                         sql_handler, resultant)
+            # Execute the insertion for the entire batch.
+            Database.executemany(cur, s, batch, sql_handler)
+            conn.commit() if is_commit else None
+    finally:
+        # Stop the thread reading our batches, even if an insertion has failed.
+        batches.close()
 
 
-def copy_table(conn, node, f_s, tnames):
+def copy_table(conn, node, f_s, tnames, columns=None):
     """ Helper method for the ship procedure. This copies the schema from the other table by
     requesting the 'sql' field from the metadata table of the remote node. This is then executed
     given a new table name, so as to avoid conflicts in nodes that share a partition with the
-    remote.
+    remote. If only some columns are shipped, a table of just these columns is created instead.
 
     :param conn: Cursor to an open database connection.
     :param node: Node URI of the node to send the request to (the remote node).
     :param f_s: List of database filenames, in order of the current, then remote node.
     :param tnames: List of tables involved in the join, in order of current, then remote node.
+    :param columns: Optional list of the columns of tnames[1] to copy. Defaults to every column.
     :return: The creation schema of tnames[1] at the remote node, and the name of the new table.
     """
     sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn)
@@ -197,15 +471,22 @@ def copy_table(conn, node, f_s, tnames):
     sock_n = Network.open_client(host, port, ErrorHandle.raise_handler)
     net_handler = lambda e_n: Network.close_wrapper(e_n, ErrorHandle.raise_handler, sock_n)
 
-    # Grab the SQL used to create the table.
-    Network.write(sock_n, ['E', f_s[1], 'SELECT sql '
-                                        'FROM sqlite_master '
-                                        'WHERE name="{}"'.format(tnames[1])])
-    operation, create_sql = Network.read(sock_n, net_handler)
+    new_table = Database.random_name(False)
+    if columns is not None:
+        # Grab the name and type of every column, and only create the columns to be shipped.
+        Network.write(sock_n, ['F', f_s[1], 'SELECT name, type '
+                                            'FROM pragma_table_info("{}")'.format(tnames[1])])
+        create_sql = list(Network.read_tuples(sock_n, net_handler))
+        new_sql = narrowed_sql(new_table, create_sql, columns)
+    else:
+        # Grab the SQL used to create the table.
+        Network.write(sock_n, ['E', f_s[1], 'SELECT sql '
+                                            'FROM sqlite_master '
+                                            'WHERE name="{}"'.format(tnames[1])])
+        operation, create_sql = Network.read(sock_n, net_handler)
+        new_sql = create_sql[0].replace(tnames[1], new_table, 1) + ';'
 
     # Execute the create table statement on the local database with a new table name.
-    new_table = Database.random_name(False)
-    new_sql = create_sql[0].replace(tnames[1], new_table, 1) + ';'
     Database.execute(conn.cursor(), new_sql, sql_handler)
 
     sock_n.close()
@@ -219,27 +500,280 @@ def ship(k_n, r):
     :param r: Command list passed through the same socket.
     :return: None.
     """
-    f_s, tnames, node = r[1], r[2], r[3]
+    f_s, tnames, node, o = r[1], r[2], r[3], ClusterCFG.default_options()
     host, port, f = ClusterCFG.parse_uri(node)
+    o.update(r[4] if len(r) > 4 else {})
+    keys = r[5] if len(r) > 5 else None
+    pushdown = r[6] if len(r) > 6 else None
 
-    # Connect to local database.
+    # Connect to local database. The shipped table is new, so it has no indexes to rebuild.
     conn, cur = Database.connect(f_s[0], ErrorHandle.raise_handler)
+    state = {}
+    sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn,
+                                                        state)
+    Database.begin_load(conn, state, o)
 
-    # Copy the table from our remote node to our local node.
-    create_sql, new_table = copy_table(conn, node, f_s, tnames)
+    # Copy the table (or only the columns to be shipped) from our remote node to our local node.
+    columns = pushdown['columns'] if pushdown is not None else None
+    create_sql, new_table = copy_table(conn, node, f_s, tnames, columns)
 
     # Create socket to secondary node.
     sock_n = Network.open_client(host, port, ErrorHandle.raise_handler)
 
-    # Retrieve data from the secondary node.
-    Network.write(sock_n, ['E', f_s[1], 'SELECT * FROM ' + tnames[1]])
-    store_from_ship(sock_n, conn, new_table)
+    if keys is not None:
+        # Build a Bloom filter over our join keys, a batch at a time.
+        n = Database.execute(cur, 'SELECT COUNT(*) FROM ' + tnames[0], sql_handler, fetch=True)
+        bloom = Bloom.create(n[0][0], o['bloom'])
+        Database.execute_cursor(cur, 'SELECT {} FROM {}'.format(keys[0], tnames[0]), sql_handler)
+        for batch in Database.fetch_batches(cur, o['rows'], o['bytes'], sql_handler):
+            Bloom.add(bloom, [r_t[0] for r_t in batch])
+
+        # Only retrieve the tuples of the secondary node that may have a match here.
+        Network.write(sock_n, ['H', f_s[1], tnames[1], keys[1], bloom, o, pushdown])
+    else:
+        Network.write(sock_n, ['F', f_s[1], pushed_selection(tnames[1], pushdown), o])
+
+    # Retrieve data from the secondary node, in batches. Store these in a single transaction.
+    try:
+        store_from_ship(sock_n, conn, new_table)
+    finally:
+        sock_n.close()
 
     # Return the name of the table created if successful.
-    conn.commit(), conn.close()
+    Database.end_load(conn, state, True, sql_handler), conn.close()
     Network.write(k_n, ['EB', new_table])
 
 
+def receive_exchange(k_n, r):
+    """ Receive one bucket of an exchange (shuffle) from a remote node, and store it in the given
+    table. Every node of the exchange sends a bucket here, so the table is created by whichever
+    arrives first.
+
+    :param k_n: Socket connection to read the bucket from, and to send the response through.
+    :param r: Command list passed through the same socket.
+    :return: None.
+    """
+    f, new_table, create_sql = r[1], r[2], r[3]
+
+    # Create our connection, and the table to store the bucket in.
+    conn, cur = Database.connect(f, ErrorHandle.raise_handler)
+    sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn)
+    Database.execute(cur, create_sql, sql_handler)
+    conn.commit()
+
+    # Store every batch as it arrives. Batches are committed one at a time.
+    store_from_ship(k_n, conn, new_table, True)
+    conn.commit(), conn.close()
+    Network.write(k_n, ['EW', 'Success'])
+
+
+def exchange(k_n, r):
+    """ Hash partition the local rows of a table on the given column, and send each bucket to the
+    node that owns it (the bucket index into the list of target URIs). The bucket owned by this
+    node is stored locally. Every target ends up with a table of the given name holding its
+    bucket from every node of the exchange. If no column is given, every target receives every
+    tuple instead (a broadcast). If a pushed down filter is given, only the referenced columns of
+    the tuples that pass it are exchanged. If a repartitioning dictionary is given, each tuple is
+    only sent to the targets that do not hold it yet under the new partitioning (see
+    Partition.moves), and none is stored locally. The tuples to exchange are copied into a
+    temporary table first, so the scan never holds a lock that the stored buckets must wait on.
+
+    :param k_n: Socket connection to pass **response** through (not to send buckets).
+    :param r: Command list passed through the same socket.
+    :return: None.
+    """
+    node, tname, column, targets, new_table, o = r[1], r[2], r[3], r[4], r[5], \
+        ClusterCFG.default_options()
+    o.update(r[6] if len(r) > 6 else {})
+    pushdown = r[7] if len(r) > 7 else None
+    moves = r[8] if len(r) > 8 else None
+    host, port, f = ClusterCFG.parse_uri(node)
+
+    # Connect to local database. Reads and local inserts use separate connections.
+    conn, cur = Database.connect(f, ErrorHandle.raise_handler)
+    conn_w, cur_w = Database.connect(f, ErrorHandle.raise_handler)
+    sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn_w)
+
+    # Copy the schema of our table (or only the columns to exchange), under the new table name.
+    if pushdown is not None and pushdown['columns'] is not None:
+        table_info = Database.execute(cur, 'SELECT name, type '
+                                           'FROM pragma_table_info("{}")'.format(tname),
+                                      sql_handler, fetch=True)
+        new_sql = narrowed_sql(new_table, table_info, pushdown['columns'], True)
+    else:
+        create_sql = Database.execute(cur, 'SELECT sql '
+                                           'FROM sqlite_master '
+                                           'WHERE name="{}"'.format(tname), sql_handler,
+                                      fetch=True)
+        new_sql = re.sub(r'\b{}\b'.format(tname), new_table, create_sql[0][0], 1)
+        new_sql = re.sub(r'^\s*CREATE\s+TABLE\s+', 'CREATE TABLE IF NOT EXISTS ', new_sql, 1,
+                         re.IGNORECASE) + ';'
+    Database.execute(cur_w, new_sql, sql_handler)
+    conn_w.commit()
+
+    # Open a socket to every other target, and inform each to receive a bucket.
+    socks = []
+    for target in targets:
+        if target == node:
+            socks.append(None)
+            continue
+
+        host_n, port_n, f_n = ClusterCFG.parse_uri(target)
+        socks.append(Network.open_client(host_n, port_n, ErrorHandle.raise_handler))
+        Network.write(socks[-1], ['W', f_n, new_table, new_sql, o])
+
+    # Copy the tuples to exchange into a temporary table, and scan that instead. The scan then
+    # holds no lock on our database, so our own bucket (and the buckets other nodes send here) can
+    # be committed while it runs.
+    snapshot = Database.random_name(False)
+    Database.execute(cur, 'CREATE TEMP TABLE {} AS {}'.format(snapshot, pushed_selection(
+        tname, pushdown)), sql_handler)
+
+    # Determine the position of our column, and prepare the insertion for our own bucket.
+    columns = Database.execute_cursor(cur, 'SELECT * FROM temp.' + snapshot,
+                                      sql_handler).description
+    c = [d[0].upper() for d in columns].index(column.upper()) if column is not None else None
+    s = 'INSERT INTO ' + new_table + \
+        ' VALUES (' + ''.join(['?, ' for _ in range(len(columns) - 1)]) + '?);'
+
+    def _flush(i, operation):
+        """ Send (or store, if local) the buffered tuples of a bucket.
+
+        :param i: Index of the bucket to flush.
+        :param operation: Operation code to send the bucket with, 'FS' or 'FZ'.
+        :return: None.
+        """
+        if socks[i] is not None:
+            Network.write(socks[i], [operation, Columnar.wrap(buffers[i], o['codec'])], o)
+        elif len(buffers[i]) != 0:
+            Database.executemany(cur_w, s, buffers[i], sql_handler)
+            conn_w.commit()
+        buffers[i] = []
+
+    # Route every tuple to its bucket, and flush a bucket whenever it holds a full batch.
+    buffers = [[] for _ in targets]
+    for batch in Database.fetch_batches(cur, o['rows'], o['bytes'], sql_handler):
+        if moves is not None:
+            # Only send the tuples whose nodes change.
+            for r_t, js in zip(batch, Partition.moves(batch, moves)):
+                for i in js:
+                    buffers[i].append(r_t)
+                    _flush(i, 'FS') if len(buffers[i]) == o['rows'] else None
+            continue
+
+        if c is None:
+            # Broadcast every batch as is.
+            for i in range(len(targets)):
+                buffers[i] = batch
+                _flush(i, 'FS')
+            continue
+
+        for r_t in batch:
+            i = Partition.bucket(r_t[c], len(targets))
+            buffers[i].append(r_t)
+            _flush(i, 'FS') if len(buffers[i]) == o['rows'] else None
+
+    # Flush the remaining tuples, and wait for every target to store its bucket.
+    [_flush(i, 'FZ') for i in range(len(targets))]
+    for sock_n in filter(lambda b: b is not None, socks):
+        net_handler = lambda e_n: Network.close_wrapper(e_n, ErrorHandle.raise_handler, sock_n)
+        ErrorHandle.act_upon_error(Network.read(sock_n, net_handler), net_handler)
+        sock_n.close()
+
+    conn.close(), conn_w.close()
+    Network.write(k_n, ['EX', 'Success'])
+
+
+def switch_partition(conn, r, handler):
+    """ Helper method for the repartition procedure. Within a single transaction, keep only the
+    tuples of the table that this node owns under the new partitioning, and add every tuple that
+    was exchanged to this node. A node that is new to the table creates it first (any table of the
+    same name left here is not part of the cluster, and is emptied), and a node that is being
+    removed keeps none of its tuples.
+
+    :param conn: Connection to the database being repartitioned.
+    :param r: Command list of the repartition ('A').
+    :param handler: Handler to use if the table cannot be switched.
+    :return: The number of tuples the table holds afterward.
+    """
+    tname, column, staging, p, j, create_sql = r[2], r[3], r[4], r[5], r[6], r[7]
+    cur = conn.cursor()
+    Database.execute(cur, 'BEGIN', handler)
+
+    # Drop the tuples this node no longer owns. The owners of each tuple are found as these are
+    # when loaded, given only the partitioned column.
+    if create_sql is not None:
+        Database.execute(cur, re.sub(r'^\s*CREATE\s+TABLE\s+', 'CREATE TABLE IF NOT EXISTS ',
+                                     create_sql, 1, re.IGNORECASE), handler)
+    if create_sql is not None or j is None:
+        Database.execute(cur, 'DELETE FROM ' + tname, handler)
+    elif p['partmtd'] != 0:
+        p_v = dict(p, y=0)
+        conn.create_function('PARTITION_OWNS', 1, lambda v: j in Partition.owners([[v]], p_v)[0])
+        Database.execute(cur, 'DELETE FROM {} WHERE NOT PARTITION_OWNS({})'.format(tname, column),
+                         handler)
+
+    # Add the tuples that were exchanged to us, if any were.
+    is_staged = Database.execute(cur, 'SELECT 1 '
+                                      'FROM sqlite_master '
+                                      'WHERE type = "table" AND name = ?', handler, (staging,),
+                                 True)
+    if j is not None and len(is_staged) != 0:
+        Database.execute(cur, 'INSERT INTO {} SELECT * FROM {}'.format(tname, staging), handler)
+    if len(is_staged) != 0:
+        Database.execute(cur, 'DROP TABLE ' + staging, handler)
+
+    return Database.execute(cur, 'SELECT COUNT(*) FROM ' + tname, handler, fetch=True)[0][0]
+
+
+def execute_switch(k_n, r):
+    """ Switch the table of this node to a new partitioning, once every node has exchanged the
+    tuples whose nodes change (see 'exchange'). The number of tuples held afterward is
+    acknowledged, and the transaction is held open until the client commits ('AZ') or rolls back
+    ('AX'), so the switch may span every node of the cluster.
+
+    :param k_n: Socket connection to send response through.
+    :param r: Command list passed through the same socket.
+    :return: None.
+    """
+    f = r[1]
+    net_handler = lambda e_n: Network.close_wrapper(e_n, ErrorHandle.raise_handler, k_n)
+
+    # Create our connection.
+    conn, cur = Database.connect(f, ErrorHandle.raise_handler)
+    sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn)
+
+    # Switch our table, and wait until the switch is committed or rolled back.
+    Network.write(k_n, ['EA', switch_partition(conn, r, sql_handler)])
+    result = ErrorHandle.act_upon_error(Network.read(k_n, net_handler), net_handler, True)
+
+    conn.commit() if result[0] == 'AZ' else conn.rollback()
+    conn.close()
+    Network.write(k_n, ['EA', 'Success'])
+
+
+def return_count(k_n, r):
+    """ Return the number of tuples in a table through the given socket.
+
+    :param k_n: Socket connection to send response through.
+    :param r: Command list passed through the same socket.
+    :return: None.
+    """
+    f, tname = r[1], r[2]
+
+    # Create our connection.
+    conn, cur = Database.connect(f, ErrorHandle.raise_handler)
+    sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn)
+
+    # Execute the command. Return the error if any exist.
+    result = Database.execute(cur, 'SELECT COUNT(*) '
+                                   'FROM ' + tname + ';', sql_handler, fetch=True)
+    conn.close()
+
+    # Return the number of tuples.
+    Network.write(k_n, ['ER', result[0][0]])
+
+
 def interpret_base(k_n, r):
     """ Given a socket and a message through the socket, interpret the message. The result should
     be a list.
@@ -256,6 +790,12 @@ def interpret_base(k_n, r):
     if r[0] == 'YS':
         # Execute multiple insertion operations on a database.
         execute_multiple_prepared(k_n, r)
+    elif r[0] == 'L':
+        # Insert the batches of a bulk load into a database.
+        execute_bulk_load(k_n, r)
+    elif r[0] == 'I':
+        # Insert the tuples of a CSV readable from here into a database.
+        execute_ingest(k_n, r)
     elif r[0] == 'YZ':
         # Execute a single insertion operation on a database.
         execute_prepared(k_n, r)
@@ -265,6 +805,12 @@ def interpret_base(k_n, r):
     elif r[0] == 'E':
         # Execute an operation on a database.
         execute_on_db(k_n, r)
+    elif r[0] == 'F':
+        # Execute an operation on a database, and return tuples in batches.
+        execute_batched(k_n, r)
+    elif r[0] == 'H':
+        # Return the tuples of a table that pass a Bloom filter, in batches.
+        execute_batched(k_n, *prepare_filtered(r))
     elif r[0] == 'C':
         # Execute DDL on the catalog table.
         LocalCatalog.record_ddl(k_n, r)
@@ -274,25 +820,80 @@ def interpret_base(k_n, r):
     elif r[0] == 'U':
         # Return the URIs associated with each node.
         LocalCatalog.return_node_uris(k_n, r)
+    elif r[0] == 'Q':
+        # Return the URIs and partitioning associated with each node.
+        LocalCatalog.return_partitions(k_n, r)
     elif r[0] == 'P':
         # Return the columns associated with the given table.
         return_columns(k_n, r)
+    elif r[0] == 'R':
+        # Return the number of tuples in the given table.
+        return_count(k_n, r)
     elif r[0] == 'B':
         # Ship a table from a remote node to here.
         ship(k_n, r)
+    elif r[0] == 'X':
+        # Hash partition a table, and send each bucket to the node that owns it.
+        exchange(k_n, r)
+    elif r[0] == 'A':
+        # Switch a table to a new partitioning, once its tuples have been exchanged.
+        execute_switch(k_n, r)
+    elif r[0] == 'W':
+        # Store a bucket of an exchange, sent from a remote node.
+        receive_exchange(k_n, r)
     else:
         Network.write(k_n, ErrorHandle.wrap_error_tag('Operation code invalid.'))
 
 
-def interpret(k_n):
+def interpret_multiplexed(k_n, r, sock_l=None):
+    """ Interpret every request sent through a pooled connection, one after the other, until the
+    client closes the connection or leaves it idle for too long. The responses of each request
+    are collected, and sent after a header holding the request ID and the number of responses.
+
+    :param k_n: Current socket connection to a given client.
+    :param r: First multiplexed command list ('M') passed through the socket.
+    :param sock_l: Listening socket this process accepts connections from, if any. An idle
+        connection is given up as soon as another connection waits on this.
+    :return: None.
+    """
+    while not ErrorHandle.is_error(r):
+        k = Outbox()
+
+        try:
+            # Operations that read from the connection cannot share it.
+            if r[2][0] in ['YS', 'L', 'I', 'W', 'A']:
+                ErrorHandle.raise_handler(ValueError('Operation cannot be multiplexed.'))
+            interpret_base(k, r[2])
+        except Exception as e:
+            k.packets = [Network.pack(ErrorHandle.wrap_error_tag(e))]
+        Network.write_packets(k_n, [Network.pack(['EM', r[1], len(k.packets)])] + k.packets)
+
+        # Wait for the next request, but do not hold this process while the client is idle for
+        # longer than it asked for, or while another connection waits to be accepted.
+        idle = r[3] if len(r) > 3 else Pool.IDLE
+        ready = select.select([k_n] + ([sock_l] if sock_l is not None else []), [], [], idle)[0]
+        if k_n not in ready:
+            return
+        try:
+            r = Network.read(k_n)
+        except OSError:
+            return
+
+
+def interpret(k_n, sock_l=None):
     """ Wrapper for the interpret_base function. This is to be used when spawning a new process.
 
     :param k_n: Current socket connection to a given client.
+    :param sock_l: Listening socket this process accepts connections from, if any.
     :return: None.
     """
     try:
         # Retrieve the sent data. Unpickle the data. Interpret the command.
-        interpret_base(k_n, Network.read(k_n, ErrorHandle.raise_handler))
+        r = Network.read(k_n, ErrorHandle.raise_handler)
+        if r[0] == 'M':
+            interpret_multiplexed(k_n, r, sock_l)
+        else:
+            interpret_base(k_n, r)
     except ConnectionResetError:
         # Ignore when a connection is forcibly closed, or the socket has timed out.
         pass
@@ -301,20 +902,495 @@ def interpret(k_n):
         Network.write(k_n, ErrorHandle.wrap_error_tag(e))
 
 
+async def execute_multiple_prepared_async(reader, writer, r, pool):
+    """ Asynchronous counterpart of 'execute_multiple_prepared'. Each insertion is executed in
+    the given thread pool, while the event loop waits for the next operation code.
+
+    :param reader: Stream reader to receive additional statements through.
+    :param writer: Stream writer to send responses through.
+    :param r: Command list passed through the same stream.
+    :param pool: Thread pool to execute the SQLite operations in.
+    :return: None.
+    """
+    f, s, tup, is_commit = r[1], r[2], r[3], True
+    run = lambda operation: asyncio.get_running_loop().run_in_executor(pool, operation)
+    o = ClusterCFG.default_options()
+    o.update(r[4] if len(r) > 4 else {})
+
+    # Create our connection. This is shared between the threads of our pool.
+    conn, cur = await run(lambda: Database.connect(f, ErrorHandle.raise_handler, True))
+    state = {}
+    sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn,
+                                                        state)
+    await run(lambda: begin_load(conn, state, s, o, sql_handler))
+
+    while True:
+        # Execute the command. Return the error if any exist.
+        await run(lambda: Database.execute(cur, s, sql_handler, tup))
+        await Network.write_async(writer, ['EY', 'Success'])
+
+        # Interpret the current operation code.
+        result = await Network.read_async(reader, ErrorHandle.raise_handler)
+
+        # Stop if YZ, YY, or YX proceed otherwise.
+        if result[0] == 'YY':
+            break
+        elif result[0] == 'YZ':
+            f, s, tup = result[1], result[2], result[3]
+            await run(lambda: Database.execute(cur, s, sql_handler, tup))
+            break
+        elif result[0] == 'YX':
+            is_commit = False
+            break
+        else:
+            f, s, tup = result[1], result[2], result[3]
+
+    # Commit our changes (if desired) and close our connection.
+    await run(lambda: (Database.end_load(conn, state, is_commit, sql_handler), conn.close()))
+    await Network.write_async(writer, ['EY', 'Success'])
+
+
+async def execute_bulk_load_async(reader, writer, r, pool):
+    """ Asynchronous counterpart of 'execute_bulk_load'. Each batch is stored in the given thread
+    pool, while the event loop reads the batches that follow.
+
+    :param reader: Stream reader to receive the batches through.
+    :param writer: Stream writer to send responses through.
+    :param r: Command list passed through the same stream.
+    :param pool: Thread pool to execute the SQLite operations in.
+    :return: None.
+    """
+    f, s, stored, o = r[1], r[2], 0, ClusterCFG.default_options()
+    run = lambda operation: asyncio.get_running_loop().run_in_executor(pool, operation)
+    o.update(r[3] if len(r) > 3 else {})
+    key = r[4] if len(r) > 4 else None
+
+    # Create our connection. This is shared between the threads of our pool.
+    conn, cur = await run(lambda: Database.connect(f, ErrorHandle.raise_handler, True))
+    state = {}
+    sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn,
+                                                        state)
+    if key is not None:
+        offset = await run(lambda: Database.read_checkpoint(conn, key, sql_handler))
+        await Network.write_async(writer, ['EL', offset])
+        o['indexes'] = 'keep'
+    await run(lambda: begin_load(conn, state, s, o, sql_handler))
+
+    # Store every batch as it arrives, until the load is committed or rolled back.
+    read = lambda: Network.read_async(reader, ErrorHandle.raise_handler)
+    result = ErrorHandle.act_upon_error(await read(), ErrorHandle.raise_handler, True)
+    while result[0] in ['LS', 'LC']:
+        r_b = result
+        await run(lambda: store_batch(conn, s, key, r_b, sql_handler))
+        stored += 1
+        await Network.write_async(writer, ['EL', stored])
+        result = ErrorHandle.act_upon_error(await read(), ErrorHandle.raise_handler, True)
+
+    # Rebuild our indexes if asked to prepare, so the load can no longer fail on commit.
+    if result[0] == 'LP':
+        await run(lambda: Database.rebuild_indexes(conn, state, sql_handler))
+        await Network.write_async(writer, ['EL', 'Success'])
+        result = ErrorHandle.act_upon_error(await read(), ErrorHandle.raise_handler, True)
+
+    await run(lambda: (Database.end_load(conn, state, result[0] == 'LZ', sql_handler),
+                       conn.close()))
+    await Network.write_async(writer, ['EL', 'Success'])
+
+
+async def execute_ingest_async(reader, writer, r, pool):
+    """ Asynchronous counterpart of 'execute_ingest'. The CSV is parsed and stored in the given
+    thread pool, while the event loop serves other connections.
+
+    :param reader: Stream reader to receive the end of the load through.
+    :param writer: Stream writer to send responses through.
+    :param r: Command list passed through the same stream.
+    :param pool: Thread pool to execute the SQLite operations in.
+    :return: None.
+    """
+    f, s, o = r[1], r[2], ClusterCFG.default_options()
+    run = lambda operation: asyncio.get_running_loop().run_in_executor(pool, operation)
+    o.update(r[6] if len(r) > 6 else {})
+
+    # Create our connection. This is shared between the threads of our pool.
+    conn, cur = await run(lambda: Database.connect(f, ErrorHandle.raise_handler, True))
+    state = {}
+    sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn,
+                                                        state)
+    await run(lambda: begin_load(conn, state, s, o, sql_handler))
+
+    # Store our tuples (rebuilding any indexes), and wait until the load is committed or rolled
+    # back.
+    stored = await run(lambda: (store_csv(cur, s, r, o, sql_handler),
+                                Database.rebuild_indexes(conn, state, sql_handler))[0])
+    await Network.write_async(writer, ['EI', stored])
+    result = ErrorHandle.act_upon_error(await Network.read_async(reader, ErrorHandle.raise_handler),
+                                        ErrorHandle.raise_handler, True)
+
+    await run(lambda: (Database.end_load(conn, state, result[0] == 'IZ', sql_handler),
+                       conn.close()))
+    await Network.write_async(writer, ['EI', 'Success'])
+
+
+async def receive_exchange_async(reader, writer, r, pool):
+    """ Asynchronous counterpart of 'receive_exchange'. Each batch is stored in the given thread
+    pool, while the event loop waits for the next one.
+
+    :param reader: Stream reader to receive the bucket through.
+    :param writer: Stream writer to send the response through.
+    :param r: Command list passed through the same stream.
+    :param pool: Thread pool to execute the SQLite operations in.
+    :return: None.
+    """
+    f, new_table, create_sql, operation, s = r[1], r[2], r[3], 'FS', None
+    run = lambda operation_n: asyncio.get_running_loop().run_in_executor(pool, operation_n)
+
+    # Create our connection, and the table to store the bucket in.
+    conn, cur = await run(lambda: Database.connect(f, ErrorHandle.raise_handler, True))
+    sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn)
+    await run(lambda: (Database.execute(cur, create_sql, sql_handler), conn.commit()))
+
+    # Store every batch as it arrives. Batches are committed one at a time.
+    while operation != 'FZ':
+        a = await Network.read_async(reader, ErrorHandle.raise_handler)
+        operation, batch = ErrorHandle.act_upon_error(a, ErrorHandle.raise_handler, True)
+        batch = Columnar.unwrap(batch)
+        if len(batch) == 0:
+            continue
+
+        s = 'INSERT INTO ' + new_table + \
+            ' VALUES (' + ''.join(['?, ' for _ in range(len(batch[0]) - 1)]) + '?);'
+        await run(lambda: (Database.executemany(cur, s, batch, sql_handler), conn.commit()))
+
+    await run(lambda: conn.close())
+    await Network.write_async(writer, ['EW', 'Success'])
+
+
+async def execute_switch_async(reader, writer, r, pool):
+    """ Asynchronous counterpart of 'execute_switch'. The table is switched in the given thread
+    pool, while the event loop serves other connections.
+
+    :param reader: Stream reader to receive the end of the switch through.
+    :param writer: Stream writer to send responses through.
+    :param r: Command list passed through the same stream.
+    :param pool: Thread pool to execute the SQLite operations in.
+    :return: None.
+    """
+    f = r[1]
+    run = lambda operation: asyncio.get_running_loop().run_in_executor(pool, operation)
+
+    # Create our connection. This is shared between the threads of our pool.
+    conn, cur = await run(lambda: Database.connect(f, ErrorHandle.raise_handler, True))
+    sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn)
+
+    # Switch our table, and wait until the switch is committed or rolled back.
+    await Network.write_async(writer, ['EA', await run(lambda: switch_partition(conn, r,
+                                                                                sql_handler))])
+    result = ErrorHandle.act_upon_error(await Network.read_async(reader, ErrorHandle.raise_handler),
+                                        ErrorHandle.raise_handler, True)
+
+    await run(lambda: (conn.commit() if result[0] == 'AZ' else conn.rollback(), conn.close()))
+    await Network.write_async(writer, ['EA', 'Success'])
+
+
+async def execute_on_db_async(writer, r, pool):
+    """ Asynchronous counterpart of 'execute_on_db'. Tuples are fetched from the given thread pool
+    a batch at a time, and written to the stream as they arrive instead of all at once.
+
+    :param writer: Stream writer to send responses through.
+    :param r: Command list passed through the same stream.
+    :param pool: Thread pool to execute the SQLite operations in.
+    :return: None.
+    """
+    f, s, o = r[1], r[2], ClusterCFG.default_options()
+    o.update(r[3] if len(r) > 3 else {})
+    run = lambda operation: asyncio.get_running_loop().run_in_executor(pool, operation)
+
+    # Create our connection. This is shared between the threads of our pool.
+    conn, cur = await run(lambda: Database.connect(f, ErrorHandle.raise_handler, True))
+    sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn)
+
+    # Execute the command. Return the error if any exist.
+    await run(lambda: Database.execute_cursor(cur, s, sql_handler))
+    if not await run(lambda: SQLFile.is_select(s)):
+        # Assume that the statement has passed if this is not a selection.
+        await run(lambda: (conn.commit(), conn.close()))
+        await Network.write_async(writer, ['EZ', 'Success'])
+        return
+
+    # Send the previous tuple every time a new one arrives, so the last can be marked 'EZ'.
+    batches = Database.fetch_batches(cur, o['rows'], o['bytes'], sql_handler)
+    result, is_first = await run(lambda: next(batches, [])), True
+    while len(result) != 0:
+        following = await run(lambda: next(batches, []))
+        for i, r_t in enumerate(result):
+            is_last = len(following) == 0 and i + 1 == len(result)
+            await Network.write_async(writer, ['EZ' if is_last else 'ES', r_t], o)
+        result, is_first = following, False
+
+    # Send the empty message if no tuples were found.
+    await run(lambda: (conn.commit(), conn.close()))
+    if is_first:
+        await Network.write_async(writer, ['EZ', 'No tuples found.'])
+
+
+async def execute_batched_async(writer, r, pool, functions=None):
+    """ Asynchronous counterpart of 'execute_batched'. Batches are fetched from the given thread
+    pool one at a time, and written to the stream as they arrive.
+
+    :param writer: Stream writer to send responses through.
+    :param r: Command list passed through the same stream.
+    :param pool: Thread pool to execute the SQLite operations in.
+    :param functions: Optional dictionary of single argument functions, by name, that the SQL
+        operation may call.
+    :return: None.
+    """
+    f, s, o = r[1], r[2], ClusterCFG.default_options()
+    o.update(r[3] if len(r) > 3 else {})
+    run = lambda operation: asyncio.get_running_loop().run_in_executor(pool, operation)
+
+    # Create our connection. This is shared between the threads of our pool.
+    conn, cur = await run(lambda: Database.connect(f, ErrorHandle.raise_handler, True))
+    sql_handler = lambda e_n: Database.rollback_wrapper(e_n, ErrorHandle.raise_handler, conn)
+    [conn.create_function(name, 1, g) for name, g in (functions or {}).items()]
+
+    # Execute the command. Return the error if any exist.
+    await run(lambda: Database.execute_cursor(cur, s, sql_handler))
+
+    # Send the previous batch every time a new one arrives, so the last can be marked 'FZ'.
+    batches = Database.fetch_batches(cur, o['rows'], o['bytes'], sql_handler)
+    result = await run(lambda: next(batches, []))
+    while len(result) != 0:
+        following = await run(lambda: next(batches, []))
+        if len(following) != 0:
+            await Network.write_async(writer, ['FS', Columnar.wrap(result, o['codec'])], o)
+        else:
+            break
+        result = following
+
+    # Commit before sending the last batch, so the client sees a finished operation.
+    await run(lambda: (conn.commit(), conn.close()))
+    await Network.write_async(writer, ['FZ', Columnar.wrap(result, o['codec'])], o)
+
+
+async def interpret_base_async(reader, writer, r, pools):
+    """ Asynchronous counterpart of 'interpret_base'. The operations that stream (E, F) or expect
+    additional statements (YS, L, I, W, A) are coroutines, and 'H' streams as 'F' does. All other
+    operations only respond once they are done, so these are executed in a thread as they are,
+    with the response flushed afterward.
+
+    :param reader: Stream reader to receive additional messages through.
+    :param writer: Stream writer to send responses through.
+    :param r: Command list passed to the stream.
+    :param pools: Dictionary of thread pools, for 'catalog' and for 'data' operations.
+    :return: None.
+    """
+
+    # If our response is not an list, return an error.
+    if not hasattr(r, '__iter__'):
+        ErrorHandle.raise_handler('Input not a list.')
+
+    if r[0] == 'YS':
+        # Execute multiple insertion operations on a database.
+        await execute_multiple_prepared_async(reader, writer, r, pools['data'])
+    elif r[0] == 'L':
+        # Insert the batches of a bulk load into a database.
+        await execute_bulk_load_async(reader, writer, r, pools['data'])
+    elif r[0] == 'I':
+        # Insert the tuples of a CSV readable from here into a database.
+        await execute_ingest_async(reader, writer, r, pools['data'])
+    elif r[0] == 'E':
+        # Execute an operation on a database.
+        await execute_on_db_async(writer, r, pools['data'])
+    elif r[0] == 'F':
+        # Execute an operation on a database, and return tuples in batches.
+        await execute_batched_async(writer, r, pools['data'])
+    elif r[0] == 'H':
+        # Return the tuples of a table that pass a Bloom filter, in batches.
+        r_f, functions = prepare_filtered(r)
+        await execute_batched_async(writer, r_f, pools['data'], functions)
+    elif r[0] == 'W':
+        # Store a bucket of an exchange, sent from a remote node.
+        await receive_exchange_async(reader, writer, r, pools['data'])
+    elif r[0] == 'A':
+        # Switch a table to a new partitioning, once its tuples have been exchanged.
+        await execute_switch_async(reader, writer, r, pools['data'])
+    else:
+        k_n = Outbox()
+
+        # Execute the operation against our outbox, then flush the outbox through the stream.
+        await asyncio.get_running_loop().run_in_executor(select_pool(pools, r[0]),
+                                                         interpret_base, k_n, r)
+        writer.writelines(b for packet in k_n.packets for b in packet)
+        await writer.drain()
+
+
+def select_pool(pools, operation):
+    """ Select the thread pool to execute a blocking operation in. Catalog operations have their
+    own pool, so these are never stuck behind ships. Ships and exchanges wait on other daemons, so
+    these have a pool of their own as well.
+
+    :param pools: Dictionary of thread pools, for 'catalog', 'data' and 'remote' operations.
+    :param operation: Operation code of the command list to execute.
+    :return: The thread pool to execute the operation in.
+    """
+    if operation in ['C', 'K', 'U', 'Q', 'P', 'YY']:
+        return pools['catalog']
+
+    return pools['remote'] if operation in ['B', 'X'] else pools['data']
+
+
+async def interpret_multiplexed_async(reader, writer, r, pools):
+    """ Asynchronous counterpart of 'interpret_multiplexed'. Every request is executed as soon as
+    it arrives (in a thread, against an outbox), so requests sent through the same connection
+    run concurrently. Each response is sent as soon as its request is done.
+
+    :param reader: Stream reader of the current connection to a given client.
+    :param writer: Stream writer of the current connection to a given client.
+    :param r: First multiplexed command list ('M') passed through the stream.
+    :param pools: Dictionary of thread pools, for 'catalog', 'data' and 'remote' operations.
+    :return: None.
+    """
+    loop, tasks = asyncio.get_running_loop(), []
+
+    async def _respond(r_m):
+        """ Execute a single request, and send its responses after the header of its ID.
+
+        :param r_m: Multiplexed command list to execute.
+        :return: None.
+        """
+        k = Outbox()
+        try:
+            # Operations that read from the connection cannot share it.
+            if r_m[2][0] in ['YS', 'L', 'I', 'W', 'A']:
+                ErrorHandle.raise_handler(ValueError('Operation cannot be multiplexed.'))
+            await loop.run_in_executor(select_pool(pools, r_m[2][0]), interpret_base, k, r_m[2])
+        except Exception as e:
+            k.packets = [Network.pack(ErrorHandle.wrap_error_tag(e))]
+        writer.writelines(b for packet in [Network.pack(['EM', r_m[1], len(k.packets)])] +
+                          k.packets for b in packet)
+        await writer.drain()
+
+    while not ErrorHandle.is_error(r):
+        tasks.append(asyncio.ensure_future(_respond(r)))
+
+        # Wait for the next request. Only stop once the client is idle and nothing is running.
+        read = asyncio.ensure_future(Network.read_async(reader))
+        while not read.done():
+            await asyncio.wait([read], timeout=r[3] if len(r) > 3 else Pool.IDLE)
+            if not read.done() and all(t.done() for t in tasks):
+                read.cancel()
+                break
+
+        tasks = [t for t in tasks if not t.done()]
+        r = read.result() if read.done() and not read.cancelled() and \
+            read.exception() is None else ErrorHandle.wrap_error_tag('Connection closed.')
+
+    await asyncio.gather(*tasks)
+
+
+async def interpret_async(reader, writer, pools):
+    """ Asynchronous counterpart of the 'interpret' wrapper. This is to be used as the connection
+    callback of the asyncio server.
+
+    :param reader: Stream reader of the current connection to a given client.
+    :param writer: Stream writer of the current connection to a given client.
+    :param pools: Dictionary of thread pools, for 'catalog' and for 'data' operations.
+    :return: None.
+    """
+    try:
+        # Retrieve the sent data. Unpickle the data. Interpret the command.
+        r = await Network.read_async(reader, ErrorHandle.raise_handler)
+        if r[0] == 'M':
+            await interpret_multiplexed_async(reader, writer, r, pools)
+        else:
+            await interpret_base_async(reader, writer, r, pools)
+    except (ConnectionResetError, asyncio.IncompleteReadError):
+        # Ignore when a connection is forcibly closed, or the socket has timed out.
+        pass
+    except Exception as e:
+        # An exception has been thrown. Inform the client.
+        await Network.write_async(writer, ErrorHandle.wrap_error_tag(e))
+    finally:
+        writer.close()
+
+
+async def serve_async(sock_n, workers):
+    """ Event loop for the 'async' mode. Every connection is served from this loop, and blocking
+    SQLite operations are executed in a bounded pool of threads. Ships and exchanges hold a
+    thread while they wait on other daemons (possibly this one), so these are executed in a
+    separate pool and never hold up the data operations they are waiting on.
+
+    :param sock_n: Listening socket to accept connections from.
+    :param workers: Number of threads used for data operations, and for ships and exchanges.
+    :return: None.
+    """
+    pools = {'catalog': ThreadPoolExecutor(max(1, workers // 4)),
+             'data': ThreadPoolExecutor(workers),
+             'remote': ThreadPoolExecutor(workers)}
+
+    # Serve forever on the given socket.
+    server = await asyncio.start_server(lambda a, b: interpret_async(a, b, pools), sock=sock_n)
+    async with server:
+        await server.serve_forever()
+
+
+def serve(sock_n):
+    """ Worker loop for the 'prefork' mode. Every worker blocks on the same listening socket,
+    so the kernel's queue of accepted connections acts as the queue shared between workers. Each
+    connection is interpreted in this process, without forking another.
+
+    :param sock_n: Listening socket shared by all workers.
+    :return: None.
+    """
+    while True:
+        k_n, addr_n = sock_n.accept()
+
+        # Interpret the command, and always close the connection afterward. A pooled connection
+        # is given up once idle if another connection is waiting, so it never starves the others.
+        try:
+            interpret(k_n, sock_n)
+        finally:
+            k_n.close()
+
+
 if __name__ == '__main__':
-    # Ensure that we only have 2 arguments.
-    if len(sys.argv) != 3:
-        ErrorHandle.fatal_handler('Usage: python3 parDBd.py [hostname] [port]')
+    # Ensure that we have between 2 and 5 arguments.
+    if not 3 <= len(sys.argv) <= 6:
+        ErrorHandle.fatal_handler('Usage: python3 parDBd.py [hostname] [port] [mode] [workers] '
+                                  '[backlog]')
+
+    # Determine the mode to run the daemon in.
+    mode = sys.argv[3] if len(sys.argv) > 3 else 'fork'
+    if mode not in ['fork', 'prefork', 'async']:
+        ErrorHandle.fatal_handler('\'mode\' not in space [fork, prefork, async].')
+
+    # Determine the number of workers and the listen backlog.
+    workers = ErrorHandle.attempt_operation(lambda: int(sys.argv[4]) if len(sys.argv) > 4
+                                            else cpu_count(), ValueError,
+                                            ErrorHandle.default_handler, True)
+    backlog = ErrorHandle.attempt_operation(lambda: int(sys.argv[5]) if len(sys.argv) > 5
+                                            else socket.SOMAXCONN, ValueError,
+                                            ErrorHandle.default_handler, True)
+    if ErrorHandle.is_error(workers) or ErrorHandle.is_error(backlog) or workers < 1:
+        ErrorHandle.fatal_handler('Could not interpret the given workers or backlog argument.')
 
     # Create the socket. Handle the port error outside here.
     port_handler = lambda e: ErrorHandle.fatal_handler(e) \
         if 'invalid literal for int()' not in str(e) \
         else ErrorHandle.fatal_handler('Could not interpret the given port argument.')
     sock = Network.open_server(sys.argv[1], sys.argv[2], port_handler)
+    sock.listen(backlog)
+
+    # Pre-fork our workers, and replace any that die. This never returns.
+    if mode == 'prefork':
+        Parallel.maintain_pool(workers, serve, (sock,))
+
+    # Serve every connection from a single event loop. This never returns.
+    elif mode == 'async':
+        asyncio.run(serve_async(sock, workers))
 
     while True:
-        # Listen and wait for a connection on this socket.
-        sock.listen(1)
+        # Wait for a connection on this socket.
         k, addr = sock.accept()
 
         # Zombie prevention, check if my children are alive.
@@ -10,7 +10,7 @@ import sys
 from lib.catalog import RemoteCatalog
 from lib.dissect import ClusterCFG, SQLFile
 from lib.error import ErrorHandle
-from lib.network import Network
+from lib.network import Pool
 from lib.parallel import Parallel
 
 # Used to store the node IDs of each **successful** execution.
@@ -29,19 +29,13 @@ def execute_ddl(node_uri, name, s_n):
     [host, port, f], n = ClusterCFG.parse_uri(node_uri), name.split('.', 1)[0].split('node')[1]
     handler = lambda e: ErrorHandle.fatal_handler('[Node ' + n + ']: ' + str(e))
 
-    # Create our socket.
-    sock = Network.open_client(host, port, handler)
-
-    # Pickle our command list ('E', filename, and DDL), and send our message.
-    Network.write(sock, ['E', f, s_n])
-
-    # Wait for a response to be sent back, and return the response.
-    a = Network.read(sock, handler)
+    # Send our command list ('E', filename, and DDL) through a pooled connection, and wait for
+    # the response.
+    a = Pool.request(host, port, ['E', f, s_n], handler)
     ErrorHandle.act_upon_error(a, handler)
 
     # Append the success to the successful nodes list.
     print('Successful Execution on Node: ' + n), successful_nodes.append(int(n))
-    sock.close()
 
 
 if __name__ == '__main__':
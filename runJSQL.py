@@ -7,17 +7,49 @@ Usage: python runJSQL.py [clustercfg] [sqlfile]
 
 import re
 import sys
+from collections import defaultdict
+from threading import Lock
 
 from lib.catalog import RemoteCatalog
 from lib.database import Database
 from lib.dissect import SQLFile, ClusterCFG
 from lib.error import ErrorHandle
-from lib.network import Network
+from lib.network import Network, Pool
 from lib.parallel import Parallel
+from lib.partition import Partition
 
 # Used to store the node URIs and joined tables of each successful execution.
 successful_joins = []
 
+# Used to store the number of tuples of each (node URI, table) pair that was counted.
+row_counts = {}
+
+# Held while displaying a batch of tuples, as joins on several nodes display theirs at once.
+display_lock = Lock()
+
+# Held while a union reads or writes the database of a node, by host and filename. Unions of the
+# same round may share a database, and SQLite only lets one of these write at a time.
+union_locks = defaultdict(Lock)
+
+
+def join_columns(s_n, t_tables_n):
+    """ Determine the columns the two given tables are joined on, for equality.
+
+    :param s_n: Join statement to inspect.
+    :param t_tables_n: Tables involved in the join, in order of table 1, table 2.
+    :return: List of joined columns, as [column_of_table_1, column_of_table_2] lists.
+    """
+    columns, t_1, t_2 = [], t_tables_n[0].upper(), t_tables_n[1].upper()
+
+    # Orient each condition so the column of the first table is first.
+    for a_t, a_c, b_t, b_c in SQLFile.join_columns(s_n):
+        if [a_t.upper(), b_t.upper()] == [t_1, t_2]:
+            columns.append([a_c, b_c])
+        elif [a_t.upper(), b_t.upper()] == [t_2, t_1]:
+            columns.append([b_c, a_c])
+
+    return columns
+
 
 def find_temp_tables(node_uri):
     """ Retrieve all of the temporary tables that exist in the given node.
@@ -25,164 +57,278 @@ def find_temp_tables(node_uri):
     :param node_uri: URI of the node to retrieve the temporary tables from.
     :return: List containing the temporary tables on the current node.
     """
-    [host, port, f], tables = ClusterCFG.parse_uri(node_uri), []
-
-    # Create the socket to the first node.
-    sock = Network.open_client(host, port, ErrorHandle.fatal_handler)
-    net_handler = lambda e_n: Network.close_wrapper(e_n, ErrorHandle.fatal_handler, sock)
-
-    # Determine all tables to remove.
-    Network.write(sock, ['E', f, 'SELECT tbl_name '
-                                 'FROM sqlite_master '
-                                 'WHERE type="table" '
-                                 'AND tbl_name LIKE "%TTTTT" OR tbl_name LIKE "%JJJJJ"'])
-
-    # Wait for a response to be sent back, and print the response.
-    a = Network.read(sock, net_handler)
-    operation, resultant = ErrorHandle.act_upon_error(a, net_handler, True)
-    tables.append(resultant[0])
+    host, port, f = ClusterCFG.parse_uri(node_uri)
 
-    # Repeat. Operation code 'ES' marks the start of a message, and 'EZ' marks the end.
-    while operation != 'EZ':
-        a = Network.read(sock, net_handler)
-        operation, resultant = ErrorHandle.act_upon_error(a, net_handler, True)
-        tables.append(resultant[0])
+    # Determine all tables to remove, through a pooled connection.
+    a = Pool.requests(host, port, [['F', f, 'SELECT tbl_name '
+                                            'FROM sqlite_master '
+                                            'WHERE type="table" '
+                                            'AND tbl_name LIKE "%TTTTT" '
+                                            'OR tbl_name LIKE "%JJJJJ"']],
+                      ErrorHandle.fatal_handler)
+    batches = ErrorHandle.act_upon_error(a, ErrorHandle.fatal_handler, True)[0]
 
-    sock.close()
-    return tables
+    # Collect every table name in the response. Tuples are sent in batches of 'FS' and 'FZ'.
+    return [r_t[0] for batch in batches
+            for r_t in ErrorHandle.act_upon_error(batch, ErrorHandle.fatal_handler, True)[1]]
 
 
-def remove_temp_table(node_uri, table):
-    """ Given the URI of a node and a table that exists in that node, remove the given table from
-    the node.
+def remove_temp_tables(node_uri, tables):
+    """ Given the URI of a node and tables that exist in that node, remove the given tables from
+    the node. Every removal is sent through the same pooled connection at once.
 
-    :param node_uri: URI of the node to remove the table from.
-    :param table: Name of the table to remove from the node.
+    :param node_uri: URI of the node to remove the tables from.
+    :param tables: Names of the tables to remove from the node.
     :return: None.
     """
     host, port, f = ClusterCFG.parse_uri(node_uri)
 
-    # Create the socket to the first node.
-    sock = Network.open_client(host, port, ErrorHandle.fatal_handler)
-    net_handler = lambda e_n: Network.close_wrapper(e_n, ErrorHandle.fatal_handler, sock)
-
-    # Delete the table.
-    Network.write(sock, ['E', f, 'DROP TABLE {}'.format(table)])
-    ErrorHandle.act_upon_error(Network.read(sock, net_handler), net_handler)
+    # Delete the tables, and wait for every response.
+    a = Pool.requests(host, port, [['E', f, 'DROP TABLE {}'.format(t)] for t in tables],
+                      ErrorHandle.fatal_handler)
+    for response in ErrorHandle.act_upon_error(a, ErrorHandle.fatal_handler, True):
+        ErrorHandle.act_upon_error(response[0], ErrorHandle.fatal_handler)
 
-    # Close our socket.
-    sock.close()
 
-
-def ship_to_remote(host, port, f, t_tables_n, nu_2_n):
-    """ Inform one node to request a table from another.
+def ship_to_remote(host, port, f, t_tables_n, nu_2_n, o, keys=None, pushdown=None):
+    """ Inform one node to request a table from another. If join columns are given, only the
+    tuples of the remote table that may have a match in the source table are shipped. If a
+    pushed down filter is given, only the referenced columns of the tuples that pass it are.
 
     :param host: Hostname of the node to send the request to (the "source").
     :param port: Port of the node to send the request to.
     :param f: List of filenames associated with the database, in order of source, remote.
     :param t_tables_n: List of table names associated with the join, in order of source, remote.
     :param nu_2_n: URI of the node for the source to retrieve the remote table from.
+    :param o: Dictionary of tuning options, passed along with the ship.
+    :param keys: Columns the tables are joined on, in order of source, remote. None ships every
+        tuple of the remote table.
+    :param pushdown: Filter and columns of the remote table (see SQLFile.pushdown). None ships
+        every column of every tuple.
     :return: The temporary table name that results from the ship.
     """
-    # Create the socket to the first node.
-    sock = Network.open_client(host, port, ErrorHandle.fatal_handler)
-    net_handler = lambda e_n: Network.close_wrapper(e_n, ErrorHandle.fatal_handler, sock)
-
-    # Inform node 1 to retrieve and store a table from node 2.
-    Network.write(sock, ['B', f, t_tables_n, nu_2_n])
+    # Inform node 1 to retrieve and store a table from node 2, through a pooled connection.
+    a = Pool.request(host, port, ['B', f, t_tables_n, nu_2_n, o, keys, pushdown],
+                     ErrorHandle.fatal_handler)
 
-    # Wait for a response that this operation was successful.
-    a = Network.read(sock, net_handler)
-    operation, resultant = ErrorHandle.act_upon_error(a, net_handler, True)
-
-    # Return the temporary table name.
-    sock.close()
+    # Wait for a response that this operation was successful. Return the temporary table name.
+    operation, resultant = ErrorHandle.act_upon_error(a, ErrorHandle.fatal_handler, True)
     return resultant
 
 
-def execute_join(nu_1_n, nu_2_n, n, s_n, t_tables_n):
+def execute_join(nu_1_n, nu_2_n, n, s_n, t_tables_n, o, keys=None, pushdown=None):
     """ Given the URI of two nodes from the catalog database and the SQL to execute, join two
-    tables across two nodes and store the result in the first table.
+    tables across two nodes and store the result in the first table. If the results are streamed
+    ('union.method=stream'), the joined tuples are displayed as they arrive instead.
 
     :param nu_1_n: Node URI of the first node to join (and to store the result to).
     :param nu_2_n: Node URI of the second node to join.
     :param n: Join number that this operation is working on.
     :param s_n: Join statement to execute.
     :param t_tables_n: Tables involved in the join, in order of node 1, node 2.
+    :param o: Dictionary of tuning options, passed along with the ship.
+    :param keys: Columns the tables are joined on, in order of node 1, node 2. If given, node 2
+        only ships the tuples that may have a match on node 1.
+    :param pushdown: Filter and columns of the table on node 2. If given, node 2 only ships what
+        the statement needs of its table.
     :return: None.
     """
     host_1, port_1, f_1 = ClusterCFG.parse_uri(nu_1_n)
     host_2, port_2, f_2 = ClusterCFG.parse_uri(nu_2_n)
-    temp_s, handler = s_n, lambda e: ErrorHandle.fatal_handler('[Join ' + n + ']: ' + str(e))
+    temp_s, handler = s_n, lambda e: ErrorHandle.fatal_handler('[Join ' + str(n) + ']: ' + str(e))
 
     # Inform node 1 to grab a table from node 2 iff node 1 and node 2 are remote.
     if nu_2_n != nu_1_n:
-        a = ship_to_remote(host_1, port_1, [f_1, f_2], t_tables_n, nu_2_n)
+        a = ship_to_remote(host_1, port_1, [f_1, f_2], t_tables_n, nu_2_n, o, keys, pushdown)
         temp_name = ErrorHandle.act_upon_error(a, ErrorHandle.fatal_handler, True)
 
         # Replace all instances of the second table with the temporary table name.
         temp_s = re.sub(r'\b{}\b'.format(t_tables_n[1]), temp_name, s_n)
 
-    # Create the socket to the first node.
-    sock_1 = Network.open_client(host_1, port_1, ErrorHandle.fatal_handler)
-    net_handler = lambda e_n: Network.close_wrapper(e_n, handler, sock_1)
+    # Display the result of this pair directly. Nothing is stored, so nothing is unioned.
+    if o['union'] == 'stream':
+        execute_local_join(nu_1_n, n, temp_s, o)
+        return
 
     # Inform node 1 to join the two tables, and store the result in a temp table.
     new_table = Database.random_name(True)
-    Network.write(sock_1, ['E', f_1,
-                           'CREATE TABLE {} '.format(new_table) +
-                           'AS WITH A AS ( {} )'.format(temp_s) +
-                           'SELECT * '
-                           'FROM A;'])
+    a = Pool.request(host_1, port_1, ['E', f_1,
+                                      'CREATE TABLE {} '.format(new_table) +
+                                      'AS WITH A AS ( {} )'.format(temp_s) +
+                                      'SELECT * '
+                                      'FROM A;'], handler)
 
     # Handle errors appropriately. Append to our shared memory.
-    Network.read(sock_1, net_handler)
+    ErrorHandle.act_upon_error(a, handler)
     successful_joins.append([nu_1_n, new_table])
-    sock_1.close()
 
 
-def execute_union(source_list, join_list):
-    """ Given source and remote nodes, ship a given table to the source. From here,
-    the set difference is obtained from the two, and is inserted into the source (union).
+def execute_local_join(node_uri, n, s_n, o):
+    """ Given the URI of a node that holds both tables of a co-located join, execute the join on
+    that node alone and display the resulting tuples as they arrive.
+
+    :param node_uri: URI of the node to execute the join on.
+    :param n: Join number that this operation is working on.
+    :param s_n: Join statement to execute.
+    :param o: Dictionary of tuning options, passed along with the join.
+    :return: None.
+    """
+    host, port, f = ClusterCFG.parse_uri(node_uri)
+    handler = lambda e: ErrorHandle.fatal_handler('[Join ' + str(n) + ']: ' + str(e))
+
+    # Create the socket to the node.
+    sock = Network.open_client(host, port, handler)
+    net_handler = lambda e_n: Network.close_wrapper(e_n, handler, sock)
+
+    # Execute the join as is. Tuples are sent in batches of 'FS', ending with 'FZ'.
+    Network.write(sock, ['F', f, s_n, o])
+    for batch in Network.read_batches(sock, net_handler):
+        # Write each batch at once, so lines from other nodes are not interleaved with ours.
+        lines = ''.join(['| |' + ''.join([str(x) + ' | ' for x in resultant]) + '|\n'
+                         for resultant in batch])
+        with display_lock:
+            sys.stdout.write(lines)
+
+    sock.close()
+
+
+def execute_exchange(node_uri, n, t, column, target_uris, new_table, o, pushdown=None):
+    """ Inform a node to hash partition its rows of a table on the given column, and to send each
+    bucket to the target node that owns it. Each target stores its buckets in the given table. If
+    no column is given, the node sends all of its rows to every target instead (a broadcast).
+
+    :param node_uri: URI of the node holding the rows to exchange.
+    :param n: Exchange number that this operation is working on.
+    :param t: Name of the table to exchange.
+    :param column: Column of the table to hash partition on, or None to broadcast.
+    :param target_uris: URIs of the nodes that own each bucket.
+    :param new_table: Name of the table to store the buckets in, on every target.
+    :param o: Dictionary of tuning options, passed along with the exchange.
+    :param pushdown: Filter and columns of the table (see SQLFile.pushdown). If given, only what
+        the statement needs of the table is exchanged.
+    :return: None.
+    """
+    host, port, f = ClusterCFG.parse_uri(node_uri)
+    handler = lambda e: ErrorHandle.fatal_handler('[Exchange ' + str(n) + ']: ' + str(e))
+
+    # Inform the node to send its buckets, and wait until every target has stored these.
+    a = Pool.request(host, port, ['X', node_uri, t, column, target_uris, new_table, o, pushdown],
+                     handler)
+    ErrorHandle.act_upon_error(a, handler)
+
+
+def count_rows(node_uri, n, t):
+    """ Count the tuples of a table on the given node, and record this in 'row_counts'.
+
+    :param node_uri: URI of the node to count the tuples on.
+    :param n: Count number that this operation is working on.
+    :param t: Name of the table to count the tuples of.
+    :return: None.
+    """
+    host, port, f = ClusterCFG.parse_uri(node_uri)
+    handler = lambda e: ErrorHandle.fatal_handler('[Count ' + str(n) + ']: ' + str(e))
+
+    # Request the count through a pooled connection, and record it.
+    a = Pool.request(host, port, ['R', f, t], handler)
+    operation, resultant = ErrorHandle.act_upon_error(a, handler, True)
+    row_counts[(node_uri, t)] = resultant
+
+
+def execute_exchanged_join(sources, target_uris, s_n, o):
+    """ Exchange the rows of the given sources onto the target nodes, execute the join on every
+    target with the exchanged tables in place of the originals, and remove the exchanged tables.
+
+    :param sources: List of [node URI, table, column, pushdown] lists to exchange. A column of
+        None broadcasts the rows of that node to every target.
+    :param target_uris: URIs of the nodes to exchange onto, and to execute the join on.
+    :param s_n: Join statement to execute.
+    :param o: Dictionary of tuning options, passed along with the exchanges and joins.
+    :return: None.
+    """
+    new_tables = {b[1]: Database.random_name(False) for b in sources}
+
+    # Every source node sends its rows to the targets.
+    Parallel.execute_n(sources, execute_exchange,
+                       lambda i, b: (b[0], i + 1, b[1], b[2], target_uris, new_tables[b[1]], o,
+                                     b[3]))
+
+    # Each target now holds all matching rows for its own. Join these locally.
+    temp_s = s_n
+    for t, new_table in new_tables.items():
+        temp_s = re.sub(r'\b{}\b'.format(t), new_table, temp_s)
+    Parallel.execute_n(target_uris, execute_local_join, lambda i, b: (b, i + 1, temp_s, o))
+
+    # Remove the exchanged tables. Execute in parallel along nodes.
+    rem = lambda b: remove_temp_tables(b, find_temp_tables(b))
+    Parallel.execute_n(target_uris, rem, lambda _, b: (b, ))
+
+
+def execute_union(source_list, join_list, o):
+    """ Given source and remote nodes, ship a given table to the source. From here, every tuple
+    of the shipped table is inserted into the source (union). Duplicates are kept, so the result
+    does not depend on how the tables were paired.
 
     :param source_list: List containing the URI and table of the source.
     :param join_list: List containing the URI and the table of the remote.
+    :param o: Dictionary of tuning options, passed along with the ship.
     :return: None.
     """
     master_node_uri, master_table = source_list
     slave_node_uri, slave_table = join_list
     host_1, port_1, f_1 = ClusterCFG.parse_uri(master_node_uri)
+    host_2, port_2, f_2 = ClusterCFG.parse_uri(slave_node_uri)
+
+    # Hold the databases of both nodes (in a fixed order, so no two unions wait on each other).
+    # A ship reads the remote database while other unions of this round may write to it.
+    locks = [union_locks[k] for k in sorted({(host_1, f_1), (host_2, f_2)})]
+    [lock.acquire() for lock in locks]
+    try:
+        # If necessary, ship the joins to our master.
+        if master_node_uri != slave_node_uri:
+            # Set our new table name appropriately.
+            a = ship_to_remote(host_1, port_1, [f_1, f_2], [master_table, slave_table],
+                               slave_node_uri, o)
+            slave_table = ErrorHandle.act_upon_error(a, ErrorHandle.fatal_handler, True)
+
+        # Inform our node to union the table specified in join_list (insert every tuple).
+        a = Pool.request(host_1, port_1, ['E', f_1,
+                                          'INSERT INTO {} '.format(master_table) +
+                                          'SELECT * '
+                                          'FROM {};'.format(slave_table)],
+                         ErrorHandle.fatal_handler)
+    finally:
+        [lock.release() for lock in reversed(locks)]
 
-    # If necessary, ship the joins to our master.
-    if master_node_uri != slave_node_uri:
-        host_2, port_2, f_2 = ClusterCFG.parse_uri(slave_node_uri)
+    # Handle our errors.
+    ErrorHandle.act_upon_error(a, ErrorHandle.fatal_handler)
 
-        # Set our new table name appropriately.
-        a = ship_to_remote(host_1, port_1, [f_1, f_2], [master_table, slave_table], slave_node_uri)
-        slave_table = ErrorHandle.act_upon_error(a, ErrorHandle.fatal_handler, True)
 
-    # Create the socket to the first node.
-    sock = Network.open_client(host_1, port_1, ErrorHandle.fatal_handler)
-    net_handler = lambda e_n: Network.close_wrapper(e_n, ErrorHandle.fatal_handler, sock)
+def execute_tree_union(joins, o):
+    """ Union the results of every join onto a single node. The results are paired up, and the
+    pairs are unioned in parallel. This repeats with the remaining results until one is left, so
+    only a logarithmic number of rounds is serial.
 
-    # Inform our node to union the table specified in join_list (insert the difference).
-    Network.write(sock, ['E', f_1,
-                         'INSERT INTO {} '.format(master_table) +
-                         'SELECT * '
-                         'FROM {} '.format(slave_table) +
-                         'EXCEPT SELECT * '
-                         'FROM {};'.format(master_table)])
+    :param joins: List of [URI, table] lists, one for the result of each join.
+    :param o: Dictionary of tuning options, passed along with the ships.
+    :return: The URI and table of the node holding the union of every result.
+    """
+    # Results on the same node are adjacent, so the first rounds need no ships.
+    level = sorted(joins)
 
-    # Handle our errors.
-    ErrorHandle.act_upon_error(Network.read(sock, net_handler), net_handler)
-    sock.close()
+    while len(level) > 1:
+        Parallel.execute_n(range(0, len(level) - 1, 2), execute_union,
+                           lambda _, i: (level[i], level[i + 1], o))
+        level = level[::2]
+
+    return level[0]
 
 
-def display_join(master_list):
+def display_join(master_list, o):
     """ Display the result of the join in pipe-delimited format. This result should be stored in
     a single table, whose URI and table name is specified in the given list.
     
     :param master_list: List containing the URI and table name of the node holding the result.
+    :param o: Dictionary of tuning options, passed along with the selection.
     :return: None.
     """
     node_uri, table = master_list
@@ -193,18 +339,11 @@ def display_join(master_list):
     net_handler = lambda e_n: Network.close_wrapper(e_n, ErrorHandle.fatal_handler, sock)
 
     # Gather result from join + union.
-    Network.write(sock, ['E', f, 'SELECT * '
-                                 'FROM {}'.format(table)])
-
-    # Wait for a response to be sent back, and print the response.
-    a = Network.read(sock, net_handler)
-    operation, resultant = ErrorHandle.act_upon_error(a, net_handler, True)
-    print('[' + ''.join([str(x) + ', ' for x in resultant]) + ']')
-
-    # Repeat. Operation code 'ES' marks the start of a message, and 'EZ' marks the end.
-    while operation != 'EZ':
-        a = Network.read(sock, net_handler)
-        operation, resultant = ErrorHandle.act_upon_error(a, net_handler, True)
+    Network.write(sock, ['F', f, 'SELECT * '
+                                 'FROM {}'.format(table), o])
+
+    # Print each tuple as it arrives. Tuples are sent in batches of 'FS', ending with 'FZ'.
+    for resultant in Network.read_tuples(sock, net_handler):
         print('| |' + ''.join([str(x) + ' | ' for x in resultant]) + '|')
 
     sock.close()
@@ -219,30 +358,84 @@ if __name__ == '__main__':
     catalog_uri = ErrorHandle.act_upon_error(ClusterCFG.catalog_uri(sys.argv[1]),
                                              ErrorHandle.fatal_handler, True)
     s = ErrorHandle.act_upon_error(SQLFile.as_string(sys.argv[2]), ErrorHandle.fatal_handler, True)
+    o = ErrorHandle.act_upon_error(ClusterCFG.options(sys.argv[1]), ErrorHandle.fatal_handler, True)
+    Pool.IDLE = o['idle']
 
     # Determine the working tables.
     t_tables = ErrorHandle.act_upon_error(SQLFile.table(s), ErrorHandle.fatal_handler, True)
     if len(t_tables) != 2:
         ErrorHandle.fatal_handler('There exists n != 2 tables involved in the given SQL.')
 
-    # Collect the node URIs for the first table. Do not proceed if we cannot reach the catalog.
-    r_1 = RemoteCatalog.return_node_uris(catalog_uri, t_tables[0])
-    nu_1 = ErrorHandle.act_upon_error(r_1, ErrorHandle.fatal_handler, True)
-
-    # Collect the node URIs for the second table.
-    r_2 = RemoteCatalog.return_node_uris(catalog_uri, t_tables[1])
-    nu_2 = ErrorHandle.act_upon_error(r_2, ErrorHandle.fatal_handler, True)
-
-    # For every join, execute the given statement and display any errors.
+    # Collect the partitioning of the first table. Do not proceed if we cannot reach the catalog.
+    r_1 = RemoteCatalog.return_partitions(catalog_uri, t_tables[0])
+    ps_1 = ErrorHandle.act_upon_error(r_1, ErrorHandle.fatal_handler, True)
+    nu_1 = [p['uri'] for p in ps_1]
+
+    # Collect the partitioning of the second table.
+    r_2 = RemoteCatalog.return_partitions(catalog_uri, t_tables[1])
+    ps_2 = ErrorHandle.act_upon_error(r_2, ErrorHandle.fatal_handler, True)
+    nu_2 = [p['uri'] for p in ps_2]
+
+    # Skip the pairs of nodes that cannot hold matching tuples. Outer joins must see every pair.
+    columns, is_outer = join_columns(s, t_tables), SQLFile.is_outer_join(s)
+    if is_outer:
+        pairs = set((x, y) for x in range(len(nu_1)) for y in range(len(nu_2)))
+    else:
+        pairs = Partition.join_pairs(ps_1, ps_2, columns) or {(0, 0)}
+
+    # Only ship the referenced columns of each table, and only the tuples that pass the conjuncts
+    # of that table alone. Outer joins must keep the tuples that fail a conjunct.
+    pushdowns = [SQLFile.pushdown(s, t) for t in t_tables]
+    if is_outer:
+        pushdowns = [{'where': None, 'columns': p['columns']} for p in pushdowns]
+
+    # If every pair to join lives on a single node, join on each node and skip the ship + union.
+    colocated = Partition.colocated_uris(ps_1, ps_2, pairs)
+    if len(colocated) != 0:
+        Parallel.execute_n(colocated, execute_local_join, lambda i, b: (b, i + 1, s, o))
+        sys.exit(0)
+
+    # Only one copy of a table that is not partitioned is needed.
+    owners = lambda ps: ps[:1] if Partition.is_full(ps) else ps
+
+    # Count the tuples of each table. If one is small enough, broadcast it to the other's nodes.
+    if not is_outer and o['join'] in ['auto', 'broadcast']:
+        counted = [[p['uri'], t] for ps, t in zip([ps_1, ps_2], t_tables) for p in owners(ps)]
+        Parallel.execute_n(counted, count_rows, lambda i, b: (b[0], i + 1, b[1]))
+        sizes = [sum(row_counts[(p['uri'], t)] for p in owners(ps))
+                 for ps, t in zip([ps_1, ps_2], t_tables)]
+
+        # The smaller table is broadcast, and the larger one is joined where it is.
+        x = 0 if sizes[0] < sizes[1] else 1
+        if o['join'] == 'broadcast' or sizes[x] <= o['broadcast']:
+            ps_s, ps_b = (ps_1, ps_2) if x == 0 else (ps_2, ps_1)
+            execute_exchanged_join([[p['uri'], t_tables[x], None, pushdowns[x]]
+                                    for p in owners(ps_s)],
+                                   [p['uri'] for p in owners(ps_b)], s, o)
+            sys.exit(0)
+
+    # If no pair could be skipped, shuffle both tables on the join column instead (inner only).
+    is_cross = len(pairs) == len(nu_1) * len(nu_2) > 1
+    if len(columns) != 0 and not is_outer and \
+            (o['join'] == 'shuffle' or (o['join'] == 'auto' and is_cross)):
+        # Every node of both tables sends its buckets to the nodes of the first table.
+        execute_exchanged_join([[b, t_tables[0], columns[0][0], pushdowns[0]] for b in nu_1] +
+                               [[b, t_tables[1], columns[0][1], pushdowns[1]] for b in nu_2],
+                               nu_1, s, o)
+        sys.exit(0)
+
+    # For every remaining join, execute the given statement and display any errors. Inner
+    # equi-joins only ship the tuples that pass a Bloom filter of the other node's join keys.
+    keys = columns[0] if len(columns) != 0 and not is_outer else None
     Parallel.execute_nm(nu_2, nu_1, execute_join,
-                        lambda y, x, b_2, b_1: (b_1, b_2, x * len(nu_2) + y, s, t_tables))
-
-    # Propagate our changes to a single node (i.e. the first node). This must be sequential.
-    list(map(lambda s_j: execute_union(successful_joins[0], s_j), successful_joins[1:]))
+                        lambda y, x, b_2, b_1: (b_1, b_2, x * len(nu_2) + y, s, t_tables, o, keys,
+                                                pushdowns[1]),
+                        lambda y, x, b_2, b_1: (x, y) in pairs)
 
-    # Perform the selection, and display the results.
-    display_join(successful_joins[0])
+    # Unless the results were streamed, propagate our changes to a single node and display them.
+    if o['union'] == 'tree':
+        display_join(execute_tree_union(successful_joins, o), o)
 
     # Remove the temporary tables created. Execute in parallel along nodes.
-    rem = lambda b: list(map(lambda a: remove_temp_table(b, a), find_temp_tables(b)))
+    rem = lambda b: remove_temp_tables(b, find_temp_tables(b))
     Parallel.execute_n(nu_1, rem, lambda _, b: (b, ))
@@ -8,139 +8,575 @@ Usage: python runLCSV.py [clustercfg] [csv]
 """
 
 import csv
+import multiprocessing
+import os
 import sys
+from bisect import bisect_right
+from queue import Empty, Queue
+from threading import Event, Thread
 
 from lib.catalog import RemoteCatalog
-from lib.dissect import ClusterCFG
+from lib.dissect import ClusterCFG, CSVFile
 from lib.error import ErrorHandle
-from lib.network import Network
+from lib.network import Columnar, Network, Pool
+from lib.parallel import Parallel
+from lib.partition import Partition
 
 
-def create_socket(n_i):
-    """ Given a node URI, attempt to create a socket. Any errors here are assumed to be fatal.
+class Batcher:
+    """
+    Buffers the tuples of a single node into batches, bounded by 'rows' and 'bytes'. Each batch
+    is packed as an 'LS' message as soon as it is full, so whoever builds the batches (be it the
+    caller, or a worker process) also pays for encoding and compressing these.
+    """
+
+    def __init__(self, o, put):
+        """ Constructor.
+
+        :param o: Dictionary of tuning options.
+        :param put: Function to hand each packed batch to.
+        """
+        self.o, self.put, self.batch, self.batch_b = o, put, [], 0
+
+    def add(self, t):
+        """ Add a tuple to the current batch. The batch is handed off once full.
+
+        :param t: Tuple to insert.
+        :return: None.
+        """
+        self.batch.append(t)
+        self.batch_b += sum(len(x) for x in t)
+        if len(self.batch) >= self.o['rows'] or self.batch_b >= self.o['bytes']:
+            self.flush()
+
+    def flush(self):
+        """ Pack and hand off the current batch (if any).
+
+        :return: None.
+        """
+        if len(self.batch) != 0:
+            self.put(Network.pack(['LS', Columnar.wrap(self.batch, self.o['codec'])], self.o))
+            self.batch, self.batch_b = [], 0
+
 
-    :param n_i: Node URI to create socket with.
-    :return An open socket to the desired node.
+class Loader:
+    """
+    Pipelined bulk load ('L') of tuples into the table of a single node. Tuples are buffered into
+    batches, which are sent by a thread of their own, so every node of the cluster is loaded at
+    once. Up to 'window' batches are sent before waiting on an acknowledgement, and up to 'window'
+    more wait in a queue before the caller does. The node stores every batch within a single
+    transaction, so nothing is visible until 'commit', unless the load is checkpointed.
     """
-    host, port, f_n = ClusterCFG.parse_uri(n_i)
-    return Network.open_client(host, port, ErrorHandle.fatal_handler), f_n
 
+    def __init__(self, n_i, s, o, failed, handler, key=None):
+        """ Constructor. Open a socket to the given node, start the load, and start the thread
+        that sends its batches. If the load is checkpointed, the offset of the CSV that the node
+        last checkpointed the load at is collected first.
+
+        :param n_i: Node URI to load the tuples into.
+        :param s: Prepared insertion SQL to execute for every tuple.
+        :param o: Dictionary of tuning options. 'rows' and 'bytes' bound the size of a batch, and
+            'window' bounds the number of unacknowledged batches.
+        :param failed: Event shared by the loaders of a cluster, set once any of these fails.
+        :param handler: Handler to call (from the caller's thread) if the load fails.
+        :param key: Key of the load if it is checkpointed, as a [table name, CSV key] list.
+        """
+        host, port, f_n = ClusterCFG.parse_uri(n_i)
+        self.sock, self.o, self.handler = Network.open_client(host, port, handler), o, handler
+        self.batcher, self.sent, self.acknowledged = Batcher(o, self.put), 0, 0
+        self.queue, self.failed, self.error = Queue(o['window']), failed, None
+
+        Network.write(self.sock, ['L', f_n, s, o] + ([] if key is None else [key]))
+        self.offset = 0 if key is None else ErrorHandle.act_upon_error(
+            Network.read(self.sock, handler), handler, True)[1]
+        self.thread = Thread(target=self._send, daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def _raise(e):
+        """ Helper method to raise the given error, be it an exception or an error string.
+
+        :param e: Exception or error string to raise.
+        :return: None.
+        """
+        ErrorHandle.raise_handler(e if isinstance(e, Exception) else
+                                  RuntimeError(str(e).replace('Error: ', '')))
+
+    def _acknowledge(self):
+        """ Wait for the next acknowledgement. Acknowledgements are cumulative: each holds the
+        number of batches the node has stored so far.
+
+        :return: None.
+        """
+        a = ErrorHandle.act_upon_error(Network.read(self.sock, Loader._raise), Loader._raise, True)
+        self.acknowledged = a[1]
+
+    def _write_packet(self, packet):
+        """ Send a packet to the node. If the node has stopped the load because of an error, the
+        error is read in place of an acknowledgement.
+
+        :param packet: Packet to send, as formatted by Network.pack.
+        :return: None.
+        """
+        r = ErrorHandle.attempt_operation(lambda: Network.write_packets(self.sock, [packet]),
+                                          OSError, lambda e: None)
+        self._acknowledge() if ErrorHandle.is_error(r) else None
+
+    def _write(self, message):
+        """ Send a message to the node (see '_write_packet').
+
+        :param message: Message to send.
+        :return: None.
+        """
+        self._write_packet(Network.pack(message, self.o))
+
+    def _send(self):
+        """ Send every batch put in our queue, until the end marker (None). Once every batch is
+        sent, wait until the node has stored all of these. If any loader of the cluster fails,
+        the remaining batches are discarded instead (the queue is still emptied, so the caller
+        is never stuck).
+
+        :return: None.
+        """
+        def _attempt(operation):
+            """ Perform the operation unless a loader has failed. Record our error otherwise. """
+            if self.failed.is_set():
+                return
+            try:
+                operation()
+            except Exception as e:
+                self.error = e
+                self.failed.set()
+
+        def _send_batch(packet):
+            """ Send a batch, and wait for acknowledgements while the window is full. """
+            self._write_packet(packet)
+            self.sent += 1
+            while self.sent - self.acknowledged >= self.o['window']:
+                self._acknowledge()
+
+        def _drain():
+            """ Wait for the acknowledgements of every batch sent. """
+            while self.acknowledged != self.sent:
+                self._acknowledge()
+
+        for packet in iter(self.queue.get, None):
+            _attempt(lambda: _send_batch(packet))
+        _attempt(_drain)
+
+    def add(self, t):
+        """ Add a tuple to the load. The current batch is queued once full.
+
+        :param t: Tuple to insert.
+        :return: None.
+        """
+        self.batcher.add(t)
+
+    def put(self, packet):
+        """ Queue a batch that was already packed (see Batcher). Stop the load if any loader of
+        the cluster failed.
+
+        :param packet: Packed 'LS' message holding the batch.
+        :return: None.
+        """
+        if self.failed.is_set():
+            self.handler(self.error)
+
+        self.queue.put(packet)
+
+    def flush(self):
+        """ Queue the current batch (if any). Stop the load if any loader of the cluster failed.
+
+        :return: None.
+        """
+        if self.failed.is_set():
+            self.handler(self.error)
+
+        self.batcher.flush()
+
+    def finish(self):
+        """ Queue the current batch, and wait until the node has stored every batch.
+
+        :return: None.
+        """
+        self.flush()
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+    def checkpoint(self, offset):
+        """ Queue the current batch, followed by a checkpoint ('LC') of the given offset, which
+        commits every batch before it on the node. Offsets the node has already reached are
+        ignored.
+
+        :param offset: Byte offset of the CSV, up to which every tuple of the node has been added.
+        :return: None.
+        """
+        if offset > self.offset:
+            self.flush()
+            self.put(Network.pack(['LC', offset], self.o))
+            self.offset = offset
 
-def send_insert(k, s_l, p_l, f_n, handler):
-    """ Construct the appropriate command list and send this over the given socket.
+    def prepare(self):
+        """ Ask the node to rebuild any indexes it dropped for the load ('LP'), once it has stored
+        every batch. This is where a load that violates a unique index fails, so the load can no
+        longer fail once committed.
 
-    :param k: Socket to send command list through.
-    :param s_l: List of prepared SQL strings to execute on the node.
-    :param p_l: List of parameters to attach to SQL strings when executing on the node.
-    :param f_n: Database filename to record to.
-    :param handler: Handler to call when reading from the socket fails.
-    :return: String containing the error if an error occurred while reading. Otherwise,
-        an operation message with an empty list.
+        :return: None.
+        """
+        self.finish()
+        if self.failed.is_set():
+            self.handler(self.error)
+
+        self._write(['LP'])
+        ErrorHandle.act_upon_error(Network.read(self.sock, self.handler), self.handler)
+
+    def commit(self):
+        """ Commit the load, and close the socket.
+
+        :return: None.
+        """
+        self.finish()
+        if self.failed.is_set():
+            self.handler(self.error)
+
+        self._write(['LZ'])
+        ErrorHandle.act_upon_error(Network.read(self.sock, self.handler), self.handler)
+        self.sock.close()
+
+    def abort(self):
+        """ Roll back the load, and close the socket. Errors are ignored, as the node rolls back
+        on its own if the connection is lost.
+
+        :return: None.
+        """
+        self.failed.set()
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+        ErrorHandle.attempt_operation(lambda: Network.write(self.sock, ['LX']), OSError,
+                                      lambda e: None)
+        self.sock.close()
+
+
+def insert_sql(r_dl):
+    """ Construct the prepared insertion SQL of the table being loaded.
+
+    :param r_dl: Dictionary of partitioning information.
+    :return: Prepared insertion SQL, with a parameter for every column.
     """
-    # Send our command. Only perform for non-empty entries.
-    for i, s, p in zip([x for x in range(len(s_l))], s_l, p_l):
-        if len(s) != 0 or len(p) != 0:
-            if i == len(s_l) - 1:
-                Network.write(k, ['YZ', f_n, s, p])
-                return Network.read(k, handler)
-            else:
-                Network.write(k, ['YS', f_n, s, p])
-                Network.read(k, handler)
+    return 'INSERT INTO ' + r_dl['tname'] + \
+        ' VALUES (' + ''.join(['?, ' for _ in range(len(r_dl['col_s']) - 1)]) + '?);'
+
+
+def update_catalog(c, r_dl, n):
+    """ Update the partition information in the catalog node, once the load has been committed.
+
+    :param c: Catalog node URI.
+    :param r_dl: Dictionary of partitioning information.
+    :param n: List of node URIs.
+    :return: None.
+    """
+    response_p = RemoteCatalog.update_partition(c, r_dl, len(n))
+    if ErrorHandle.is_error(response_p):
+        print(response_p)
+    else:
+        print('Catalog node has been updated with the partitions.')
+
+
+def open_loaders(n, r_dl, o, key=None):
+    """ Start a bulk load on every node in the cluster. If any node fails, the load is rolled back
+    on every node before exiting.
+
+    :param n: List of node URIs.
+    :param r_dl: Dictionary of partitioning information.
+    :param o: Dictionary of tuning options.
+    :param key: Key of the load if it is checkpointed (see Loader).
+    :return: List of loaders, in the same order as the node URIs.
+    """
+    s, loaders, failed = insert_sql(r_dl), [], Event()
+
+    def _handler(i):
+        """ Construct the handler of the 'i'th node, which rolls back every load and exits with
+        the error of the first node that failed (or the given one, if none did). """
+        def _abort(e):
+            i_e = next(((j, x.error) for j, x in enumerate(loaders) if x.error is not None),
+                       (i, e))
+            [x.abort() for x in loaders]
+            ErrorHandle.fatal_handler('[Node ' + str(i_e[0]) + ']: ' + str(i_e[1]))
+
+        return _abort
+
+    for i, n_i in enumerate(n):
+        loaders.append(Loader(n_i, s, o, failed, _handler(i), key))
+
+    return loaders
+
 
-        elif i == len(s_l) - 1:
-            # We have reached the end of our list but have nothing to send.
-            Network.write(k, ['YY'])
-            return Network.read(k, handler)
+def commit_loaders(loaders):
+    """ Commit the load on every node. Every node must have stored all of its batches (and rebuilt
+    its indexes) before any is committed, so a failure at this point is less likely to leave the
+    cluster half loaded.
+
+    :param loaders: List of loaders to commit.
+    :return: None.
+    """
+    [x.finish() for x in loaders]
+    [x.prepare() for x in loaders]
+    [x.commit() for x in loaders]
 
 
-def send_insert_selective(s_l, p_l, sock_f):
-    """ Construct the appropriate command list for a list of SQL strings, sockets, & files,
-    and send them to each node iff an insert is to actually occur (invalid SQL strings come from
-    partitioned nodes that don't perform inserts).
+def load_range(f_l, r, p, o, q):
+    """ Parse and route the rows of a byte range of the CSV, in a worker process. Each batch is
+    packed here, and put on the given queue as (node index, packet) for the loader of its node
+    to send. The end of the range is marked by (None, None), and an error by (None, error).
 
-    :param s_l: List of prepared SQL strings.
-    :param p_l: List of parameters to attach the SQL strings.
-    :param sock_f: List of lists of sockets (first element) and database filenames (second element).
+    :param f_l: Name of the CSV file.
+    :param r: Range of the CSV to load, as (start, end) byte offsets.
+    :param p: Routing dictionary (see Partition.route).
+    :param o: Dictionary of tuning options.
+    :param q: Queue shared with the parent process.
     :return: None.
     """
-    # Perform the insertion for each node in the cluster that has a valid insertion statement.
-    for i, sock_f_i in enumerate(sock_f):
-        handler = lambda e: list(map(lambda x: Network.write(x, ['YX']), list(zip(*sock_f))[0])) \
-                            and list(map(lambda x: x.close(), list(zip(*sock_f))[0])) and \
-                            ErrorHandle.fatal_handler('[Node ' + str(i) + ']: ' + str(e))
+    batchers = [Batcher(o, lambda packet, j=j: q.put((j, packet))) for j in range(p['n'])]
+
+    def _load():
+        """ Route each chunk of our range, and flush every batch once done. """
+        for chunk in CSVFile.chunks(csv.reader(CSVFile.read_range(f_l, r)), o['rows']):
+            for batcher, ts in zip(batchers, Partition.route(chunk, p)):
+                [batcher.add(t) for t in ts]
 
-        # If at any point we encounter an error, we stop.
-        ErrorHandle.act_upon_error(send_insert(sock_f_i[0], s_l[i], p_l[i], sock_f_i[1], handler),
-                                   handler)
+        [x.flush() for x in batchers]
 
+    e = ErrorHandle.attempt_operation(_load, (OSError, ValueError, IndexError, csv.Error),
+                                      ErrorHandle.default_handler)
+    q.put((None, e if ErrorHandle.is_error(e) else None))
 
-def read_csv(f_l):
-    """ Read a CSV into a CSV reader, and return any errors that arise as a result. If there are
-    no errors, return the CSV reader.
 
-    :param f_l: CSV file to read.
-    :return: A string containing the error if the file was not successfully read. Otherwise,
-        the CSV reader.
+def parallel_load(f_l, o, p, loaders, abort):
+    """ Parse and route the CSV across 'workers' processes, each handling its own byte range of
+    the file, and hand their batches to the loader of each node. The queue between the workers
+    and us is bounded, so a slow node holds the workers back instead of filling our memory.
+
+    :param f_l: Name of the CSV file.
+    :param o: Dictionary of tuning options.
+    :param p: Routing dictionary (see Partition.route).
+    :param loaders: List of loaders, in the same order as the node URIs.
+    :param abort: Handler to call if any worker fails.
+    :return: None.
     """
+    ranges = ErrorHandle.act_upon_error(CSVFile.split(f_l, o['workers']), abort, True)
+    q = multiprocessing.Queue(len(loaders) * o['window'])
+    workers = [Parallel.spawn_process(load_range, (f_l, r, p, o, q)) for r in ranges]
+
+    try:
+        remaining = len(workers)
+        while remaining != 0:
+            item = ErrorHandle.attempt_operation(lambda: q.get(timeout=1), Empty,
+                                                 ErrorHandle.default_handler, True)
+
+            # A worker that dies without a word never marks the end of its range.
+            if ErrorHandle.is_error(item):
+                if any(w.exitcode not in [None, 0] for w in workers):
+                    abort('A worker process exited unexpectedly.')
+
+            elif item[0] is not None:
+                loaders[item[0]].put(item[1])
+            elif item[1] is not None:
+                abort(item[1])
+            else:
+                remaining -= 1
 
-    def _read():
-        """
+    finally:
+        # Workers that are still running (we are exiting with an error) are stopped here.
+        [w.terminate() for w in workers if w.is_alive()]
 
-        :return:
-        """
-        csv_l = []
-        with open(f_l) as csv_f:
-            [csv_l.append(x) for x in csv.reader(csv_f)]
 
-        return csv_l
+def stream_load(n, c, r_dl, f_l, o, p):
+    """ Load the given CSV into the cluster, one chunk at a time. Each chunk is split into the
+    tuples of each node, which are buffered and sent by the loader of that node. Memory use is
+    bounded by the chunk, and the batches each loader holds. If more than one worker is asked
+    for, the CSV is parsed and routed by that many processes instead (see 'parallel_load').
 
-    return ErrorHandle.attempt_operation(_read, FileNotFoundError, ErrorHandle.default_handler,
-                                         True)
+    :param n: List of node URIs.
+    :param c: Catalog node URI.
+    :param r_dl: Dictionary of partitioning information.
+    :param f_l: Name of the CSV file.
+    :param o: Dictionary of tuning options.
+    :param p: Routing dictionary (see Partition.route).
+    :return: None.
+    """
+    if o['workers'] == 1:
+        chunks = ErrorHandle.act_upon_error(CSVFile.read(f_l, o['rows']),
+                                            ErrorHandle.fatal_handler, True)
+    loaders = open_loaders(n, r_dl, o)
+
+    def _abort(e):
+        """ Roll back the load on every node, and exit with the given error. """
+        [x.abort() for x in loaders]
+        ErrorHandle.fatal_handler('Could not partition the CSV: ' + str(e))
+
+    # Route each chunk, and hand the tuples of each node to its loader.
+    if o['workers'] == 1:
+        for chunk in chunks:
+            routed = ErrorHandle.attempt_operation(lambda: Partition.route(chunk, p),
+                                                   (ValueError, IndexError), _abort, True)
+            for loader, ts in zip(loaders, routed):
+                [loader.add(t) for t in ts]
+    else:
+        parallel_load(f_l, o, p, loaders, _abort)
 
+    # Commit the load on every node.
+    commit_loaders(loaders)
+    print('Insertion was successful.')
+    update_catalog(c, r_dl, n)
 
-def nopart_load(n, c, r_dl, f_l):
-    """ There exists no partitioning. We execute each insertion on every node in the cluster.
-    Display any errors that occur.
+
+def checkpointed_load(n, c, r_dl, f_l, o, p):
+    """ Load the given CSV into the cluster, committing every 'checkpoint' rows along with the
+    byte offset of the CSV reached. Each node records its own offset, so a load that fails keeps
+    every tuple up to its last checkpoint, and a rerun resumes each node from its own offset.
+    A load that was completed is started over.
 
     :param n: List of node URIs.
     :param c: Catalog node URI.
     :param r_dl: Dictionary of partitioning information.
     :param f_l: Name of the CSV file.
+    :param o: Dictionary of tuning options.
+    :param p: Routing dictionary (see Partition.route).
     :return: None.
     """
-    # Construct a list of insertion strings.
-    csv_l = ErrorHandle.act_upon_error(read_csv(f_l), ErrorHandle.fatal_handler, True)
-    s_l, p_l = [[] for _ in csv_l], [[] for _ in csv_l]
-    for i, ell in enumerate(csv_l):
-        if len(ell) != 0:
-            s_l[i] = 'INSERT INTO ' + r_dl['tname'] + ' VALUES '
-            s_l[i] += '(' + ''.join(['?, ' for _ in range(len(ell) - 1)]) + '?);'
-            p_l[i] = ell
-
-    # For each node in the node URIs, construct a socket.
-    sock_f = list(map(lambda x: create_socket(x), n))
-    close_sockets = lambda s_f: list(map(lambda x: x.close(), list(zip(*s_f))[0]))
-    dont_commit = lambda s_f: list(map(lambda x: Network.write(x, ['YX']), list(zip(*s_f))[0]))
-
-    # Perform the insertion for each node in the cluster. List must be flattened beforehand.
-    for i, sock_f_i in enumerate(sock_f):
-        handler_i = lambda e: ErrorHandle.fatal_handler('[Node ' + str(i) + ']: ' + str(e))
-        send_insert(sock_f_i[0], s_l, p_l, sock_f_i[1],
-                    lambda e: handler_i(e) and dont_commit(sock_f) and close_sockets(sock_f))
-
-    # Close all sockets.
-    close_sockets(sock_f)
+    size = ErrorHandle.act_upon_error(ErrorHandle.attempt_operation(
+        lambda: os.path.getsize(f_l), OSError, ErrorHandle.default_handler, True),
+        ErrorHandle.fatal_handler, True)
+    loaders = open_loaders(n, r_dl, o, [r_dl['tname'], os.path.abspath(f_l) + ':' + str(size)])
+
+    def _abort(e):
+        """ Roll back the load on every node, and exit with the given error. """
+        [x.abort() for x in loaders]
+        ErrorHandle.fatal_handler('Could not partition the CSV: ' + str(e))
+
+    # Start over if every node has completed the load. Otherwise, resume from the earliest node.
+    if all(x.offset == size for x in loaders):
+        for x in loaders:
+            x.offset = 0
+    start = min(x.offset for x in loaders)
+    if start != 0:
+        print('Resuming the load from byte ' + str(start) + ' of ' + str(size) + '.')
+
+    chunks = ErrorHandle.act_upon_error(CSVFile.read_offsets(f_l, start, o['rows']), _abort, True)
+    rows = 0
+    for chunk, ends in chunks:
+        # Skip the rows that each node has already checkpointed. Past the earliest checkpoint,
+        # every node starts at the same row, so each chunk is routed once.
+        routed = {}
+        for j, loader in enumerate(loaders):
+            k = bisect_right(ends, loader.offset)
+            if k not in routed:
+                routed[k] = ErrorHandle.attempt_operation(lambda: Partition.route(chunk[k:], p),
+                                                          (ValueError, IndexError), _abort, True)
+            [loader.add(t) for t in routed[k][j]]
+
+        # Checkpoint every node once enough rows have been added.
+        rows += len(chunk)
+        if rows >= o['checkpoint']:
+            [x.checkpoint(ends[-1]) for x in loaders]
+            rows = 0
+
+    # Commit the load on every node, along with its final checkpoint.
+    [x.checkpoint(size) for x in loaders]
+    commit_loaders(loaders)
     print('Insertion was successful.')
+    update_catalog(c, r_dl, n)
 
-    # Update the partition information in the catalog node.
-    response_p = RemoteCatalog.update_partition(c, r_dl, len(n))
-    if ErrorHandle.is_error(response_p):
-        print(response_p)
+
+def node_load(n, c, r_dl, f_l, o, p):
+    """ Load a CSV that every node reads for itself ('I'), so no tuple passes through us. With
+    'node', each node reads the entire CSV and keeps only the tuples it owns. With 'shard', each
+    node stores every tuple of its own shard, split beforehand. Every '{node}' in the path is
+    replaced with the node number. Each node holds its transaction open until every node is done,
+    so a failure on any node rolls back every node.
+
+    :param n: List of node URIs.
+    :param c: Catalog node URI.
+    :param r_dl: Dictionary of partitioning information.
+    :param f_l: Path of the CSV file, as seen by each node.
+    :param o: Dictionary of tuning options.
+    :param p: Routing dictionary (see Partition.route).
+    :return: None.
+    """
+    s, socks = insert_sql(r_dl), []
+
+    def _abort(e):
+        """ Roll back the load on every node, and exit with the given error. """
+        for k in socks:
+            ErrorHandle.attempt_operation(lambda: Network.write(k, ['IX']), OSError,
+                                          lambda e_n: None)
+            k.close()
+        ErrorHandle.fatal_handler(e)
+
+    # Start the load on every node. Every node parses and stores its tuples at once.
+    for j, n_j in enumerate(n):
+        host, port, f_n = ClusterCFG.parse_uri(n_j)
+        socks.append(ErrorHandle.act_upon_error(Network.open_client(host, port), _abort, True))
+
+        p_j, i = (p, j) if o['source'] == 'node' else ({'partmtd': 0, 'n': 1}, 0)
+        Network.write(socks[-1], ['I', f_n, s, f_l.replace('{node}', str(j + 1)), p_j, i, o])
+
+    # Wait for every node to store its tuples.
+    for j, k in enumerate(socks):
+        ErrorHandle.act_upon_error(Network.read(k),
+                                   lambda e: _abort('[Node ' + str(j) + ']: ' + str(e)))
+
+    # Commit the load on every node.
+    for k in socks:
+        Network.write(k, ['IZ'])
+    for k in socks:
+        ErrorHandle.act_upon_error(Network.read(k), ErrorHandle.fatal_handler)
+        k.close()
+
+    print('Insertion was successful.')
+    update_catalog(c, r_dl, n)
+
+
+def load_csv(n, c, r_dl, f_l, o, p):
+    """ Load the given CSV into the cluster. The CSV is read by us (see 'stream_load'), unless
+    the 'source' option asks for every node to read it for itself (see 'node_load'). A load read
+    by a single process of ours may be checkpointed instead (see 'checkpointed_load').
+
+    :param n: List of node URIs.
+    :param c: Catalog node URI.
+    :param r_dl: Dictionary of partitioning information.
+    :param f_l: Name of the CSV file.
+    :param o: Dictionary of tuning options.
+    :param p: Routing dictionary (see Partition.route).
+    :return: None.
+    """
+    if o['source'] != 'client':
+        node_load(n, c, r_dl, f_l, o, p)
+    elif o['checkpoint'] != 0 and o['workers'] == 1:
+        checkpointed_load(n, c, r_dl, f_l, o, p)
     else:
-        print('Catalog node has been updated with the partitions.')
+        stream_load(n, c, r_dl, f_l, o, p)
+
+
+def nopart_load(n, c, r_dl, f_l, o):
+    """ There exists no partitioning. We execute each insertion on every node in the cluster.
+    Display any errors that occur.
+
+    :param n: List of node URIs.
+    :param c: Catalog node URI.
+    :param r_dl: Dictionary of partitioning information.
+    :param f_l: Name of the CSV file.
+    :param o: Dictionary of tuning options.
+    :return: None.
+    """
+    # Send each tuple to every node in the cluster.
+    load_csv(n, c, r_dl, f_l, o, {'partmtd': 0, 'n': len(n)})
 
 
-def hashpart_load(n, c, r_dl, f_l):
+def hashpart_load(n, c, r_dl, f_l, o):
     """ There exists a hash partition on the cluster. Determine which data gets inserted into
     where appropriately. The hash function: X = ( partcol mod partparam1 ) + 1 is applied.
 
@@ -148,6 +584,7 @@ def hashpart_load(n, c, r_dl, f_l):
     :param c: Catalog node URI.
     :param r_dl: Dictionary of partitioning information.
     :param f_l: Name of the CSV file.
+    :param o: Dictionary of tuning options.
     :return: None.
     """
     # 'param1' is the number of nodes.
@@ -160,82 +597,74 @@ def hashpart_load(n, c, r_dl, f_l):
                                       (ValueError, KeyError), ErrorHandle.fatal_handler, True)
     ErrorHandle.act_upon_error(y, ErrorHandle.fatal_handler)
 
-    # Construct a list of insertion strings.
-    h = lambda b: (b % p) + 1
-    csv_l = ErrorHandle.act_upon_error(read_csv(f_l), ErrorHandle.fatal_handler, True)
-    s_l, p_l = [[[] for _ in csv_l] for q in n], [[[] for _ in csv_l] for q in n]
-    for i, ell in enumerate(csv_l):
-        if len(ell) != 0:
-            h_ell = h(int(ell[y])) - 1
-            s_l[h_ell][i] = 'INSERT INTO ' + r_dl['tname'] + ' VALUES '
-            s_l[h_ell][i] += '(' + ''.join(['?, ' for _ in range(len(ell) - 1)]) + '?);'
-            p_l[h_ell][i] = ell
-
-    # For each node in the node URIs, construct a socket.
-    sock_f = list(map(lambda x: create_socket(x), n))
-    close_sockets = lambda s_f: list(map(lambda x: x.close(), list(zip(*s_f))[0]))
-
-    # Insert the data into their respective nodes.
-    send_insert_selective(s_l, p_l, sock_f)
-    print('Insertion was successful.'), close_sockets(sock_f)
-
-    # Update the partition information in the catalog node.
-    response_p = RemoteCatalog.update_partition(c, r_dl, len(n))
-    if ErrorHandle.is_error(response_p):
-        print(response_p)
-    else:
-        print('Catalog node has been updated with the partitions.')
+    load_csv(n, c, r_dl, f_l, o, {'partmtd': 2, 'n': len(n), 'y': y, 'param1': p})
 
 
-def rangepart_load(n, c, r_dl, f_l):
+def sample_bounds(c, r_dl, f_l, o, y, numnodes):
+    """ Determine the bounds of a range partitioning from a sample of the partitioned column of
+    the CSV, such that each node holds about the same number of tuples. If the catalog node
+    already records ranges on this column for every node, these are kept instead, so tuples that
+    were loaded before are never left on the wrong node.
+
+    :param c: Catalog node URI.
+    :param r_dl: Dictionary of partitioning information. 'sample' is the size of the sample.
+    :param f_l: Name of the CSV file.
+    :param o: Dictionary of tuning options.
+    :param y: Index of the partitioned column.
+    :param numnodes: Number of nodes in the cluster.
+    :return: List of ranges, as (lower, upper) bounds, in the same order as the nodes.
+    """
+    ps = ErrorHandle.act_upon_error(RemoteCatalog.return_partitions(c, r_dl['tname']),
+                                    ErrorHandle.fatal_handler, True)
+    if len(ps) == numnodes and all(x['partmtd'] == 1 and x['partcol'] == r_dl['partcol']
+                                   for x in ps):
+        print('Using the ranges recorded in the catalog node.')
+        return [(float(x['param1']), float(x['param2'])) for x in ps]
+
+    # Shards are read by each node, and so cannot be sampled here.
+    if o['source'] == 'shard':
+        ErrorHandle.fatal_handler('Ranges cannot be sampled from shards. Specify the bounds of '
+                                  'each node instead.')
+
+    # Sample the partitioned column in a single pass over the CSV.
+    chunks = ErrorHandle.act_upon_error(CSVFile.read(f_l, o['rows']),
+                                        ErrorHandle.fatal_handler, True)
+    keys = (int(t[y]) for chunk in chunks for t in chunk)
+    sample = ErrorHandle.attempt_operation(lambda: Partition.reservoir(keys, r_dl['sample']),
+                                           (ValueError, IndexError, csv.Error),
+                                           ErrorHandle.fatal_handler, True)
+
+    return Partition.equi_depth(sample, numnodes)
+
+
+def rangepart_load(n, c, r_dl, f_l, o):
     """ There exists a range partitioning on the cluster. Determine which data gets inserted into
-    where appropriately. Each range is applied as such: partparam1 < partcol <= partparam2.
+    where appropriately. Each range is applied as such: partparam1 < partcol <= partparam2. If
+    the ranges are to be sampled, these are determined first (see 'sample_bounds').
 
     :param n: List of node URIs.
     :param c: Catalog node URI.
     :param r_dl: Dictionary of partitioning information.
     :param f_l: Name of the CSV file.
+    :param o: Dictionary of tuning options.
     :return: None.
     """
+    # Determine the index of the partitioned column.
+    y = ErrorHandle.attempt_operation(lambda: r_dl['col_s'].index(r_dl['partcol']),
+                                      (ValueError, KeyError), ErrorHandle.fatal_handler, True)
+
+    # Sample the ranges if asked to. These are recorded in the catalog node once loaded.
+    if 'sample' in r_dl:
+        r_sampled = sample_bounds(c, r_dl, f_l, o, y, len(n))
+        r_dl.update({'param1': [a[0] for a in r_sampled], 'param2': [a[1] for a in r_sampled]})
+
     # Ranges must be ordered from lower to higher.
     r_bounds = list(zip(r_dl['param1'], r_dl['param2']))
     if any(list(map(lambda a: a[0] > a[1], r_bounds))):
         ErrorHandle.fatal_handler('\'param1\' must be less than \'param2\'.')
 
-    # Determine the index of the partitioned column.
-    y = ErrorHandle.attempt_operation(lambda: r_dl['col_s'].index(r_dl['partcol']),
-                                      (ValueError, KeyError), ErrorHandle.fatal_handler, True)
-
-    # Construct a list of insertion strings.
-    csv_l = ErrorHandle.act_upon_error(read_csv(f_l), ErrorHandle.fatal_handler, True)
-    s_l, p_l = [[[] for _ in csv_l] for q in n], [[[] for _ in csv_l] for q in n]
-    for i, ell in enumerate(csv_l):
-        if len(ell) != 0:
-            for j, bounds in enumerate(r_bounds):
-                if bounds[0] < int(ell[y]) <= bounds[1]:
-                    s_l[j][i] = 'INSERT INTO ' + r_dl['tname'] + ' VALUES '
-                    s_l[j][i] += '(' + ''.join(['?, ' for _ in range(len(ell) - 1)]) + '?);'
-                    p_l[j][i] = ell
-
-    # For each node in the node URIs, construct a socket.
-    sock_f = list(map(lambda x: create_socket(x), n))
-    if not all(sock_f):
-        print('Error: All nodes in cluster could not be reached.'), exit(7)
-
-    # For each node in the node URIs, construct a socket.
-    sock_f = list(map(lambda x: create_socket(x), n))
-    close_sockets = lambda s_f: list(map(lambda x: x.close(), list(zip(*s_f))[0]))
-
-    # Insert the data into their respective nodes.
-    send_insert_selective(s_l, p_l, sock_f)
-    print('Insertion was successful.'), close_sockets(sock_f)
-
-    # Update the partition information in the catalog node.
-    response_p = RemoteCatalog.update_partition(c, r_dl, len(n))
-    if ErrorHandle.is_error(response_p):
-        print(response_p)
-    else:
-        print('Catalog node has been updated with the partitions.')
+    load_csv(n, c, r_dl, f_l, o, {'partmtd': 1, 'n': len(n), 'y': y, 'bounds': r_bounds,
+                                  'sorted': Partition.sort_ranges(r_bounds)})
 
 
 if __name__ == '__main__':
@@ -255,8 +684,14 @@ if __name__ == '__main__':
     if r_d['partmtd'] in [1, 2] and numnodes != len(node_uris):
         ErrorHandle.fatal_handler('Incorrect number of nodes specified in \'clustercfg\'.')
 
+    # Collect the batch and window limits of the load.
+    options = ErrorHandle.act_upon_error(ClusterCFG.options(sys.argv[1]),
+                                         ErrorHandle.fatal_handler, True)
+    Pool.IDLE = options['idle']
+
     # Extract the columns from the table, using the first node.
-    sock, f = create_socket(node_uris[0])
+    host_0, port_0, f = ClusterCFG.parse_uri(node_uris[0])
+    sock = Network.open_client(host_0, port_0, ErrorHandle.fatal_handler)
 
     # Read our response from the socket. Handle errors appropriately.
     Network.write(sock, ['P', f, r_d['tname']])
@@ -266,4 +701,4 @@ if __name__ == '__main__':
     # Determine the partitioning. Use the appropriate load function when determined.
     r_d.update({'col_s': response[1]}), sock.close()
     [nopart_load, rangepart_load, hashpart_load][r_d['partmtd']] \
-        (node_uris, catalog_uri, r_d, sys.argv[2])
+        (node_uris, catalog_uri, r_d, sys.argv[2], options)
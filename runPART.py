@@ -0,0 +1,262 @@
+# coding=utf-8
+"""
+Repartitions a table of a cluster of computers in place, as given by a clustercfg. Only the tuples
+whose nodes change are moved, directly from node to node, and the catalog node is switched to the
+new partitioning once every node is ready to be.
+
+Usage: python runPART.py [clustercfg]
+"""
+
+import sys
+from itertools import chain
+
+from lib.catalog import RemoteCatalog
+from lib.database import Database
+from lib.dissect import ClusterCFG
+from lib.error import ErrorHandle
+from lib.network import Network, Pool
+from lib.parallel import Parallel
+from lib.partition import Partition
+
+# Used to store the error of each **failed** exchange.
+failed_nodes = []
+
+
+def current_routing(ps, col_s):
+    """ Construct the routing dictionary (see Partition.route) of the current partitioning of a
+    table, as recorded in the catalog node.
+
+    :param ps: List of partition dictionaries of the table, ordered by node ID.
+    :param col_s: List of the columns of the table.
+    :return: The routing dictionary of the current partitioning.
+    """
+    p = {'partmtd': ps[0]['partmtd'], 'n': len(ps)}
+    if p['partmtd'] == 0:
+        return p
+
+    p.update({'y': col_s.index(ps[0]['partcol'])})
+    if p['partmtd'] == 2:
+        p.update({'param1': int(float(ps[0]['param1']))})
+    else:
+        p.update({'bounds': [(float(x['param1']), float(x['param2'])) for x in ps]})
+        p.update({'sorted': Partition.sort_ranges(p['bounds'])})
+
+    return p
+
+
+def sample_bounds(ps, r_d, o, numnodes):
+    """ Determine the bounds of a new range partitioning from a sample of the partitioned column,
+    streamed from every node holding the table (only the first, if the table is not partitioned),
+    such that each node holds about the same number of tuples.
+
+    :param ps: List of partition dictionaries of the table, ordered by node ID.
+    :param r_d: Dictionary of the new partitioning. 'sample' is the size of the sample.
+    :param o: Dictionary of tuning options.
+    :param numnodes: Number of nodes of the new partitioning.
+    :return: List of ranges, as (lower, upper) bounds, in the same order as the nodes.
+    """
+    def _read(p):
+        """ Generator over the partitioned column of the tuples of a single node. NULLs belong to
+        the first node whatever the bounds are, so these are not sampled. """
+        host, port, f = ClusterCFG.parse_uri(p['uri'])
+        sock = Network.open_client(host, port, ErrorHandle.fatal_handler)
+        Network.write(sock, ['F', f, 'SELECT {0} FROM {1} WHERE {0} IS NOT NULL'.format(
+            r_d['partcol'], r_d['tname']), o])
+        yield from (int(r_t[0]) for r_t in Network.read_tuples(sock, ErrorHandle.fatal_handler))
+        sock.close()
+
+    sources = ps[:1] if ps[0]['partmtd'] == 0 else ps
+    sample = ErrorHandle.attempt_operation(
+        lambda: Partition.reservoir(chain.from_iterable(map(_read, sources)), r_d['sample']),
+        (ValueError, TypeError), ErrorHandle.fatal_handler, True)
+
+    return Partition.equi_depth(sample, numnodes)
+
+
+def new_routing(r_d, col_s, numnodes):
+    """ Construct the routing dictionary (see Partition.route) of the new partitioning of a table,
+    as given in the clustercfg.
+
+    :param r_d: Dictionary of the new partitioning.
+    :param col_s: List of the columns of the table.
+    :param numnodes: Number of nodes of the new partitioning.
+    :return: The routing dictionary of the new partitioning.
+    """
+    p = {'partmtd': r_d['partmtd'], 'n': numnodes}
+    if p['partmtd'] == 0:
+        return p
+
+    # Determine the index of the partitioned column.
+    y = ErrorHandle.attempt_operation(lambda: col_s.index(r_d['partcol']),
+                                      (ValueError, KeyError), ErrorHandle.fatal_handler, True)
+    p.update({'y': y})
+    if p['partmtd'] == 2:
+        p.update({'param1': r_d['param1']})
+        return p
+
+    # Ranges must be ordered from lower to higher.
+    r_bounds = list(zip(r_d['param1'], r_d['param2']))
+    if any(list(map(lambda a: a[0] > a[1], r_bounds))):
+        ErrorHandle.fatal_handler('\'param1\' must be less than \'param2\'.')
+    p.update({'bounds': r_bounds, 'sorted': Partition.sort_ranges(r_bounds)})
+
+    return p
+
+
+def execute_moves(node_uri, i, tname, column, new_uris, staging, o, m):
+    """ Inform a node to send the tuples of a table whose nodes change to their new nodes. Each
+    new node stores the tuples it is sent in the given staging table, until the switch.
+
+    :param node_uri: URI of the node holding the tuples to move.
+    :param i: Current index of the node.
+    :param tname: Name of the table to repartition.
+    :param column: Partitioned column of the new partitioning, if any.
+    :param new_uris: URIs of the nodes of the new partitioning.
+    :param staging: Name of the table to store the moved tuples in, on every new node.
+    :param o: Dictionary of tuning options, passed along with the exchange.
+    :param m: Repartitioning dictionary (see Partition.moves), without the index of the node.
+    :return: None.
+    """
+    host, port, f = ClusterCFG.parse_uri(node_uri)
+
+    # Inform the node to send its tuples, and wait until every new node has stored these.
+    a = Pool.request(host, port, ['X', node_uri, tname, column, new_uris, staging, o, None,
+                                  dict(m, i=i)], lambda e: None)
+    if ErrorHandle.is_error(a):
+        failed_nodes.append('[Node ' + str(i + 1) + ']: ' + str(a).replace('Error: ', ''))
+
+
+def remove_staging(uris, staging):
+    """ Remove the staging table from every given node, if it exists. Errors are ignored, as this
+    is only done once the repartitioning has already failed. The staging table is named as other
+    temporary tables are, so one left behind is removed by the next runJSQL.
+
+    :param uris: URIs of the nodes to remove the staging table from.
+    :param staging: Name of the staging table.
+    :return: None.
+    """
+    for node_uri in uris:
+        host, port, f = ClusterCFG.parse_uri(node_uri)
+        Pool.request(host, port, ['E', f, 'DROP TABLE IF EXISTS ' + staging], lambda e: None)
+
+
+def switch_nodes(c, r_d, uris, old_uris, new_uris, create_sql, staging, p, o):
+    """ Switch every node of the table to the new partitioning ('A'), and then the catalog node.
+    Each node holds its transaction open until every node is ready, so a failure on any node (or
+    the catalog node) rolls back every node.
+
+    :param c: Catalog node URI.
+    :param r_d: Dictionary of the new partitioning.
+    :param uris: URIs of every node, be it of the current or the new partitioning.
+    :param old_uris: URIs of the nodes of the current partitioning.
+    :param new_uris: URIs of the nodes of the new partitioning.
+    :param create_sql: Creation SQL of the table, for the nodes that are new to it.
+    :param staging: Name of the staging table.
+    :param p: Routing dictionary of the new partitioning.
+    :param o: Dictionary of tuning options.
+    :return: List of (node URI, number of tuples held afterward) pairs, for every node.
+    """
+    socks, counts = [], []
+
+    def _abort(e):
+        """ Roll back the switch on every node, and exit with the given error. """
+        for k in socks:
+            ErrorHandle.attempt_operation(lambda: Network.write(k, ['AX']), OSError,
+                                          lambda e_n: None)
+            k.close()
+        remove_staging(uris, staging)
+        ErrorHandle.fatal_handler(e)
+
+    # Start the switch on every node. Every node switches its table at once.
+    for node_uri in uris:
+        host, port, f = ClusterCFG.parse_uri(node_uri)
+        socks.append(ErrorHandle.act_upon_error(Network.open_client(host, port), _abort, True))
+
+        j = new_uris.index(node_uri) if node_uri in new_uris else None
+        Network.write(socks[-1], ['A', f, r_d['tname'], r_d.get('partcol'), staging, p, j,
+                                  None if node_uri in old_uris else create_sql, o])
+
+    # Wait for every node to be ready, and then switch the catalog node.
+    for j, k in enumerate(socks):
+        a = ErrorHandle.act_upon_error(Network.read(k), lambda e: _abort(
+            '[' + uris[j] + ']: ' + str(e)), True)
+        counts.append(a[1])
+    ErrorHandle.act_upon_error(RemoteCatalog.update_partition(c, r_d, len(new_uris), new_uris),
+                               _abort)
+
+    # Commit the switch on every node.
+    for k in socks:
+        Network.write(k, ['AZ'])
+    for k in socks:
+        ErrorHandle.act_upon_error(Network.read(k), ErrorHandle.fatal_handler)
+        k.close()
+
+    return list(zip(uris, counts))
+
+
+if __name__ == '__main__':
+    # Ensure that we only have 1 argument.
+    if len(sys.argv) != 2:
+        ErrorHandle.fatal_handler('Usage: python3 runPART.py [clustercfg]')
+
+    # Dissect the given clustercfg for the new partitioning, and the catalog information.
+    catalog_uri, r_d, numnodes = ErrorHandle.act_upon_error(ClusterCFG.load(sys.argv[1]),
+                                                            ErrorHandle.fatal_handler, True)
+    options = ErrorHandle.act_upon_error(ClusterCFG.options(sys.argv[1]),
+                                         ErrorHandle.fatal_handler, True)
+    Pool.IDLE = options['idle']
+
+    # Collect the current partitioning of the table. It must have been loaded before.
+    partitions = ErrorHandle.act_upon_error(RemoteCatalog.return_partitions(catalog_uri,
+                                                                            r_d['tname']),
+                                            ErrorHandle.fatal_handler, True)
+    if any(x['partmtd'] is None for x in partitions):
+        ErrorHandle.fatal_handler('Table has not been partitioned by \'runLCSV.py\'.')
+
+    # The table is moved onto the nodes of the clustercfg if any are listed, or kept on its own.
+    y = ClusterCFG.node_uris(sys.argv[1])
+    node_uris = [x['uri'] for x in partitions] if ErrorHandle.is_error(y) else y
+    if r_d['partmtd'] in [1, 2] and numnodes != len(node_uris):
+        ErrorHandle.fatal_handler('Incorrect number of nodes specified in \'clustercfg\'.')
+
+    # Collect the columns and the creation SQL of the table, using the first node.
+    host_0, port_0, f_0 = ClusterCFG.parse_uri(partitions[0]['uri'])
+    a_0 = Pool.requests(host_0, port_0, [['P', f_0, r_d['tname']],
+                                         ['F', f_0, 'SELECT sql '
+                                                    'FROM sqlite_master '
+                                                    'WHERE type = "table" AND '
+                                                    'name = "{}"'.format(r_d['tname'])]],
+                        ErrorHandle.fatal_handler)
+    response_p, response_f = ErrorHandle.act_upon_error(a_0, ErrorHandle.fatal_handler, True)
+    col_s = ErrorHandle.act_upon_error(response_p[0], ErrorHandle.fatal_handler, True)[1]
+    create_s = [r_t for batch in response_f
+                for r_t in ErrorHandle.act_upon_error(batch, ErrorHandle.fatal_handler, True)[1]]
+
+    # Sample the new ranges if asked to.
+    if 'sample' in r_d:
+        r_sampled = sample_bounds(partitions, r_d, options, len(node_uris))
+        r_d.update({'param1': [a[0] for a in r_sampled], 'param2': [a[1] for a in r_sampled]})
+
+    # Determine which node each tuple is on now, and which it will be on.
+    p_new = new_routing(r_d, col_s, len(node_uris))
+    moves = {'old': current_routing(partitions, col_s), 'new': p_new,
+             'map': [node_uris.index(x['uri']) if x['uri'] in node_uris else None
+                     for x in partitions]}
+
+    # Send the tuples whose nodes change from every node at once, into a staging table. Every
+    # node that sends or receives tuples holds a staging table.
+    staging_table = Database.random_name(False)
+    old_node_uris = [x['uri'] for x in partitions]
+    all_uris = old_node_uris + [u for u in node_uris if u not in old_node_uris]
+    Parallel.execute_n(old_node_uris, execute_moves,
+                       lambda i, b: (b, i, r_d['tname'], r_d.get('partcol'), node_uris,
+                                     staging_table, options, moves))
+    if len(failed_nodes) != 0:
+        remove_staging(all_uris, staging_table)
+        ErrorHandle.fatal_handler(failed_nodes[0])
+
+    # Switch every node, and the catalog node, to the new partitioning.
+    for uri, count in switch_nodes(catalog_uri, r_d, all_uris, old_node_uris, node_uris,
+                                   create_s[0][0] + ';', staging_table, p_new, options):
+        print('Node [' + uri + ']: ' + str(count) + ' tuples.')
+    print('Repartitioning was successful.')
@@ -0,0 +1,57 @@
+# coding=utf-8
+"""
+Unit tests for the Bloom filters of lib/bloom.py. These do not require any daemons.
+
+Usage: python3 -m unittest discover test/lib
+"""
+
+import pickle
+import unittest
+
+from lib.bloom import Bloom
+
+
+class TestBloom(unittest.TestCase):
+    """
+    A Bloom filter must hold every value added to it, and should reject most others.
+    """
+
+    def test_no_false_negatives(self):
+        f = Bloom.create(1000, 1048576)
+        Bloom.add(f, range(0, 2000, 2))
+        self.assertTrue(all(Bloom.contains(f, v) for v in range(0, 2000, 2)))
+
+    def test_false_positive_rate(self):
+        f = Bloom.create(1000, 1048576)
+        Bloom.add(f, range(0, 2000, 2))
+        positives = sum(Bloom.contains(f, v) for v in range(1, 20001, 2))
+        self.assertLess(positives, 10000 * 0.03)
+
+    def test_bounded_size(self):
+        f = Bloom.create(10 ** 6, 64)
+        self.assertEqual(len(f['bits']), 64)
+
+        # An undersized filter has more false positives, but never a false negative.
+        Bloom.add(f, range(5000))
+        self.assertTrue(all(Bloom.contains(f, v) for v in range(5000)))
+
+    def test_types(self):
+        f = Bloom.create(10, 1024)
+        Bloom.add(f, [1, 'a', b'b', None])
+
+        # Integral reals match integers, as these are equal in SQLite. NULLs never match.
+        self.assertTrue(Bloom.contains(f, 1.0))
+        self.assertTrue(Bloom.contains(f, 'a'))
+        self.assertTrue(Bloom.contains(f, b'b'))
+        self.assertFalse(Bloom.contains(f, None))
+
+    def test_sent_filter(self):
+        # A filter built on one node must match the same values on another.
+        f = Bloom.create(100, 1024)
+        Bloom.add(f, ['x' + str(v) for v in range(100)])
+        g = pickle.loads(pickle.dumps(f))
+        self.assertTrue(all(Bloom.contains(g, 'x' + str(v)) for v in range(100)))
+
+
+if __name__ == '__main__':
+    unittest.main()
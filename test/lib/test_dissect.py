@@ -0,0 +1,74 @@
+# coding=utf-8
+"""
+Unit tests for the SQL dissection of lib/dissect.py. These do not require any daemons.
+
+Usage: python3 -m unittest discover test/lib
+"""
+
+import os
+import tempfile
+import unittest
+
+from lib.dissect import ClusterCFG, SQLFile
+from lib.error import ErrorHandle
+
+
+class TestPushdown(unittest.TestCase):
+    """
+    SQLFile.pushdown must never narrow a table to fewer columns than the statement references.
+    """
+
+    def test_qualified(self):
+        s = 'SELECT COMMENTS.O_CUSTKEY, ORDERS.O_ORDERSTATUS ' \
+            'FROM COMMENTS INNER JOIN ORDERS ON COMMENTS.O_CUSTKEY = ORDERS.O_ORDERKEY ' \
+            'WHERE ORDERS.O_ORDERSTATUS = \'O\' AND COMMENTS.O_CUSTKEY < ORDERS.O_ORDERKEY;'
+        self.assertEqual(SQLFile.pushdown(s, 'ORDERS'),
+                         {'where': '(ORDERS.O_ORDERSTATUS = \'O\')',
+                          'columns': ['O_ORDERKEY', 'O_ORDERSTATUS']})
+        self.assertEqual(SQLFile.pushdown(s, 'COMMENTS'),
+                         {'where': None, 'columns': ['O_CUSTKEY']})
+
+    def test_every_column(self):
+        s = 'SELECT * FROM COMMENTS INNER JOIN ORDERS ON COMMENTS.O_CUSTKEY = ORDERS.O_ORDERKEY;'
+        self.assertIsNone(SQLFile.pushdown(s, 'ORDERS')['columns'])
+
+        s = 'SELECT O_CUSTKEY FROM COMMENTS INNER JOIN ORDERS ' \
+            'ON COMMENTS.O_CUSTKEY = ORDERS.O_ORDERKEY;'
+        self.assertIsNone(SQLFile.pushdown(s, 'ORDERS')['columns'])
+
+    def test_aliases(self):
+        # Columns qualified through an alias are not recognized, so every column is kept.
+        s = 'SELECT C.O_CUSTKEY, O.O_ORDERSTATUS ' \
+            'FROM COMMENTS AS C INNER JOIN ORDERS AS O ON C.O_CUSTKEY = O.O_ORDERKEY ' \
+            'WHERE O.O_ORDERSTATUS = \'O\';'
+        self.assertEqual(SQLFile.pushdown(s, 'ORDERS'), {'where': None, 'columns': None})
+        self.assertEqual(SQLFile.pushdown(s, 'COMMENTS'), {'where': None, 'columns': None})
+
+    def test_no_columns(self):
+        s = 'SELECT COUNT(*) FROM COMMENTS, ORDERS;'
+        self.assertEqual(SQLFile.pushdown(s, 'ORDERS'), {'where': None, 'columns': None})
+
+
+class TestOptions(unittest.TestCase):
+    """
+    ClusterCFG.options must fill in the defaults, and reject values that are out of range.
+    """
+
+    def options(self, contents):
+        with tempfile.NamedTemporaryFile('w', suffix='.cfg', delete=False) as f:
+            f.write(contents)
+        self.addCleanup(os.remove, f.name)
+        return ClusterCFG.options(f.name)
+
+    def test_defaults(self):
+        self.assertEqual(self.options('catalog.hostname=localhost:50001/cat.db\n'),
+                         ClusterCFG.default_options())
+
+    def test_idle(self):
+        self.assertEqual(self.options('pool.idle=2.5\n')['idle'], 2.5)
+        for v in ['0', '-1', 'inf', 'nan', 'soon']:
+            self.assertTrue(ErrorHandle.is_error(self.options('pool.idle=' + v + '\n')), v)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+# coding=utf-8
+"""
+Unit tests for the encoding of messages in lib/network.py. These do not require any daemons.
+
+Usage: python3 -m unittest discover test/lib
+"""
+
+import unittest
+from unittest import mock
+
+from lib.network import Columnar, Network
+
+
+class TestColumnar(unittest.TestCase):
+    """
+    Every batch must be decoded to the same tuples (and types) it was encoded from.
+    """
+
+    def assertRoundTrip(self, batch):
+        decoded = Columnar.decode(Columnar.encode(batch))
+        self.assertEqual(decoded, batch)
+        self.assertEqual([list(map(type, r_t)) for r_t in decoded],
+                         [list(map(type, r_t)) for r_t in batch])
+
+    def test_typed_columns(self):
+        self.assertRoundTrip([(1, 2.5, 'a', b'\x00'), (-300, -0.0, 'héllo', b''),
+                              (2 ** 40, 1e300, '', b'\xff' * 300)])
+
+    def test_nulls(self):
+        self.assertRoundTrip([(None, 1.0, None), (3, None, 'b'), (None, None, None)] * 5)
+
+    def test_mixed_columns(self):
+        self.assertRoundTrip([(1, 'a', None), (2.5, 3, b'b'), (None, b'c', 'd'), ('e', None, 4)])
+        self.assertRoundTrip([(1, ), (2 ** 62, ), ('x', ), (None, )] * 40)
+
+    def test_unencodable(self):
+        # Bools, integers beyond 64 bits, and text that is not valid UTF-8 are sent as they are.
+        for batch in [[(1, True)], [(2 ** 70, 'a'), ('b', 1)], [('\ud800', )]]:
+            self.assertIsNone(Columnar.encode(batch))
+            self.assertIs(Columnar.wrap(batch, 'columnar'), batch)
+
+    def test_empty(self):
+        self.assertRoundTrip([])
+        self.assertRoundTrip([(), ()])
+
+    def test_wrap(self):
+        batch = [(i, 'row ' + str(i)) for i in range(100)]
+        self.assertIsInstance(Columnar.wrap(batch, 'columnar'), bytes)
+        self.assertIs(Columnar.wrap(batch, 'pickle'), batch)
+
+        # Batches of tuples of different lengths are sent as they are.
+        ragged = [(1, 2), (3, )]
+        self.assertIs(Columnar.wrap(ragged, 'columnar'), ragged)
+
+    def test_packet(self):
+        # A wrapped batch must survive being packed into a message and unpacked on the other end.
+        batch = [(i, i / 3, 'row ' + str(i), None) for i in range(1000)]
+        for codec in ['columnar', 'pickle']:
+            packet = Network.pack(['FS', Columnar.wrap(batch, codec)])
+            operation, resultant = Network.unpack(b''.join(packet)[4:])
+            self.assertEqual(Columnar.unwrap(resultant), batch)
+
+    def test_frame(self):
+        # Encoded batches are framed as they are, so pickle never sees these.
+        batch = Columnar.wrap([(i, 'row ' + str(i)) for i in range(100)], 'columnar')
+        packet = Network.pack(['FZ', batch])
+        self.assertIs(packet[-1], batch)
+        self.assertEqual(packet[1][0], Network.FRAME)
+
+        with mock.patch('pickle.loads', side_effect=AssertionError):
+            self.assertEqual(Network.unpack(b''.join(packet)[4:]), ['FZ', batch])
+
+
+class TestCompression(unittest.TestCase):
+    """
+    Compressed messages must be unpacked to the message that was packed.
+    """
+
+    def test_methods(self):
+        message = ['FS', [(i, 'row ' + str(i % 10)) for i in range(1000)]]
+        plain = b''.join(Network.pack(message))
+
+        for method in Network.COMPRESSION:
+            o = {'compress': method, 'compress_bytes': 1024}
+            packet = b''.join(Network.pack(message, o))
+            self.assertLess(len(packet), len(plain))
+            self.assertEqual(Network.unpack(packet[4:]), message)
+
+    def test_frame(self):
+        batch = Columnar.wrap([(i, 'row ' + str(i % 10)) for i in range(1000)], 'columnar')
+        for method in Network.COMPRESSION:
+            o = {'compress': method, 'compress_bytes': 1024}
+            packet = b''.join(Network.pack(['FS', batch], o))
+            self.assertLess(len(packet), len(batch))
+            self.assertEqual(Network.unpack(packet[4:]), ['FS', batch])
+
+    def test_small(self):
+        # Messages below the threshold (or that do not shrink) are sent as they are.
+        message = ['EZ', 'Success']
+        o = {'compress': 'zlib', 'compress_bytes': 1024}
+        self.assertEqual(Network.pack(message, o), Network.pack(message))
+        self.assertEqual(Network.unpack(b''.join(Network.pack(message, o))[4:]), message)
+
+
+if __name__ == '__main__':
+    unittest.main()
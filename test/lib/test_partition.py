@@ -0,0 +1,248 @@
+# coding=utf-8
+"""
+Unit tests for the partitioning functions of lib/partition.py. These do not require any daemons.
+
+Usage: python3 -m unittest discover test/lib
+"""
+
+import random
+import unittest
+
+from lib.partition import Partition
+
+
+def range_partition(nodeid, a, b):
+    """ Construct the partition dictionary of a range partitioned node.
+
+    :param nodeid: ID of the node.
+    :param a: Lower (exclusive) bound of the node.
+    :param b: Upper (inclusive) bound of the node.
+    :return: The partition dictionary, as returned by the catalog node.
+    """
+    return {'uri': 'node' + str(nodeid), 'nodeid': nodeid, 'partmtd': 1, 'partcol': 'A',
+            'param1': str(a), 'param2': str(b)}
+
+
+def hash_partition(nodeid, m):
+    """ Construct the partition dictionary of a hash partitioned node.
+
+    :param nodeid: ID of the node.
+    :param m: Modulus of the hash function.
+    :return: The partition dictionary, as returned by the catalog node.
+    """
+    return {'uri': 'node' + str(nodeid), 'nodeid': nodeid, 'partmtd': 2, 'partcol': 'A',
+            'param1': str(m), 'param2': None}
+
+
+class TestIsOverlap(unittest.TestCase):
+    """
+    Partition.is_overlap must never skip a pair of nodes that may hold a common value.
+    """
+
+    def test_range_range(self):
+        self.assertTrue(Partition.is_overlap(range_partition(1, '-inf', 10),
+                                             range_partition(2, 5, 20)))
+        self.assertFalse(Partition.is_overlap(range_partition(1, '-inf', 10),
+                                              range_partition(2, 10, '+inf')))
+
+    def test_hash_hash(self):
+        # Residue 2 of both 4 and 6 holds 2. Residue 0 of 4 is even, and residue 1 of 6 is odd.
+        self.assertTrue(Partition.is_overlap(hash_partition(3, 4), hash_partition(3, 6)))
+        self.assertFalse(Partition.is_overlap(hash_partition(1, 4), hash_partition(2, 6)))
+
+    def test_range_hash(self):
+        self.assertTrue(Partition.is_overlap(range_partition(1, 0, 2), hash_partition(3, 3)))
+        self.assertFalse(Partition.is_overlap(range_partition(1, 0, 1), hash_partition(3, 3)))
+        self.assertTrue(Partition.is_overlap(hash_partition(3, 3), range_partition(1, 0, '+inf')))
+
+    def test_brute_force(self):
+        # Compare against every value of a small domain.
+        ps = [range_partition(1, '-inf', 3), range_partition(2, 3, 7), range_partition(3, 7, 12)]
+        ps += [hash_partition(j, m) for m in [2, 3, 4, 6] for j in range(1, m + 1)]
+
+        def holds(p, v):
+            if p['partmtd'] == 1:
+                return float(p['param1']) < v <= float(p['param2'])
+            return v % int(p['param1']) + 1 == p['nodeid']
+
+        for p_1 in ps:
+            for p_2 in ps:
+                expected = any(holds(p_1, v) and holds(p_2, v) for v in range(-50, 50))
+                self.assertEqual(Partition.is_overlap(p_1, p_2), expected, (p_1, p_2))
+
+
+class TestJoinPairs(unittest.TestCase):
+    """
+    Partition.join_pairs must only prune pairs when both tables are partitioned on joined columns.
+    """
+
+    def test_colocated_hash(self):
+        ps = [hash_partition(j, 3) for j in range(1, 4)]
+        pairs = Partition.join_pairs(ps, ps, [['A', 'A']])
+        self.assertEqual(pairs, {(0, 0), (1, 1), (2, 2)})
+        self.assertEqual(Partition.colocated_uris(ps, ps, pairs), ['node1', 'node2', 'node3'])
+
+    def test_other_column(self):
+        ps = [hash_partition(j, 3) for j in range(1, 4)]
+        self.assertEqual(len(Partition.join_pairs(ps, ps, [['B', 'A']])), 9)
+
+
+class TestSample(unittest.TestCase):
+    """
+    Sampled ranges must cover every value, and split the sample into about equal parts.
+    """
+
+    def test_reservoir(self):
+        random.seed(0)
+        self.assertEqual(sorted(Partition.reservoir(iter(range(10)), 20)), list(range(10)))
+
+        sample = Partition.reservoir(iter(range(100000)), 1000)
+        self.assertEqual(len(sample), 1000)
+        self.assertEqual(len(set(sample)), 1000)
+
+        # Each half of the values should make up about half of the sample.
+        self.assertLess(abs(sum(v < 50000 for v in sample) - 500), 100)
+
+    def test_equi_depth(self):
+        sample = list(range(1, 3001))
+        bounds = Partition.equi_depth(sample, 3)
+        self.assertEqual(bounds, [(-float('inf'), 1000.0), (1000.0, 2000.0),
+                                  (2000.0, float('inf'))])
+
+    def test_equi_depth_skew(self):
+        # Every value falls in exactly one range, even when one value makes up most of the sample.
+        sample = [5] * 900 + list(range(100))
+        bounds = Partition.equi_depth(sample, 4)
+        self.assertEqual(bounds[0][0], -float('inf'))
+        self.assertEqual(bounds[-1][1], float('inf'))
+        self.assertIsNotNone(Partition.sort_ranges(bounds))
+        for v in set(sample):
+            self.assertEqual(sum(a < v <= b for a, b in bounds), 1)
+
+    def test_equi_depth_small(self):
+        bounds = Partition.equi_depth([7], 3)
+        self.assertEqual(len(bounds), 3)
+        self.assertEqual(sum(a < 7 <= b for a, b in bounds), 1)
+
+
+class TestRoute(unittest.TestCase):
+    """
+    Partition.route_indices must place each row on the same nodes as a scan of every node would.
+    """
+
+    chunk = [(str(v), 'x') for v in range(-20, 40)] + [('7', 'y'), ('7', 'z')]
+
+    def assertRoutes(self, p, holds):
+        expected = [[i for i, r_t in enumerate(self.chunk) if holds(j, int(r_t[0]))]
+                    for j in range(p['n'])]
+        self.assertEqual(Partition.route_indices(self.chunk, p), expected)
+        self.assertEqual(Partition.route(self.chunk, p),
+                         [[self.chunk[i] for i in x] for x in expected])
+
+    def test_hash(self):
+        p = {'partmtd': 2, 'n': 3, 'y': 0, 'param1': 3}
+        self.assertRoutes(p, lambda j, v: v % 3 == j)
+
+    def test_ranges(self):
+        # Ranges are given out of order, with a gap between 10 and 15.
+        bounds = [(15.0, float('inf')), (-float('inf'), 0.0), (0.0, 10.0)]
+        p = {'partmtd': 1, 'n': 3, 'y': 0, 'bounds': bounds,
+             'sorted': Partition.sort_ranges(bounds)}
+        self.assertRoutes(p, lambda j, v: bounds[j][0] < v <= bounds[j][1])
+
+    def test_overlapping_ranges(self):
+        bounds = [(-float('inf'), 10.0), (5.0, 20.0), (0.0, float('inf'))]
+        self.assertIsNone(Partition.sort_ranges(bounds))
+        p = {'partmtd': 1, 'n': 3, 'y': 0, 'bounds': bounds, 'sorted': None}
+        self.assertRoutes(p, lambda j, v: bounds[j][0] < v <= bounds[j][1])
+
+    def test_not_partitioned(self):
+        p = {'partmtd': 0, 'n': 2}
+        self.assertEqual(Partition.route(self.chunk, p), [self.chunk, self.chunk])
+
+    def test_nulls(self):
+        # Rows without a value belong to the first node, as these do in a shuffle.
+        chunk = [(None, 'a'), ('4', 'b'), (None, 'c'), ('5', 'd')]
+        p = {'partmtd': 2, 'n': 3, 'y': 0, 'param1': 3}
+        self.assertEqual(Partition.route_indices(chunk, p), [[0, 2], [1], [3]])
+        self.assertEqual(Partition.bucket(None, 3), 0)
+
+        bounds = [(0.0, 10.0), (10.0, float('inf'))]
+        p = {'partmtd': 1, 'n': 2, 'y': 0, 'bounds': bounds,
+             'sorted': Partition.sort_ranges(bounds)}
+        self.assertEqual(Partition.route_indices(chunk, p), [[0, 1, 2, 3], []])
+
+
+class TestMoves(unittest.TestCase):
+    """
+    Repartitioning with Partition.moves must leave each new node with exactly the rows it owns,
+    while sending each row to each node at most once.
+    """
+
+    table = [(str(v), 'x') for v in range(-30, 90)]
+
+    @staticmethod
+    def hashed(n):
+        return {'partmtd': 2, 'n': n, 'y': 0, 'param1': n}
+
+    @staticmethod
+    def ranged(bounds):
+        return {'partmtd': 1, 'n': len(bounds), 'y': 0, 'bounds': bounds,
+                'sorted': Partition.sort_ranges(bounds)}
+
+    def assertRepartitions(self, old, new, mapping, table=None):
+        # Each current node holds the rows it owns, and keeps those that it still owns.
+        table = self.table if table is None else table
+        holds = [Partition.route(table, old)[k] for k in range(old['n'])]
+        after = [[] for _ in range(new['n'])]
+        for k, rows in enumerate(holds):
+            if mapping[k] is not None:
+                owned = Partition.owners(rows, new)
+                after[mapping[k]] += [r_t for r_t, js in zip(rows, owned) if mapping[k] in js]
+
+        # Each current node sends its rows whose nodes change, and every node stores these.
+        for k, rows in enumerate(holds):
+            m = {'old': old, 'new': new, 'map': mapping, 'i': k}
+            for r_t, js in zip(rows, Partition.moves(rows, m)):
+                self.assertEqual(len(set(js)), len(js))
+                [after[j].append(r_t) for j in js]
+
+        expected = Partition.route(table, new)
+        for j in range(new['n']):
+            self.assertEqual(sorted(after[j], key=str), sorted(expected[j], key=str), j)
+
+    def test_owners(self):
+        p = self.ranged([(-float('inf'), 10.0), (5.0, float('inf'))])
+        self.assertEqual(Partition.owners([('0', ), ('7', ), ('20', )], p), [[0], [0, 1], [1]])
+        self.assertEqual(Partition.owners([('0', )], {'partmtd': 0, 'n': 3}), [[0, 1, 2]])
+
+    def test_scale_out(self):
+        bounds = [(-float('inf'), 0.0), (0.0, 30.0), (30.0, 60.0), (60.0, float('inf'))]
+        self.assertRepartitions(self.hashed(3), self.ranged(bounds), [0, 1, 2])
+        self.assertRepartitions(self.hashed(3), self.hashed(4), [0, 1, 2])
+
+    def test_scale_in(self):
+        bounds = [(-float('inf'), 0.0), (0.0, 30.0), (30.0, 60.0), (60.0, float('inf'))]
+        self.assertRepartitions(self.ranged(bounds), self.hashed(3), [0, 1, 2, None])
+        self.assertRepartitions(self.hashed(4), self.hashed(2), [None, 1, 0, None])
+
+    def test_not_partitioned(self):
+        full = {'partmtd': 0, 'n': 3}
+        self.assertRepartitions(self.hashed(3), full, [0, 1, 2])
+        self.assertRepartitions(full, self.hashed(3), [0, 1, 2])
+        self.assertRepartitions(full, {'partmtd': 0, 'n': 4}, [0, 1, 2])
+
+    def test_nulls(self):
+        # Rows without a value move onto the first new node, whichever node held them before.
+        table = self.table + [(None, 'n')] * 3
+        self.assertRepartitions(self.hashed(3), self.hashed(2), [1, 0, None], table)
+        self.assertEqual(Partition.owners([(None, 'n')], self.hashed(2)), [[0]])
+
+    def test_overlapping_ranges(self):
+        bounds = [(-float('inf'), 20.0), (10.0, 50.0), (40.0, float('inf'))]
+        self.assertRepartitions(self.hashed(3), self.ranged(bounds), [0, 1, 2])
+        self.assertRepartitions(self.ranged(bounds), self.hashed(2), [1, None, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
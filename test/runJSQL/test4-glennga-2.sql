@@ -0,0 +1,5 @@
+SELECT COMMENTS.O_CUSTKEY, ORDERS.O_ORDERSTATUS
+FROM COMMENTS
+INNER JOIN ORDERS ON COMMENTS.O_CUSTKEY = ORDERS.O_ORDERKEY
+WHERE ORDERS.O_ORDERSTATUS = 'O';
+